@@ -0,0 +1,120 @@
+"""
+Serialization Micro-benchmark
+
+Compares the serialization path of the list endpoints before and after the
+fast path on lists of 1k Recommendations, without touching the database:
+
+    legacy   attribute access, Enum.name, datetime.isoformat(), flask-restx
+             marshal and the standard json module
+    fast     Recommendation.serialize(), Marshaller and serialization.dumps()
+
+Every timed run gets Recommendations with timestamps no earlier run has seen
+and starts with an empty isoformat() cache, so the fast path is measured
+without cache hits it would not get on real traffic.
+
+Usage:
+    python -m benchmarks.serialization [--items 1000] [--repeat 20]
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+from flask_restx import marshal
+from service import app
+from service.common import serialization
+from service.common.serialization import Marshaller, dumps, orjson
+from service.models import Recommendation, RecommendationType, RecommendationStatus
+from service.routes import recommendation_model
+
+
+def make_recommendations(count: int, offset: int = 0) -> list:
+    """Returns loaded-looking Recommendations with distinct timestamps,
+    starting offset seconds into 2023"""
+    start = datetime(2023, 1, 1) + timedelta(seconds=offset)
+    return [
+        Recommendation(
+            id=index + 1,
+            source_item_id=index % 50,
+            target_item_id=index,
+            recommendation_type=RecommendationType.UP_SELL,
+            recommendation_weight=index / count,
+            status=RecommendationStatus.VALID,
+            number_of_likes=index % 7,
+            created_at=start + timedelta(seconds=index, microseconds=index),
+            updated_at=start + timedelta(seconds=index),
+        )
+        for index in range(count)
+    ]
+
+
+def legacy_serialize(recommendation) -> dict:
+    """Recommendation.serialize() as it was before the fast path"""
+    data = {
+        "source_item_id": recommendation.source_item_id,
+        "target_item_id": recommendation.target_item_id,
+        "recommendation_type": recommendation.recommendation_type.name,
+        "recommendation_weight": recommendation.recommendation_weight,
+        "status": recommendation.status.name,
+        "number_of_likes": recommendation.number_of_likes,
+    }
+    if recommendation.id:
+        data["id"] = recommendation.id
+    if recommendation.created_at:
+        data["created_at"] = recommendation.created_at.isoformat()
+    if recommendation.updated_at:
+        data["updated_at"] = recommendation.updated_at.isoformat()
+    return data
+
+
+def legacy_path(recommendations) -> str:
+    """Serializes, marshals and encodes a list the way the routes used to"""
+    items = marshal([legacy_serialize(rec) for rec in recommendations], recommendation_model)
+    return json.dumps({"items": items})
+
+
+def fast_path(recommendations, marshaller=Marshaller(recommendation_model)) -> str:
+    """Serializes, marshals and encodes a list with the fast path"""
+    return dumps({"items": marshaller([rec.serialize() for rec in recommendations])})
+
+
+def measure(function, count: int, repeat: int) -> list:
+    """Returns the milliseconds of every run of function on count new Recommendations"""
+    function(make_recommendations(count))  # warm up the code paths
+    timings = []
+    for run in range(1, repeat + 1):
+        recommendations = make_recommendations(count, offset=run * count)
+        serialization._iso_cache.clear()  # pylint: disable=protected-access
+        start = time.perf_counter()
+        function(recommendations)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    """Runs the benchmark and prints one line per path"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    recommendations = make_recommendations(args.items)
+    with app.test_request_context():
+        if json.loads(legacy_path(recommendations)) != json.loads(fast_path(recommendations)):
+            raise SystemExit("The fast path does not produce the same JSON")
+        results = {
+            "legacy": measure(legacy_path, args.items, args.repeat),
+            "fast": measure(fast_path, args.items, args.repeat),
+        }
+    print(f"{args.items} items, {args.repeat} runs, orjson {'on' if orjson else 'off'}")
+    for name, timings in results.items():
+        print(
+            f"{name:>8}: median {statistics.median(timings):8.3f} ms"
+            f"  min {min(timings):8.3f} ms"
+        )
+    speedup = statistics.median(results["legacy"]) / statistics.median(results["fast"])
+    print(f" speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -36,6 +36,14 @@ from service import routes, models  # noqa: E402, E261
 
 # pylint: disable=wrong-import-position
 from service.common import error_handlers, cli_commands  # noqa: F401, E402
+from service.common.like_buffer import like_buffer  # noqa: E402
+from service.common.graph_index import graph_index  # noqa: E402
+from service.common.snapshot import snapshot_reader  # noqa: E402
+from service.common.replicas import replica_router  # noqa: E402
+from service.common.metrics import metrics  # noqa: E402
+from service.common.query_log import query_log  # noqa: E402
+from service.common.timing import server_timing  # noqa: E402
+from service.common.profiler import profiler  # noqa: E402
 
 # Set up logging for production
 log_handlers.init_logging(app, "gunicorn.error")
@@ -51,4 +59,13 @@ except Exception as error:  # pylint: disable=broad-except
     # gunicorn requires exit code 4 to stop spawning workers when they die
     sys.exit(4)
 
+replica_router.init_app(app, models.db)
+like_buffer.init_app(app)
+graph_index.init_app(app)
+snapshot_reader.init_app(app)
+metrics.init_app(app, models.db)
+query_log.init_app(app)
+server_timing.init_app(app)
+profiler.init_app(app)
+
 app.logger.info("Service initialized!")
@@ -1,8 +1,28 @@
 """
 Flask CLI Command Extensions
 """
+import csv
+import json
+import math
+import time
+import click
 from service import app
-from service.models import db
+from service.common.export import EXPORT_MIMETYPES, export_lines
+from service.common.generator import DEFAULT_STATUS_MIX, DEFAULT_TYPE_MIX, Generator, parse_mix
+from service.common.snapshot import write_snapshot
+from service.models import (
+    db,
+    find_cache,
+    source_cache,
+    Recommendation,
+    RecommendationType,
+    RecommendationStatus,
+    DataValidationError,
+)
+
+# fields that arrive as text in CSV files but must be numbers for deserialize()
+CSV_INT_FIELDS = ("source_item_id", "target_item_id", "number_of_likes")
+CSV_FLOAT_FIELDS = ("recommendation_weight",)
 
 
 ######################################################################
@@ -19,3 +39,341 @@ def db_create():
     db.drop_all()
     db.create_all()
     db.session.commit()
+
+
+######################################################################
+# Command to bulk load Recommendations from a file
+# Usage:
+#   flask recs-import recommendations.csv [--replace]
+######################################################################
+@app.cli.command("recs-import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--format",
+    "file_format",
+    type=click.Choice(["csv", "ndjson"]),
+    default=None,
+    help="File format, guessed from the file extension when omitted.",
+)
+@click.option(
+    "--replace",
+    is_flag=True,
+    help="Replace all Recommendations of the source items found in the file.",
+)
+@click.option(
+    "--progress-every",
+    type=int,
+    default=100000,
+    show_default=True,
+    help="Report progress every N rows.",
+)
+def recs_import(path, file_format, replace, progress_every):
+    """
+    Streams a CSV or NDJSON file of Recommendations into the database with
+    COPY FROM STDIN. Rows are validated on the fly and invalid ones are
+    reported and skipped.
+    """
+    if file_format is None:
+        file_format = "csv" if path.lower().endswith(".csv") else "ndjson"
+    stats = {"rejected": 0, "start": time.monotonic()}
+
+    def valid_recommendations(handle):
+        """Yields the Recommendations that pass validation, reporting progress"""
+        count = 0
+        for line_number, record in _read_records(handle, file_format):
+            try:
+                recommendation = Recommendation().deserialize(record)
+            except DataValidationError as error:
+                stats["rejected"] += 1
+                click.echo(f"Line {line_number}: {error}", err=True)
+                continue
+            count += 1
+            if progress_every and count % progress_every == 0:
+                click.echo(f"Imported {count} rows ({_rate(count, stats['start'])} rows/s)")
+            yield recommendation
+
+    with open(path, newline="", encoding="utf-8") as handle:
+        try:
+            count = Recommendation.copy_from(valid_recommendations(handle), replace)
+        except DataValidationError as error:
+            raise click.ClickException(str(error)) from error
+    elapsed = time.monotonic() - stats["start"]
+    click.echo(
+        f"Imported {count} rows in {elapsed:.1f}s "
+        f"({_rate(count, stats['start'])} rows/s), {stats['rejected']} rejected"
+    )
+
+
+######################################################################
+# Command to dump Recommendations to a file
+# Usage:
+#   flask recs-export recommendations.ndjson [--format csv] [--status VALID]
+######################################################################
+@app.cli.command("recs-export")
+@click.argument("output", type=click.File("w", encoding="utf-8"), default="-")
+@click.option(
+    "--format",
+    "file_format",
+    type=click.Choice(list(EXPORT_MIMETYPES)),
+    default="ndjson",
+    show_default=True,
+    help="Export format.",
+)
+@click.option(
+    "--type",
+    "rec_type",
+    type=click.Choice(RecommendationType._member_names_),  # pylint: disable=protected-access
+    default=None,
+    help="Only export Recommendations of this type.",
+)
+@click.option(
+    "--status",
+    "rec_status",
+    type=click.Choice(RecommendationStatus._member_names_),  # pylint: disable=protected-access
+    default=None,
+    help="Only export Recommendations with this status.",
+)
+def recs_export(output, file_format, rec_type, rec_status):
+    """
+    Streams Recommendations to a file, or stdout, as NDJSON or CSV with
+    constant memory.
+    """
+    records = Recommendation.stream(rec_type=rec_type, rec_status=rec_status)
+    for line in export_lines(records, file_format):
+        output.write(line)
+
+
+######################################################################
+# Command to write the snapshot file mapped by the workers
+# Usage:
+#   flask recs-snapshot /var/lib/recommendations/graph.snapshot
+######################################################################
+@app.cli.command("recs-snapshot")
+@click.argument("path", type=click.Path(dir_okay=False, writable=True), required=False)
+def recs_snapshot(path):
+    """
+    Writes the whole recommendation graph to a snapshot file, by default
+    the GRAPH_SNAPSHOT_PATH, replacing the previous one atomically.
+    """
+    path = path or app.config.get("GRAPH_SNAPSHOT_PATH")
+    if not path:
+        raise click.UsageError("Give a PATH or set GRAPH_SNAPSHOT_PATH")
+    start = time.monotonic()
+    snapshot = write_snapshot(path)
+    click.echo(
+        f"Wrote {snapshot.size} recommendations of {len(snapshot.sources)} source items "
+        f"to {path} in {time.monotonic() - start:.2f}s"
+    )
+
+
+######################################################################
+# Command to load a synthetic dataset for load testing
+# Usage:
+#   flask recs-generate --rows 10000000 [--truncate] [--method insert]
+######################################################################
+@app.cli.command("recs-generate")
+@click.option(
+    "--rows",
+    type=click.IntRange(min=1),
+    default=100000,
+    show_default=True,
+    help="Number of Recommendations to generate.",
+)
+@click.option(
+    "--sources",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of source items, rows / 20 when omitted.",
+)
+@click.option(
+    "--fanout-exponent",
+    type=float,
+    default=1.1,
+    show_default=True,
+    help="Zipf exponent of the Recommendations per source item.",
+)
+@click.option(
+    "--max-fanout",
+    type=click.IntRange(min=1),
+    default=1000,
+    show_default=True,
+    help="Most Recommendations of a single source item.",
+)
+@click.option(
+    "--likes-exponent",
+    type=click.FloatRange(min=0, min_open=True),
+    default=1.5,
+    show_default=True,
+    help="Power law exponent of number_of_likes.",
+)
+@click.option(
+    "--max-likes",
+    type=click.IntRange(min=0),
+    default=100000,
+    show_default=True,
+    help="Most likes of a single Recommendation.",
+)
+@click.option(
+    "--types",
+    "type_mix",
+    default=DEFAULT_TYPE_MIX,
+    show_default=True,
+    callback=lambda ctx, param, value: _check_mix(value, RecommendationType),
+    help="Weighted mix of recommendation types.",
+)
+@click.option(
+    "--statuses",
+    "status_mix",
+    default=DEFAULT_STATUS_MIX,
+    show_default=True,
+    callback=lambda ctx, param, value: _check_mix(value, RecommendationStatus),
+    help="Weighted mix of statuses.",
+)
+@click.option(
+    "--first-source-id",
+    type=int,
+    default=1,
+    show_default=True,
+    help="Smallest source_item_id, to add a dataset next to another.",
+)
+@click.option(
+    "--days",
+    type=click.IntRange(min=1),
+    default=365,
+    show_default=True,
+    help="Spread created_at and updated_at over this many days.",
+)
+@click.option(
+    "--seed",
+    type=int,
+    default=None,
+    help="Random seed for a repeatable dataset.",
+)
+@click.option(
+    "--method",
+    type=click.Choice(["copy", "insert"]),
+    default="copy",
+    show_default=True,
+    help="Load with COPY FROM STDIN or executemany INSERTs.",
+)
+@click.option(
+    "--truncate",
+    is_flag=True,
+    help="Delete every Recommendation first. Never use this on production.",
+)
+@click.option(
+    "--progress-every",
+    type=int,
+    default=1000000,
+    show_default=True,
+    help="Report progress every N rows.",
+)
+def recs_generate(**options):
+    """
+    Loads synthetic Recommendations shaped like production data: a Zipfian
+    number of Recommendations per source item, power law likes and mixes of
+    types and statuses, written in bulk without building model objects.
+    """
+    method = options.pop("method")
+    truncate = options.pop("truncate")
+    progress_every = options.pop("progress_every")
+    try:
+        generator = Generator(**options)
+    except ValueError as error:
+        raise click.UsageError(str(error)) from error
+    db.session.remove()  # TRUNCATE waits for the locks of open transactions
+    if truncate and method == "insert":
+        with db.engine.begin() as connection:
+            Recommendation.truncate(connection)
+        find_cache.clear()
+        source_cache.clear()
+    start = time.monotonic()
+    try:
+        if method == "copy":
+            # blocks never span a progress report
+            block_rows = math.gcd(progress_every, 10000) if progress_every else 10000
+            count = Recommendation.copy_text(
+                _reported_blocks(generator.copy_text(block_rows), progress_every, start),
+                truncate=truncate,
+            )
+        else:
+            count = Recommendation.insert_rows(
+                _reported(generator, progress_every, start),
+                app.config.get("BULK_INSERT_CHUNK_SIZE", 1000),
+            )
+    except DataValidationError as error:
+        raise click.ClickException(str(error)) from error
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql(f"ANALYZE {Recommendation.__tablename__}")
+    click.echo(
+        f"Loaded {count} rows for {len(generator.fanouts)} source items in "
+        f"{time.monotonic() - start:.1f}s ({_rate(count, start)} rows/s)"
+    )
+
+
+######################################################################
+#  U T I L I T Y   F U N C T I O N S
+######################################################################
+def _check_mix(value, enum):
+    """Returns a mix option unchanged after checking it parses"""
+    try:
+        parse_mix(value, enum)
+    except ValueError as error:
+        raise click.BadParameter(str(error)) from error
+    return value
+
+
+def _read_records(handle, file_format):
+    """Yields (line number, record) pairs from a CSV or NDJSON file"""
+    if file_format == "csv":
+        reader = csv.DictReader(handle)
+        for record in reader:
+            yield reader.line_num, _convert_csv_record(record)
+        return
+    for line_number, line in enumerate(handle, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            # deserialize() reports anything that is not a dictionary
+            yield line_number, line
+
+
+def _convert_csv_record(record):
+    """Converts the numeric text fields of a CSV record, leaving bad values as is"""
+    for fields, cast in ((CSV_INT_FIELDS, int), (CSV_FLOAT_FIELDS, float)):
+        for field in fields:
+            try:
+                record[field] = cast(record[field])
+            except (KeyError, TypeError, ValueError):
+                pass
+    # empty cells are missing values, not invalid ones
+    for field in ("recommendation_type", "status", "created_at", "updated_at"):
+        if not record.get(field):
+            record.pop(field, None)
+    return record
+
+
+def _reported(rows, progress_every, start):
+    """Yields the rows, reporting progress"""
+    for count, row in enumerate(rows, 1):
+        if progress_every and count % progress_every == 0:
+            click.echo(f"Loaded {count} rows ({_rate(count, start)} rows/s)")
+        yield row
+
+
+def _reported_blocks(blocks, progress_every, start):
+    """Yields the COPY text blocks, reporting progress"""
+    count = 0
+    for block in blocks:
+        yield block
+        count += block.count("\n")
+        if progress_every and count % progress_every == 0:
+            click.echo(f"Loaded {count} rows ({_rate(count, start)} rows/s)")
+
+
+def _rate(count, start):
+    """Returns the rows per second since start"""
+    elapsed = time.monotonic() - start
+    return int(count / elapsed) if elapsed > 0 else count
@@ -0,0 +1,46 @@
+"""
+Conditional Requests
+
+Helpers that build ETag and Last-Modified validators for responses and
+decide whether a conditional GET can be answered with 304 Not Modified
+before any response body is built.
+"""
+from datetime import datetime, timezone
+from flask import request
+from werkzeug.http import http_date, quote_etag
+
+
+def make_validators(last_updated: datetime, *parts) -> dict:
+    """Returns the ETag and Last-Modified headers of data last changed at last_updated
+
+    The ETag is built from the given parts (ids, row counts, ...) and the
+    microsecond timestamp of the last change, so it is cheap to compute.
+    """
+    stamp = 0
+    headers = {}
+    if last_updated is not None:
+        last_updated = last_updated.replace(tzinfo=timezone.utc)
+        stamp = int(last_updated.timestamp() * 1_000_000)
+        headers["Last-Modified"] = http_date(last_updated)
+    headers["ETag"] = quote_etag("-".join(str(part) for part in (*parts, stamp)))
+    return headers
+
+
+def last_updated_of(items: list):
+    """Returns the latest updated_at of serialized Recommendations, or None"""
+    stamps = [item["updated_at"] for item in items if item.get("updated_at")]
+    return datetime.fromisoformat(max(stamps)) if stamps else None
+
+
+def is_not_modified(headers: dict) -> bool:
+    """Returns True if the request's validators still match the response headers"""
+    if request.if_none_match:
+        etag = headers["ETag"].strip('"')
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and "Last-Modified" in headers:
+        # Last-Modified only has second precision
+        last_modified = datetime.strptime(
+            headers["Last-Modified"], "%a, %d %b %Y %H:%M:%S GMT"
+        ).replace(tzinfo=timezone.utc)
+        return last_modified <= request.if_modified_since
+    return False
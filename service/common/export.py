@@ -0,0 +1,54 @@
+"""
+Export Formats
+
+Turns serialized Recommendations into the lines of an NDJSON or CSV export
+one record at a time, so exports can be streamed with constant memory.
+"""
+import csv
+import io
+from service.common.serialization import dumps
+
+EXPORT_MIMETYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+CSV_COLUMNS = (
+    "id",
+    "source_item_id",
+    "target_item_id",
+    "recommendation_type",
+    "recommendation_weight",
+    "status",
+    "number_of_likes",
+    "created_at",
+    "updated_at",
+)
+
+
+def export_lines(records, file_format="ndjson"):
+    """Yields the export of serialized Recommendations line by line"""
+    if file_format == "csv":
+        yield from _csv_lines(records)
+        return
+    for record in records:
+        yield dumps(record) + "\n"
+
+
+def _csv_lines(records):
+    """Yields a CSV header followed by one line per record"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    yield _drain(buffer)
+    for record in records:
+        writer.writerow(record)
+        yield _drain(buffer)
+
+
+def _drain(buffer):
+    """Returns and clears what has been written to the buffer"""
+    value = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return value
@@ -0,0 +1,211 @@
+"""
+Synthetic Data
+
+Generates Recommendation rows shaped like production data for load tests,
+fast enough to load millions of rows:
+
+- the number of Recommendations per source item follows a Zipf law, a few
+  source items have very many and most have a handful
+- number_of_likes follows a power law, most rows have none and a few have
+  very many
+- the types and statuses are drawn from weighted mixes like
+  "UP_SELL=30,CROSS_SELL=70"
+
+The rows are plain tuples in Recommendation.COPY_COLUMNS order, so they go
+straight to COPY or an executemany INSERT without building model objects.
+copy_text() yields the same rows already formatted as COPY text, which is
+the fastest way to load them.
+"""
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate
+from service.models import RecommendationType, RecommendationStatus
+
+DEFAULT_TYPE_MIX = "UP_SELL=30,CROSS_SELL=30,ACCESSORY=15,COMPLEMENTARY=15,SUBSTITUTE=10"
+DEFAULT_STATUS_MIX = "VALID=85,OUT_OF_STOCK=10,DEPRECATED=5"
+
+# distinct timestamps the rows are spread over, building a datetime per row
+# would cost more than the rest of the row
+TIMESTAMPS = 8192
+
+# recommendation_weight has four decimals
+WEIGHTS = 10000
+WEIGHT_TEXTS = [f"0.{weight:04d}" for weight in range(WEIGHTS)]
+
+
+def parse_mix(text: str, enum) -> tuple:
+    """Returns (names, cumulative weights) of a mix like "VALID=85,DEPRECATED=15"
+
+    Raises ValueError for names that are not members of the enum and for
+    weights that are not positive numbers.
+    """
+    names = []
+    weights = []
+    for part in text.split(","):
+        name, _, weight = part.strip().partition("=")
+        if name not in enum.__members__:
+            raise ValueError(f"{name} is not one of {', '.join(enum.__members__)}")
+        weight = float(weight or 1)
+        if weight <= 0:
+            raise ValueError(f"The weight of {name} must be positive")
+        names.append(name)
+        weights.append(weight)
+    return names, list(accumulate(weights))
+
+
+def zipf_fanouts(rows: int, sources: int, exponent: float, max_fanout: int = None) -> list:
+    """Returns the number of rows of every source item, by rank, adding up to rows
+
+    The source item of rank k gets a share proportional to 1 / k ** exponent,
+    and every source item gets at least one row while there are enough rows.
+    Source items never get more than max_fanout rows, what a capped source
+    item does not take is shared among the others.
+    Raises ValueError when the source items cannot hold all the rows.
+    """
+    sources = max(min(sources, rows), 1)
+    cap = max_fanout or rows
+    if sources * cap < rows:
+        raise ValueError(f"{sources} source items of at most {cap} rows cannot hold {rows} rows")
+    weights = [1 / rank**exponent for rank in range(1, sources + 1)]
+    # rows beyond the first one of every source item
+    extra = [0.0] * sources
+    spread = rows - sources
+    uncapped = range(sources)
+    while spread > 0 and uncapped:
+        total = sum(weights[rank] for rank in uncapped)
+        overflow = 0.0
+        below = []
+        for rank in uncapped:
+            share = extra[rank] + spread * weights[rank] / total
+            if share >= cap - 1:
+                overflow += share - (cap - 1)
+                share = cap - 1
+            else:
+                below.append(rank)
+            extra[rank] = share
+        spread, uncapped = overflow, below
+    fanouts = [1 + int(share) for share in extra]
+    # hand the rows lost to rounding down to the largest source items with room
+    missing = rows - sum(fanouts)
+    rank = 0
+    while missing > 0:
+        if fanouts[rank % sources] < cap:
+            fanouts[rank % sources] += 1
+            missing -= 1
+        rank += 1
+    return fanouts
+
+
+class Generator:  # pylint: disable=too-many-instance-attributes
+    """Generates the rows of a synthetic dataset
+
+    Raises ValueError for mixes that do not parse and for source items that
+    cannot hold all the rows. The timestamps end at the given end, or at the
+    time the generator was made, so every pass over it yields the same rows.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        rows: int,
+        sources: int = None,
+        fanout_exponent: float = 1.1,
+        likes_exponent: float = 1.5,
+        max_likes: int = 100000,
+        max_fanout: int = 1000,
+        type_mix: str = DEFAULT_TYPE_MIX,
+        status_mix: str = DEFAULT_STATUS_MIX,
+        first_source_id: int = 1,
+        days: int = 365,
+        seed: int = None,
+        end: datetime = None,
+    ):
+        self.rows = rows
+        self.sources = sources or max(rows // 20, 1)
+        self.fanout_exponent = fanout_exponent
+        self.likes_exponent = likes_exponent
+        self.max_likes = max_likes
+        self.max_fanout = max_fanout
+        self.types = parse_mix(type_mix, RecommendationType)
+        self.statuses = parse_mix(status_mix, RecommendationStatus)
+        self.first_source_id = first_source_id
+        self.days = days
+        self.seed = seed
+        self.end = end or datetime.utcnow().replace(microsecond=0)
+        self.fanouts = zipf_fanouts(rows, self.sources, fanout_exponent, max_fanout)
+
+    def _timestamps(self) -> list:
+        """Returns the pool of timestamps, oldest first, so the larger of two
+        picks is the later one"""
+        step = self.days * 86400 / TIMESTAMPS
+        return [
+            self.end - timedelta(seconds=int(step * (TIMESTAMPS - index))) for index in range(TIMESTAMPS)
+        ]
+
+    def _draws(self):
+        """Yields the raw values of every row, the only place that draws
+
+        The rows are in COPY_COLUMNS order, except that the weight is a
+        bucket of WEIGHTS and the timestamps are indexes into _timestamps(),
+        so __iter__ and copy_text() can format them cheaply.
+        """
+        rng = random.Random(self.seed)
+        draw = rng.random
+        # the popular source items are spread over the id range
+        source_ids = list(range(self.first_source_id, self.first_source_id + len(self.fanouts)))
+        rng.shuffle(source_ids)
+        targets = max(self.rows * 10, 10)
+        type_names, type_weights = self.types
+        status_names, status_weights = self.statuses
+        # likes are Pareto distributed: (1 - U) ** (-1 / exponent), minus one so most are 0
+        likes_power = -1 / self.likes_exponent
+        max_likes = self.max_likes
+        for source_item_id, fanout in zip(source_ids, self.fanouts):
+            types = rng.choices(type_names, cum_weights=type_weights, k=fanout)
+            statuses = rng.choices(status_names, cum_weights=status_weights, k=fanout)
+            for index in range(fanout):
+                created = int(draw() * TIMESTAMPS)
+                updated = max(created, int(draw() * TIMESTAMPS))
+                yield (
+                    source_item_id,
+                    1 + int(draw() * targets),
+                    types[index],
+                    int(draw() * WEIGHTS),
+                    statuses[index],
+                    min(int((1.0 - draw()) ** likes_power) - 1, max_likes),
+                    created,
+                    updated,
+                )
+
+    def __iter__(self):
+        """Yields the rows in Recommendation.COPY_COLUMNS order"""
+        timestamps = self._timestamps()
+        for source_item_id, target, rec_type, weight, rec_status, likes, created, updated in self._draws():
+            yield (
+                source_item_id,
+                target,
+                rec_type,
+                weight / WEIGHTS,
+                rec_status,
+                likes,
+                timestamps[created],
+                timestamps[updated],
+            )
+
+    def copy_text(self, block_rows: int = 10000):
+        """Yields the rows as blocks of block_rows COPY text format lines
+
+        The timestamps and weights are formatted once up front, which makes
+        this several times faster to load than the tuples.
+        """
+        timestamps = [str(timestamp) for timestamp in self._timestamps()]
+        lines = []
+        for source_item_id, target, rec_type, weight, rec_status, likes, created, updated in self._draws():
+            lines.append(
+                f"{source_item_id}\t{target}\t{rec_type}\t{WEIGHT_TEXTS[weight]}\t{rec_status}\t"
+                f"{likes}\t{timestamps[created]}\t{timestamps[updated]}\n"
+            )
+            if len(lines) == block_rows:
+                yield "".join(lines)
+                lines = []
+        if lines:
+            yield "".join(lines)
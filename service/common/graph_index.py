@@ -0,0 +1,367 @@
+"""
+Graph Index
+
+An optional in-process index of the whole source -> target recommendation
+graph. It is laid out like a CSR (compressed sparse row) matrix: a sorted
+array of source item ids, an array of offsets into the edge arrays, and one
+typed array per column of the edges. The edges of every source item are
+pre-sorted by descending weight, so a top-K lookup is a bisect plus a slice.
+
+The index is loaded in a background thread, then refreshed incrementally
+every GRAPH_INDEX_REFRESH_SECONDS: only the source items with rows changed
+since the last updated_at, or recorded as having lost rows in the
+recommendation_removal table, are reloaded. The index is rebuilt from
+scratch when the whole table was replaced and every
+GRAPH_INDEX_REBUILD_SECONDS, which also catches rows removed behind the
+model's back. All of it reads from the primary, since rows a lagging replica
+has not received yet would be skipped for good. Until the first load
+finishes the lookups return None and callers fall back to the database.
+"""
+import logging
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from service.common.replicas import primary_reads
+from service.models import Recommendation, RecommendationType, RecommendationStatus
+
+logger = logging.getLogger("flask.app")
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+# rows can be committed a little after their updated_at was taken, or by a
+# worker whose clock is behind, so every refresh looks back this far again
+CLOCK_SKEW = timedelta(seconds=5)
+
+TYPE_NAMES = {member.value: member.name for member in RecommendationType}
+STATUS_NAMES = {member.value: member.name for member in RecommendationStatus}
+VALID = RecommendationStatus.VALID.value
+
+
+def _to_micros(value: datetime) -> int:
+    """Returns a naive UTC datetime as microseconds since the epoch, -1 for None"""
+    return -1 if value is None else (value - EPOCH) // MICROSECOND
+
+
+def _from_micros(value: int) -> datetime:
+    """Returns the naive UTC datetime of microseconds since the epoch"""
+    return EPOCH + timedelta(microseconds=value)
+
+
+class GraphSnapshot:  # pylint: disable=too-many-instance-attributes
+    """CSR arrays of the recommendation graph, never changed once finished"""
+
+    def __init__(self):
+        self.sources = array("q")
+        self.offsets = array("q", [0])
+        self.ids = array("q")
+        self.targets = array("q")
+        self.weights = array("d")
+        self.statuses = array("b")
+        self.types = array("b")
+        self.likes = array("q")
+        self.created = array("q")
+        self.updated = array("q")
+        self.watermark = None
+        self.removed_watermark = None
+        self.max_id = 0
+        self.built_at = time.monotonic()
+        # ids in ascending order and their edge positions, built by source_of()
+        self._sorted_ids = None
+        self._id_positions = None
+
+    @property
+    def size(self) -> int:
+        """Returns the number of edges"""
+        return len(self.ids)
+
+    def columns(self):
+        """Returns the edge arrays in CACHE_COLUMNS order, without the source"""
+        return (
+            self.ids,
+            self.targets,
+            self.types,
+            self.weights,
+            self.statuses,
+            self.likes,
+            self.created,
+            self.updated,
+        )
+
+    def segment(self, source_item_id: int) -> range:
+        """Returns the edge positions of a source item"""
+        index = bisect_left(self.sources, source_item_id)
+        if index == len(self.sources) or self.sources[index] != source_item_id:
+            return range(0)
+        return range(self.offsets[index], self.offsets[index + 1])
+
+    def source_of(self, rec_id: int):
+        """Returns the source item of an edge id, None when there is no such edge"""
+        if self._sorted_ids is None:
+            # built on first use, only refreshes that meet a moved row need it
+            self._id_positions = array("q", sorted(range(len(self.ids)), key=self.ids.__getitem__))
+            self._sorted_ids = array("q", (self.ids[position] for position in self._id_positions))
+        index = bisect_left(self._sorted_ids, rec_id)
+        if index == len(self._sorted_ids) or self._sorted_ids[index] != rec_id:
+            return None
+        position = self._id_positions[index]
+        return self.sources[bisect_left(self.offsets, position + 1) - 1]
+
+    def add_row(self, row):
+        """Appends a row in CACHE_COLUMNS order, rows must arrive grouped by source"""
+        (rec_id, source, target, rec_type, weight, rec_status, likes, created, updated) = row
+        if not self.sources or self.sources[-1] != source:
+            if len(self.sources):
+                self.offsets.append(len(self.ids))
+            self.sources.append(source)
+        self.ids.append(rec_id)
+        self.targets.append(target)
+        self.types.append(rec_type.value)
+        self.weights.append(weight)
+        self.statuses.append(rec_status.value)
+        self.likes.append(likes)
+        self.created.append(_to_micros(created))
+        self.updated.append(_to_micros(updated))
+        self.max_id = max(self.max_id, rec_id)
+        if updated is not None and (self.watermark is None or updated > self.watermark):
+            self.watermark = updated
+
+    def copy_source(self, other, index: int):
+        """Appends all edges of the index-th source item of another snapshot"""
+        start, end = other.offsets[index], other.offsets[index + 1]
+        if len(self.sources):
+            self.offsets.append(len(self.ids))
+        self.sources.append(other.sources[index])
+        for mine, theirs in zip(self.columns(), other.columns()):
+            mine.extend(theirs[start:end])
+
+    def finish(self):
+        """Closes the offsets once all rows were added"""
+        if len(self.sources):
+            self.offsets.append(len(self.ids))
+        return self
+
+    def record(self, position: int, source_item_id: int) -> dict:
+        """Returns the edge at a position like Recommendation.serialize() does"""
+        recommendation = {
+            "source_item_id": source_item_id,
+            "target_item_id": self.targets[position],
+            "recommendation_type": TYPE_NAMES[self.types[position]],
+            "recommendation_weight": self.weights[position],
+            "status": STATUS_NAMES[self.statuses[position]],
+            "number_of_likes": self.likes[position],
+            "id": self.ids[position],
+        }
+        if self.created[position] >= 0:
+            recommendation["created_at"] = _from_micros(self.created[position]).isoformat()
+        if self.updated[position] >= 0:
+            recommendation["updated_at"] = _from_micros(self.updated[position]).isoformat()
+        return recommendation
+
+    def lookup(
+        self,
+        source_item_id: int,
+        sort_order: str = "desc",
+        valid_only: bool = False,
+        limit: int = None,
+    ) -> list:
+        """Returns the serialized Recommendations of a source item
+
+        The result matches Recommendation.serialize_by_source_item_id.
+        """
+        positions = self.segment(source_item_id)
+        if sort_order == "asc":
+            positions = sorted(
+                positions, key=lambda position: (self.weights[position], self.ids[position])
+            )
+        results = []
+        for position in positions:
+            if valid_only and self.statuses[position] != VALID:
+                continue
+            results.append(self.record(position, source_item_id))
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+
+def load_snapshot() -> GraphSnapshot:
+    """Returns a snapshot of the whole graph loaded from the database"""
+    snapshot = GraphSnapshot()
+    for row in Recommendation.graph_rows():
+        snapshot.add_row(row)
+    return snapshot.finish()
+
+
+class GraphIndex:
+    """Serves source-product lookups from an in-memory CSR snapshot"""
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.refresh_interval = 5.0
+        self.rebuild_interval = 300.0
+        self._snapshot = None
+        self._refresh_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        """Reads the index settings from the app config"""
+        self.app = app
+        self.enabled = app.config.get("GRAPH_INDEX_ENABLED", False)
+        self.refresh_interval = app.config.get("GRAPH_INDEX_REFRESH_SECONDS", 5.0)
+        self.rebuild_interval = app.config.get("GRAPH_INDEX_REBUILD_SECONDS", 300.0)
+        app.extensions["graph_index"] = self
+
+    @property
+    def ready(self) -> bool:
+        """Returns True once the first snapshot has been loaded"""
+        return self._snapshot is not None
+
+    def lookup(
+        self,
+        source_item_id: int,
+        sort_order: str = "desc",
+        valid_only: bool = False,
+        limit: int = None,
+    ):
+        """Returns the serialized Recommendations of a source item
+
+        The result matches Recommendation.serialize_by_source_item_id, or is
+        None while the index is still loading.
+        """
+        self._ensure_started()
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        return snapshot.lookup(source_item_id, sort_order, valid_only, limit)
+
+    def stats(self) -> dict:
+        """Returns the size and age of the loaded snapshot"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {"ready": False}
+        return {
+            "ready": True,
+            "sources": len(snapshot.sources),
+            "edges": snapshot.size,
+            "watermark": snapshot.watermark.isoformat() if snapshot.watermark else None,
+            "age_seconds": round(time.monotonic() - snapshot.built_at, 3),
+        }
+
+    def build(self):
+        """Loads a new snapshot of the whole graph"""
+        with self._refresh_lock, self.app.app_context(), primary_reads():
+            start = time.monotonic()
+            # removals from here on are replayed by the refreshes of this snapshot
+            removed_watermark = datetime.utcnow()
+            # older removals are covered by the snapshots rebuilt since
+            Recommendation.prune_removals(
+                removed_watermark - timedelta(seconds=2 * self.rebuild_interval) - CLOCK_SKEW
+            )
+            snapshot = load_snapshot()
+            snapshot.removed_watermark = removed_watermark
+            self._snapshot = snapshot
+            logger.info(
+                "Graph index built with %d edges in %.2fs",
+                snapshot.size,
+                time.monotonic() - start,
+            )
+
+    def refresh(self):
+        """Reloads the source items changed or removed from since the last refresh"""
+        old = self._snapshot
+        if old is None or time.monotonic() - old.built_at > self.rebuild_interval:
+            self.build()
+            return
+        with self._refresh_lock, self.app.app_context(), primary_reads():
+            changed = Recommendation.changed_since((old.watermark or EPOCH) - CLOCK_SKEW)
+            removed = Recommendation.removed_since((old.removed_watermark or EPOCH) - CLOCK_SKEW)
+            replaced = any(source_item_id is None for source_item_id, _ in removed)
+            if not replaced:
+                affected = self._affected_sources(old, changed)
+                affected.update(source_item_id for source_item_id, _ in removed)
+                if affected:
+                    snapshot = self._merge(old, affected)
+                    snapshot.built_at = old.built_at
+                    snapshot.removed_watermark = max(
+                        [old.removed_watermark or EPOCH] + [removed_at for _, removed_at in removed]
+                    )
+                    self._snapshot = snapshot
+                logger.debug("Graph index refreshed %d source items", len(affected))
+                return
+        logger.info("Graph index rebuilds since the whole table was replaced")
+        self.build()
+
+    @staticmethod
+    def _affected_sources(snapshot, changed) -> set:
+        """Returns the source items whose edges must be reloaded"""
+        affected = set()
+        for rec_id, source_item_id, updated_at in changed:
+            positions = snapshot.segment(source_item_id)
+            position = next((pos for pos in positions if snapshot.ids[pos] == rec_id), None)
+            if position is not None:
+                # rows seen again within CLOCK_SKEW are already up to date
+                if snapshot.updated[position] != _to_micros(updated_at):
+                    affected.add(source_item_id)
+                continue
+            affected.add(source_item_id)
+            # the row is new or moved here from another source item
+            if rec_id <= snapshot.max_id:
+                moved_from = snapshot.source_of(rec_id)
+                if moved_from is not None:
+                    affected.add(moved_from)
+        return affected
+
+    @staticmethod
+    def _merge(old, affected: set):
+        """Returns a snapshot with the affected source items reloaded"""
+        snapshot = GraphSnapshot()
+        reloaded = Recommendation.graph_rows(sorted(affected))
+        pending = next(reloaded, None)
+        for index, source_item_id in enumerate(old.sources):
+            while pending is not None and pending[1] < source_item_id:
+                snapshot.add_row(pending)
+                pending = next(reloaded, None)
+            if source_item_id in affected:
+                while pending is not None and pending[1] == source_item_id:
+                    snapshot.add_row(pending)
+                    pending = next(reloaded, None)
+            else:
+                snapshot.copy_source(old, index)
+        while pending is not None:
+            snapshot.add_row(pending)
+            pending = next(reloaded, None)
+        snapshot.max_id = max(snapshot.max_id, old.max_id)
+        if old.watermark and (snapshot.watermark is None or old.watermark > snapshot.watermark):
+            snapshot.watermark = old.watermark
+        return snapshot.finish()
+
+    def _ensure_started(self):
+        """Starts the refresh thread, once per process so it survives gunicorn forks"""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="graph-index-refresh", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        """Keeps the snapshot fresh"""
+        while True:
+            try:
+                self.refresh()
+            except Exception as error:  # pylint: disable=broad-except
+                logger.error("Error refreshing the graph index: %s", error)
+            time.sleep(self.refresh_interval)
+
+
+graph_index = GraphIndex()
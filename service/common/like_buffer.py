@@ -0,0 +1,125 @@
+"""
+Like Buffer
+
+Write-behind aggregation of Recommendation likes. Increments are kept per
+recommendation id in memory and written with a single batched UPDATE every
+LIKE_BUFFER_FLUSH_MS milliseconds or every LIKE_BUFFER_MAX_EVENTS likes,
+whichever comes first. Likes that failed to flush stay buffered, but the
+buffer never holds more than LIKE_BUFFER_MAX_PENDING likes, counting those
+being flushed: past that add() refuses them and they are written one by one
+again. So at most LIKE_BUFFER_MAX_PENDING likes can be lost if a worker is
+killed, even while the database is down; a normal worker shutdown flushes
+whatever is still pending.
+"""
+import atexit
+import logging
+import os
+import threading
+
+logger = logging.getLogger("flask.app")
+
+
+class LikeBuffer:
+    """Gathers like increments per Recommendation id and flushes them in batches"""
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.flush_interval = 0.5
+        self.max_events = 1000
+        self.max_pending = 10000
+        self._pending = {}
+        self._events = 0
+        self._flushing = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        """Reads the buffer settings from the app config"""
+        self.app = app
+        self.enabled = app.config.get("LIKE_BUFFER_ENABLED", False)
+        self.flush_interval = app.config.get("LIKE_BUFFER_FLUSH_MS", 500) / 1000.0
+        self.max_events = app.config.get("LIKE_BUFFER_MAX_EVENTS", 1000)
+        self.max_pending = app.config.get("LIKE_BUFFER_MAX_PENDING", 10000)
+        app.extensions["like_buffer"] = self
+        atexit.register(self.flush)
+
+    def add(self, recommendation_id: int):
+        """Buffers one like and returns the number still pending for that id
+
+        Returns None without buffering the like when the buffer already holds
+        max_pending likes, the caller must write it itself.
+        """
+        self._ensure_started()
+        with self._lock:
+            if self._events + self._flushing >= self.max_pending:
+                self._wakeup.set()
+                return None
+            count = self._pending.get(recommendation_id, 0) + 1
+            self._pending[recommendation_id] = count
+            self._events += 1
+            if self._events >= self.max_events:
+                self._wakeup.set()
+        return count
+
+    def pending(self, recommendation_id: int) -> int:
+        """Returns the number of buffered likes for a Recommendation id"""
+        with self._lock:
+            return self._pending.get(recommendation_id, 0)
+
+    def flush(self) -> int:
+        """Writes all pending likes to the database and returns how many were written"""
+        # imported here because the models import the app package
+        from service.models import Recommendation  # pylint: disable=import-outside-toplevel
+
+        with self._flush_lock:
+            with self._lock:
+                increments, self._pending = self._pending, {}
+                # still counted against max_pending until they are written
+                self._flushing, self._events = self._events, 0
+            if not increments:
+                return 0
+            try:
+                with self.app.app_context():
+                    Recommendation.add_likes(increments)
+            except Exception as error:  # pylint: disable=broad-except
+                logger.error("Error flushing %d buffered likes: %s", len(increments), error)
+                self._restore(increments)
+                return 0
+            with self._lock:
+                self._flushing = 0
+            return sum(increments.values())
+
+    def _restore(self, increments):
+        """Puts increments that failed to flush back into the buffer"""
+        with self._lock:
+            for recommendation_id, count in increments.items():
+                self._pending[recommendation_id] = self._pending.get(recommendation_id, 0) + count
+            self._events += self._flushing
+            self._flushing = 0
+
+    def _ensure_started(self):
+        """Starts the flush thread, once per process so it survives gunicorn forks"""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="like-buffer-flush", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        """Flushes the buffer every flush_interval or when max_events is reached"""
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+like_buffer = LikeBuffer()
@@ -0,0 +1,330 @@
+"""
+Metrics
+
+Request, database and connection pool metrics in the Prometheus text format,
+served by /metrics:
+
+    http_requests_total                counter    method, endpoint, status
+    http_request_duration_seconds      histogram  method, endpoint
+    http_requests_in_flight            gauge
+    db_queries_total                   counter    operation
+    db_query_duration_seconds          histogram  operation
+    db_pool_*                          gauges and counters of the primary pool
+
+Requests are timed by Flask request hooks and statements by SQLAlchemy
+engine events, each observation is a few dict updates under one lock.
+
+Every gunicorn worker has its own metrics. With METRICS_DIR set, the workers
+write theirs to METRICS_DIR/metrics-<pid>.json every METRICS_FLUSH_SECONDS,
+and the worker that answers /metrics adds up the files of all workers.
+Counters and histograms of workers that exited are kept so the totals never
+go down, the gauges only count the workers that are still running.
+"""
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, request
+from service.common.pool import pool_stats
+from service.common.statement_timer import statement_timer
+
+logger = logging.getLogger("flask.app")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# name: (type, help, label names, buckets of histograms)
+METRICS = {
+    "http_requests_total": (
+        "counter", "Requests handled", ("method", "endpoint", "status"), None
+    ),
+    "http_request_duration_seconds": (
+        "histogram", "Request latency", ("method", "endpoint"), REQUEST_BUCKETS
+    ),
+    "http_requests_in_flight": ("gauge", "Requests being handled", (), None),
+    "db_queries_total": ("counter", "SQL statements executed", ("operation",), None),
+    "db_query_duration_seconds": (
+        "histogram", "SQL statement latency", ("operation",), QUERY_BUCKETS
+    ),
+    "db_pool_size": ("gauge", "Connections kept by the pool", (), None),
+    "db_pool_checked_out": ("gauge", "Connections in use", (), None),
+    "db_pool_overflow": ("gauge", "Connections opened beyond the pool size", (), None),
+    "db_pool_checkouts_total": ("counter", "Connection checkouts", (), None),
+    "db_pool_timeouts_total": ("counter", "Checkouts that timed out", (), None),
+    "db_pool_wait_seconds_total": ("counter", "Time checkouts waited", (), None),
+}
+
+# pool_stats() keys of the pool metrics
+POOL_METRICS = {
+    "db_pool_size": "size",
+    "db_pool_checked_out": "checked_out",
+    "db_pool_overflow": "overflow",
+    "db_pool_checkouts_total": "checkouts",
+    "db_pool_timeouts_total": "timeouts",
+    "db_pool_wait_seconds_total": "wait_seconds_total",
+}
+
+START_KEY = "metrics.start"
+
+
+class Metrics:
+    """Collects the metrics of this worker and renders those of all workers"""
+
+    def __init__(self):
+        self.enabled = False
+        self.directory = None
+        self.flush_interval = 5.0
+        self._app = None
+        self._db = None
+        self._lock = threading.Lock()
+        self._values = {}
+        self._in_flight = 0
+        self._thread = None
+        self._pid = None
+        self.reset()
+
+    def init_app(self, app, db):
+        """Registers the request hooks, the engine events and /metrics"""
+        self.enabled = app.config.get("METRICS_ENABLED", True)
+        self.directory = app.config.get("METRICS_DIR") or None
+        self.flush_interval = app.config.get("METRICS_FLUSH_SECONDS", 5.0)
+        self._app = app
+        self._db = db
+        app.extensions["metrics"] = self
+        if not self.enabled:
+            return
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        statement_timer.subscribe(self._record_statement)
+
+        def metrics_endpoint():
+            """Metrics of all workers in the Prometheus text format"""
+            return Response(self.render(db.engine), content_type=CONTENT_TYPE)
+
+        app.add_url_rule("/metrics", "metrics", metrics_endpoint)
+
+    def reset(self):
+        """Forgets everything collected so far"""
+        with self._lock:
+            self._values = {name: {} for name, spec in METRICS.items() if spec[0] != "gauge"}
+            self._in_flight = 0
+
+    # ------------------------------------------------------------------
+    # Collection
+    # ------------------------------------------------------------------
+    def inc(self, name: str, labels: tuple = (), amount: float = 1):
+        """Adds to a counter"""
+        with self._lock:
+            values = self._values[name]
+            values[labels] = values.get(labels, 0) + amount
+
+    def observe(self, name: str, labels: tuple, value: float):
+        """Adds an observation to a histogram"""
+        buckets = METRICS[name][3]
+        with self._lock:
+            values = self._values[name]
+            counts = values.get(labels)
+            if counts is None:
+                # one count per bucket, then +Inf, then the sum
+                counts = values[labels] = [0] * (len(buckets) + 1) + [0.0]
+            counts[bisect_left(buckets, value)] += 1
+            counts[-1] += value
+
+    def _before_request(self):
+        """Starts timing a request"""
+        self._ensure_started()
+        request.environ[START_KEY] = time.perf_counter()
+        with self._lock:
+            self._in_flight += 1
+
+    def _after_request(self, response):
+        """Records a request that returned a response"""
+        self._finish(response.status_code)
+        return response
+
+    def _teardown_request(self, error=None):
+        """Records a request that failed before returning a response"""
+        if START_KEY in request.environ:
+            self._finish(500 if error is not None else 200)
+
+    def _finish(self, status_code: int):
+        """Records the status and latency of the current request, once"""
+        start = request.environ.pop(START_KEY, None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        endpoint = request.url_rule.rule if request.url_rule else "<unmatched>"
+        self.inc("http_requests_total", (request.method, endpoint, str(status_code)))
+        self.observe("http_request_duration_seconds", (request.method, endpoint), elapsed)
+        with self._lock:
+            self._in_flight -= 1
+
+    def _record_statement(self, statement, parameters, elapsed):  # pylint: disable=unused-argument
+        """Records an executed statement"""
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        self.inc("db_queries_total", (operation,))
+        self.observe("db_query_duration_seconds", (operation,), elapsed)
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+    def snapshot(self, engine=None) -> dict:
+        """Returns the metrics of this worker as JSON-able data"""
+        with self._lock:
+            data = {
+                name: [[list(labels), value if not isinstance(value, list) else list(value)]
+                       for labels, value in values.items()]
+                for name, values in self._values.items()
+            }
+            gauges = {"http_requests_in_flight": self._in_flight}
+        if engine is not None:
+            stats = pool_stats(engine)
+            for name, key in POOL_METRICS.items():
+                if key not in stats:
+                    continue
+                if METRICS[name][0] == "gauge":
+                    gauges[name] = stats[key]
+                else:
+                    data[name] = [[[], stats[key]]]
+        return {"pid": os.getpid(), "values": data, "gauges": gauges}
+
+    def write(self, engine=None):
+        """Writes the metrics of this worker to the metrics directory"""
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, f"metrics-{os.getpid()}.json")
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as handle:
+            json.dump(self.snapshot(engine), handle)
+        os.replace(temporary, path)
+
+    def collect(self, engine=None) -> list:
+        """Returns the snapshots of every worker, this one first"""
+        own = self.snapshot(engine)
+        if not self.directory:
+            return [own]
+        self.write(engine)
+        snapshots = [own]
+        for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+            try:
+                with open(path, encoding="utf-8") as handle:
+                    snapshot = json.load(handle)
+            except (OSError, ValueError):
+                continue
+            if snapshot.get("pid") == own["pid"]:
+                continue
+            if not _is_running(snapshot.get("pid")):
+                snapshot["gauges"] = {}
+            snapshots.append(snapshot)
+        return snapshots
+
+    def render(self, engine=None) -> str:
+        """Returns the metrics of all workers in the Prometheus text format"""
+        return _exposition(_merge(self.collect(engine)))
+
+    def _ensure_started(self):
+        """Starts writing the metrics file, once per process so it survives gunicorn forks"""
+        if not self.directory or (self._thread is not None and self._pid == os.getpid()):
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """Keeps the metrics file of this worker fresh"""
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                with self._app.app_context():
+                    self.write(self._db.engine)
+            except Exception as error:  # pylint: disable=broad-except
+                logger.error("Error writing the metrics file: %s", error)
+
+
+def _merge(snapshots: list) -> dict:
+    """Returns the values of the worker snapshots summed per metric and labels"""
+    values = {name: {} for name in METRICS}
+    for snapshot in snapshots:
+        for name, entries in snapshot["values"].items():
+            merged = values.setdefault(name, {})
+            for labels, value in entries:
+                key = tuple(labels)
+                if isinstance(value, list):
+                    current = merged.get(key) or [0] * len(value)
+                    merged[key] = [a + b for a, b in zip(current, value)]
+                else:
+                    merged[key] = merged.get(key, 0) + value
+        for name, value in snapshot["gauges"].items():
+            merged = values.setdefault(name, {})
+            merged[()] = merged.get((), 0) + value
+    return values
+
+
+def _exposition(values: dict) -> str:
+    """Returns merged values in the Prometheus text format"""
+    lines = []
+    for name, (kind, description, label_names, buckets) in METRICS.items():
+        if not values.get(name) and kind != "gauge":
+            continue
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(values.get(name, {}).items()) or [((), 0)]:
+            if kind == "histogram":
+                lines.extend(_histogram_lines(name, label_names, buckets, labels, value))
+            else:
+                lines.append(f"{name}{{{_labels(label_names, labels)}}} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(name: str, label_names: tuple, buckets: tuple, labels: tuple, value: list):
+    """Yields the cumulative bucket, sum and count samples of a histogram"""
+    label_text = _labels(label_names, labels)
+    cumulative = 0
+    for bound, count in zip(buckets + ("+Inf",), value[:-1]):
+        cumulative += count
+        bucket_labels = _labels(label_names + ("le",), labels + (str(bound),))
+        yield f"{name}_bucket{{{bucket_labels}}} {cumulative}"
+    yield f"{name}_sum{{{label_text}}} {_number(value[-1])}"
+    yield f"{name}_count{{{label_text}}} {cumulative}"
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    """Returns the label text of a sample"""
+    return ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    )
+
+
+def _escape(value) -> str:
+    """Escapes a label value"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value) -> str:
+    """Formats a sample value"""
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def _is_running(pid) -> bool:
+    """Returns True when a process with the pid is still running"""
+    try:
+        os.kill(int(pid), 0)
+    except (OSError, TypeError, ValueError):
+        return False
+    return True
+
+
+metrics = Metrics()
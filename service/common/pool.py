@@ -0,0 +1,69 @@
+"""
+Connection Pool
+
+A QueuePool that also measures how long checkouts wait for a free
+connection, and the statistics of a pool for the /stats endpoint. Waiting
+and timeouts are the first signs of pool exhaustion, e.g. during the
+connection storms of a rolling deploy.
+"""
+import threading
+import time
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+class InstrumentedQueuePool(QueuePool):
+    """A QueuePool that records the time every checkout waited"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        """Gets a connection from the pool, timing how long it took"""
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.timeouts += timed_out
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+
+def pool_stats(engine) -> dict:
+    """Returns the live statistics of the pool of an engine"""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"class": type(pool).__name__}
+    stats = {
+        "class": type(pool).__name__,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,  # pylint: disable=protected-access
+        "timeout": pool.timeout(),
+    }
+    if isinstance(pool, InstrumentedQueuePool):
+        checkouts = pool.checkouts
+        stats.update(
+            {
+                "checkouts": checkouts,
+                "timeouts": pool.timeouts,
+                "wait_seconds_total": round(pool.wait_total, 6),
+                "wait_seconds_max": round(pool.wait_max, 6),
+                "wait_seconds_mean": round(pool.wait_total / checkouts, 6) if checkouts else 0.0,
+            }
+        )
+    return stats
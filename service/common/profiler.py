@@ -0,0 +1,210 @@
+"""
+Request Profiler
+
+On-demand profiling of production requests, turned on with PROFILE_DIR. A
+request is profiled when
+
+- it carries the PROFILE_HEADER header with the PROFILE_TOKEN secret, or
+- it is picked at random, PROFILE_SAMPLE_RATE of all requests.
+
+PROFILE_MODE=cprofile runs the request under cProfile and saves a .prof
+pstats file, PROFILE_MODE=sample samples the stack of the request thread every
+PROFILE_SAMPLE_INTERVAL_MS with much less overhead and saves a .collapsed
+file of folded stacks for flame graph tools. The name of the saved profile is
+returned in the X-Profile-Id header.
+
+PROFILE_DIR keeps at most PROFILE_MAX_FILES profiles of PROFILE_MAX_BYTES in
+total, the oldest are removed first. /admin/profiles lists and downloads them
+for requests with the token.
+"""
+import cProfile
+import hmac
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from flask import request
+
+logger = logging.getLogger("flask.app")
+
+MODES = ("cprofile", "sample")
+EXTENSIONS = {"cprofile": ".prof", "sample": ".collapsed"}
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# the profiler of a request, kept in its environ
+PROFILE_KEY = "profiler.profile"
+
+# names of the profile files, anything else is not served
+NAME_PATTERN = re.compile(r"^[\w.-]+\.(prof|collapsed)$")
+
+
+class Sampler:
+    """Samples the stack of one thread from a background thread"""
+
+    def __init__(self, interval: float, thread_id: int = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.counts = {}
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def enable(self):
+        """Starts sampling"""
+        self._thread.start()
+
+    def disable(self):
+        """Stops sampling"""
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        """Counts the stack of the thread every interval"""
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)  # pylint: disable=protected-access
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if names:
+                stack = ";".join(reversed(names))
+                self.counts[stack] = self.counts.get(stack, 0) + 1
+
+    def dump_stats(self, path: str):
+        """Writes the samples as folded stacks, one `stack count` line each"""
+        with open(path, "w", encoding="utf-8") as handle:
+            for stack, count in sorted(self.counts.items()):
+                handle.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    """Profiles the requests picked by header or sampling rate"""
+
+    def __init__(self):
+        self.directory = None
+        self.header = "X-Profile"
+        self.token = ""
+        self.sample_rate = 0.0
+        self.mode = MODES[0]
+        self.interval = 0.005
+        self.max_files = 20
+        self.max_bytes = 50 * 1024 * 1024
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Registers the request hooks when PROFILE_DIR is set in the app config"""
+        self.directory = app.config.get("PROFILE_DIR") or None
+        self.header = app.config.get("PROFILE_HEADER", "X-Profile")
+        self.token = app.config.get("PROFILE_TOKEN", "")
+        self.sample_rate = app.config.get("PROFILE_SAMPLE_RATE", 0.0)
+        self.mode = app.config.get("PROFILE_MODE", MODES[0])
+        self.interval = app.config.get("PROFILE_SAMPLE_INTERVAL_MS", 5) / 1000
+        self.max_files = app.config.get("PROFILE_MAX_FILES", 20)
+        self.max_bytes = app.config.get("PROFILE_MAX_BYTES", 50 * 1024 * 1024)
+        if self.mode not in MODES:
+            raise ValueError(f"PROFILE_MODE must be one of {', '.join(MODES)}")
+        app.extensions["profiler"] = self
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        app.before_request(self.start)
+        app.after_request(self.stop)
+        app.teardown_request(self.teardown)
+
+    @property
+    def enabled(self) -> bool:
+        """Returns True when profiles can be taken"""
+        return self.directory is not None
+
+    def authorized(self) -> bool:
+        """Returns True when the current request carries the profiling token"""
+        if not self.token:
+            return False
+        return hmac.compare_digest(request.headers.get(self.header, ""), self.token)
+
+    def start(self):
+        """Starts profiling the current request when it was picked"""
+        if not (self.authorized() or (self.sample_rate and random.random() < self.sample_rate)):
+            return
+        if self.mode == "sample":
+            profile = Sampler(self.interval)
+        else:
+            profile = cProfile.Profile()
+        request.environ[PROFILE_KEY] = profile
+        profile.enable()
+
+    def stop(self, response):
+        """Saves the profile of the current request and names it in the response"""
+        name = self._finish()
+        if name is not None:
+            response.headers[PROFILE_ID_HEADER] = name
+        return response
+
+    def teardown(self, error=None):  # pylint: disable=unused-argument
+        """Saves the profile of a request that failed before returning a response"""
+        self._finish()
+
+    def _finish(self):
+        """Stops the profiler of the current request and saves it, once"""
+        profile = request.environ.pop(PROFILE_KEY, None)
+        if profile is None:
+            return None
+        profile.disable()
+        endpoint = request.url_rule.endpoint if request.url_rule else "unmatched"
+        extension = EXTENSIONS["sample" if isinstance(profile, Sampler) else "cprofile"]
+        name = "-".join(
+            (time.strftime("%Y%m%dT%H%M%S"), re.sub(r"\W+", "_", endpoint), uuid.uuid4().hex[:8])
+        ) + extension
+        try:
+            profile.dump_stats(os.path.join(self.directory, name))
+            self.prune()
+        except OSError as error:
+            logger.error("Cannot save profile %s: %s", name, error)
+            return None
+        logger.info("Saved profile %s of %s %s", name, request.method, request.path)
+        return name
+
+    def prune(self):
+        """Removes the oldest profiles beyond PROFILE_MAX_FILES or PROFILE_MAX_BYTES"""
+        with self._lock:
+            profiles = self.profiles()
+            total = sum(profile["size"] for profile in profiles)
+            while profiles and (len(profiles) > self.max_files or total > self.max_bytes):
+                oldest = profiles.pop()
+                total -= oldest["size"]
+                try:
+                    os.remove(os.path.join(self.directory, oldest["name"]))
+                except OSError:
+                    pass
+
+    def profiles(self) -> list:
+        """Returns the saved profiles, newest first"""
+        if not self.directory:
+            return []
+        profiles = []
+        for entry in os.scandir(self.directory):
+            if not NAME_PATTERN.match(entry.name):
+                continue
+            try:
+                info = entry.stat()
+            except OSError:
+                continue
+            profiles.append(
+                {"name": entry.name, "size": info.st_size, "created": info.st_mtime}
+            )
+        profiles.sort(key=lambda profile: profile["created"], reverse=True)
+        return profiles
+
+    def path_of(self, name: str):
+        """Returns the path of a saved profile, None when there is none"""
+        if not self.directory or not NAME_PATTERN.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+
+profiler = Profiler()
@@ -0,0 +1,124 @@
+"""
+Query Log
+
+Optional instrumentation of the SQL statements, turned on with
+QUERY_LOG_ENABLED and hooked to the SQLAlchemy engine events, so the routes
+and models need no changes:
+
+- every statement of a request is counted and timed, and the request logs
+  how many statements it ran and how long they took
+- statements slower than QUERY_LOG_SLOW_MS are logged with their bound
+  parameters
+- a statement that runs QUERY_LOG_REPEAT_THRESHOLD times or more with
+  different parameters during one request is logged as a likely N+1 query
+"""
+import logging
+from flask import has_request_context, request
+from service.common.statement_timer import statement_timer
+
+logger = logging.getLogger("flask.app")
+
+# the QueryStats of a request are kept in its environ, the app context and so
+# g outlive the requests since init_db pushes one
+STATS_KEY = "query_log.stats"
+
+# longest parameters text of a slow query log line
+MAX_PARAMETERS_LENGTH = 1000
+
+
+class QueryStats:
+    """The statements of one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = {}
+
+    def add(self, statement: str, duration: float):
+        """Counts a statement"""
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def repeated(self, threshold: int) -> list:
+        """Returns (statement, count) of the statements run threshold times or more"""
+        return [
+            (statement, count)
+            for statement, count in self.statements.items()
+            if count >= threshold
+        ]
+
+
+class QueryLog:
+    """Counts, times and logs the SQL statements of every request"""
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_seconds = 0.1
+        self.repeat_threshold = 5
+
+    def init_app(self, app):
+        """Listens to the statements of every engine when enabled in the app config"""
+        self.enabled = app.config.get("QUERY_LOG_ENABLED", False)
+        self.slow_seconds = app.config.get("QUERY_LOG_SLOW_MS", 100) / 1000
+        self.repeat_threshold = app.config.get("QUERY_LOG_REPEAT_THRESHOLD", 5)
+        app.extensions["query_log"] = self
+        if not self.enabled:
+            return
+        self.attach()
+        app.after_request(self.log_request)
+
+    def attach(self, engine=None):
+        """Listens to the statements of an engine, or of every engine when none is given"""
+        statement_timer.subscribe(self._record_statement, engine)
+
+    def detach(self, engine=None):
+        """Stops listening to the statements of an engine"""
+        statement_timer.unsubscribe(self._record_statement, engine)
+
+    def _record_statement(self, statement, parameters, duration):
+        """Counts a statement and logs it when it was slow"""
+        if duration >= self.slow_seconds:
+            logger.warning(
+                "Slow query (%.1f ms): %s parameters: %s",
+                duration * 1000,
+                statement,
+                repr(parameters)[:MAX_PARAMETERS_LENGTH],
+            )
+        if has_request_context():
+            stats = request.environ.get(STATS_KEY)
+            if stats is None:
+                stats = request.environ[STATS_KEY] = QueryStats()
+            stats.add(statement, duration)
+
+    def log_request(self, response):
+        """Logs the statements of the request and the repeated ones"""
+        stats = current_stats()
+        if stats is None:
+            return response
+        logger.info(
+            "%s %s ran %d statements in %.1f ms",
+            request.method,
+            request.path,
+            stats.count,
+            stats.duration * 1000,
+        )
+        for statement, count in stats.repeated(self.repeat_threshold):
+            logger.warning(
+                "Possible N+1 query, %s %s ran %d times: %s",
+                request.method,
+                request.path,
+                count,
+                statement,
+            )
+        return response
+
+
+def current_stats():
+    """Returns the QueryStats of the current request, None when nothing ran"""
+    if not has_request_context():
+        return None
+    return request.environ.get(STATS_KEY)
+
+
+query_log = QueryLog()
@@ -0,0 +1,165 @@
+"""
+Read Replicas
+
+Optional routing of reads to the PostgreSQL read replicas listed in
+DATABASE_REPLICA_URIS. Statements go to a replica when
+
+- the request is a GET or HEAD, or the statement runs inside a method
+  decorated with @replica_reads (the read-only classmethods of
+  Recommendation and the read-only POST endpoints), and
+- the session has not written anything yet during the request, so reads
+  that follow a write see it on the primary.
+
+Flushes and INSERT, UPDATE and DELETE statements always go to the primary.
+A session sticks to one replica per request, picked round-robin, or the one
+with the fewest checked out connections with
+DATABASE_REPLICA_POLICY=least-connections.
+Replicas lag behind the primary, so a read right after another request's
+write may still see the old rows. Code that cannot miss such rows, like the
+graph index refresh, runs its reads inside primary_reads().
+"""
+import functools
+import inspect
+import itertools
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine
+from service.common.pool import pool_stats
+
+logger = logging.getLogger("flask.app")
+
+POLICIES = ("round-robin", "least-connections")
+READ_METHODS = ("GET", "HEAD")
+
+# set in the session info once the session wrote during the current request
+WROTE_KEY = "wrote_to_primary"
+# the replica the session reads from during the current request
+REPLICA_KEY = "replica"
+
+_replica_reads = ContextVar("replica_reads", default=False)
+_primary_reads = ContextVar("primary_reads", default=False)
+
+
+@contextmanager
+def primary_reads():
+    """Keeps every read inside on the primary, even those of @replica_reads methods"""
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+
+def replica_reads(function):
+    """Decorates a read-only function so its reads may go to a replica"""
+    if inspect.isgeneratorfunction(function):
+
+        @functools.wraps(function)
+        def generator_wrapper(*args, **kwargs):
+            iterator = function(*args, **kwargs)
+            while True:
+                token = _replica_reads.set(True)
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    _replica_reads.reset(token)
+                yield item
+
+        return generator_wrapper
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        token = _replica_reads.set(True)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+
+    return wrapper
+
+
+class ReplicaRouter:
+    """Holds the replica engines and picks one for every read"""
+
+    def __init__(self):
+        self.engines = []
+        self.policy = POLICIES[0]
+        self._cycle = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app, db):
+        """Creates the replica engines from the app config"""
+        self.configure(
+            app.config.get("DATABASE_REPLICA_URIS", "").split(","),
+            app.config.get("DATABASE_REPLICA_POLICY", POLICIES[0]),
+            app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+        )
+
+        @app.before_request
+        def forget_writes():
+            """Lets every request start reading from the replicas again"""
+            db.session.info.pop(WROTE_KEY, None)
+            db.session.info.pop(REPLICA_KEY, None)
+
+        app.extensions["replica_router"] = self
+
+    def configure(self, uris: list, policy: str = POLICIES[0], engine_options: dict = None):
+        """Replaces the replica engines, no uris turns the routing off"""
+        if policy not in POLICIES:
+            raise ValueError(f"DATABASE_REPLICA_POLICY must be one of {', '.join(POLICIES)}")
+        for engine in self.engines:
+            engine.dispose()
+        options = dict(engine_options or {})
+        self.engines = [create_engine(uri.strip(), **options) for uri in uris if uri.strip()]
+        self.policy = policy
+        self._cycle = itertools.cycle(self.engines) if self.engines else None
+        if self.engines:
+            logger.info("Routing reads to %d replicas, %s", len(self.engines), policy)
+
+    @property
+    def enabled(self) -> bool:
+        """Returns True when there are replicas to route to"""
+        return bool(self.engines)
+
+    def use_replica(self, session) -> bool:
+        """Returns True when the reads of a session may go to a replica"""
+        if not self.engines or session.info.get(WROTE_KEY) or _primary_reads.get():
+            return False
+        if _replica_reads.get():
+            return True
+        return has_request_context() and request.method in READ_METHODS
+
+    def choose(self):
+        """Returns the replica engine for the next session"""
+        if self.policy == "least-connections":
+            return min(self.engines, key=lambda engine: engine.pool.checkedout())
+        with self._lock:
+            return next(self._cycle)
+
+    def stats(self) -> list:
+        """Returns the pool statistics of every replica"""
+        return [pool_stats(engine) for engine in self.engines]
+
+
+replica_router = ReplicaRouter()
+
+
+class RoutingSession(Session):
+    """A Flask-SQLAlchemy session that sends reads to the replicas"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        """Returns a replica for reads, the primary for everything else"""
+        if bind is None and replica_router.enabled:
+            if self._flushing or getattr(clause, "is_dml", False):
+                self.info[WROTE_KEY] = True
+            elif replica_router.use_replica(self):
+                if REPLICA_KEY not in self.info:
+                    self.info[REPLICA_KEY] = replica_router.choose()
+                return self.info[REPLICA_KEY]
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
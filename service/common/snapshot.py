@@ -0,0 +1,195 @@
+"""
+Graph Snapshot File
+
+A file holding the CSR arrays of a GraphSnapshot, so every gunicorn worker
+can map one shared copy of the recommendation graph instead of loading its
+own. The file is a fixed header followed by one fixed-width column after
+the other, the 8-byte columns first so that every column stays aligned:
+
+    header    magic, byte-order marker, sources, edges, watermark
+    sources   int64 x sources
+    offsets   int64 x (sources + 1)
+    ids, targets, likes, created, updated   int64 x edges
+    weights   float64 x edges
+    types, statuses   int8 x edges
+
+The file is written with `flask recs-snapshot` and replaced atomically, so
+readers always see a complete file. MappedSnapshot opens it with mmap and
+casts memoryviews over the columns: lookups read the page cache directly,
+nothing is copied or parsed, and the pages are shared by all the processes
+that map the same file. The snapshot is as fresh as the last time the
+command ran.
+"""
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from service.common.graph_index import GraphSnapshot, load_snapshot, _to_micros, _from_micros
+
+logger = logging.getLogger("flask.app")
+
+MAGIC = b"RECSNAP1"
+BYTE_ORDER_MARKER = 1
+HEADER = struct.Struct("=8sqqqq")
+
+# (attribute, typecode, True when sized by the sources instead of the edges)
+COLUMNS = (
+    ("sources", "q", True),
+    ("offsets", "q", True),
+    ("ids", "q", False),
+    ("targets", "q", False),
+    ("likes", "q", False),
+    ("created", "q", False),
+    ("updated", "q", False),
+    ("weights", "d", False),
+    ("types", "b", False),
+    ("statuses", "b", False),
+)
+
+
+class SnapshotFormatError(Exception):
+    """Used when a file is not a snapshot this version can read"""
+
+
+def write_snapshot(path: str, snapshot: GraphSnapshot = None) -> GraphSnapshot:
+    """Writes a snapshot to a file, loading it from the database when not given
+
+    The file is written next to its destination and renamed over it, so
+    readers never see a partial file.
+    """
+    if snapshot is None:
+        snapshot = load_snapshot()
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as handle:
+            handle.write(
+                HEADER.pack(
+                    MAGIC,
+                    BYTE_ORDER_MARKER,
+                    len(snapshot.sources),
+                    snapshot.size,
+                    _to_micros(snapshot.watermark),
+                )
+            )
+            for name, _, _ in COLUMNS:
+                getattr(snapshot, name).tofile(handle)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    return snapshot
+
+
+class MappedSnapshot(GraphSnapshot):  # pylint: disable=too-many-instance-attributes
+    """A GraphSnapshot whose columns are memoryviews over a mapped file"""
+
+    def __init__(self, path: str):
+        super().__init__()
+        with open(path, "rb") as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        if len(view) < HEADER.size:
+            raise SnapshotFormatError(f"{path} is too short to be a snapshot")
+        magic, marker, sources, edges, watermark = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise SnapshotFormatError(f"{path} is not a recommendation snapshot")
+        if marker != BYTE_ORDER_MARKER:
+            raise SnapshotFormatError(f"{path} was written with another byte order")
+        position = HEADER.size
+        for name, typecode, by_source in COLUMNS:
+            length = sources + (name == "offsets") if by_source else edges
+            end = position + length * struct.calcsize(typecode)
+            if end > len(view):
+                raise SnapshotFormatError(f"{path} is truncated")
+            setattr(self, name, view[position:end].cast(typecode))
+            position = end
+        self.watermark = None if watermark < 0 else _from_micros(watermark)
+        self.max_id = 0
+
+
+class SnapshotReader:
+    """Serves source-product lookups from a mapped snapshot file
+
+    The file is checked at most every check_interval seconds and mapped
+    again when it was replaced.
+    """
+
+    def __init__(self):
+        self.path = None
+        self.check_interval = 5.0
+        self._snapshot = None
+        self._identity = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Reads the snapshot settings from the app config"""
+        self.path = app.config.get("GRAPH_SNAPSHOT_PATH") or None
+        self.check_interval = app.config.get("GRAPH_SNAPSHOT_CHECK_SECONDS", 5.0)
+        self._snapshot = None
+        self._identity = None
+        self._checked = 0.0
+        app.extensions["snapshot_reader"] = self
+
+    @property
+    def enabled(self) -> bool:
+        """Returns True when a snapshot path is configured"""
+        return self.path is not None
+
+    def lookup(
+        self,
+        source_item_id: int,
+        sort_order: str = "desc",
+        valid_only: bool = False,
+        limit: int = None,
+    ):
+        """Returns the serialized Recommendations of a source item
+
+        The result matches Recommendation.serialize_by_source_item_id, or is
+        None when there is no readable snapshot file.
+        """
+        snapshot = self._current()
+        if snapshot is None:
+            return None
+        return snapshot.lookup(source_item_id, sort_order, valid_only, limit)
+
+    def stats(self) -> dict:
+        """Returns the size and watermark of the mapped snapshot"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {"ready": False}
+        return {
+            "ready": True,
+            "path": self.path,
+            "sources": len(snapshot.sources),
+            "edges": snapshot.size,
+            "watermark": snapshot.watermark.isoformat() if snapshot.watermark else None,
+        }
+
+    def _current(self):
+        """Returns the mapped snapshot, mapping the file again when it changed"""
+        if self.path is None:
+            return None
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._checked < self.check_interval:
+            return self._snapshot
+        with self._lock:
+            self._checked = now
+            try:
+                info = os.stat(self.path)
+            except OSError:
+                return self._snapshot
+            identity = (info.st_ino, info.st_mtime_ns, info.st_size)
+            if identity != self._identity:
+                try:
+                    self._snapshot = MappedSnapshot(self.path)
+                    self._identity = identity
+                    logger.info("Mapped snapshot %s", self.path)
+                except (OSError, ValueError, SnapshotFormatError) as error:
+                    logger.error("Cannot map snapshot %s: %s", self.path, error)
+            return self._snapshot
+
+
+snapshot_reader = SnapshotReader()
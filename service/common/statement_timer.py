@@ -0,0 +1,77 @@
+"""
+Statement Timer
+
+Times every SQL statement once, with a single pair of SQLAlchemy engine
+event listeners, and hands the duration to whoever subscribed to it: the
+metrics, the query log and the Server-Timing header. The listeners are only
+registered while there are consumers.
+"""
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# the start times of the running statements of a connection, a stack since
+# statements can run while another one is being executed
+START_KEY = "statement_timer.start"
+
+
+class StatementTimer:
+    """Times the SQL statements of every engine for the subscribed consumers"""
+
+    def __init__(self):
+        # (consumer, engine) pairs, replaced rather than changed so the
+        # listeners can read them without the lock
+        self._consumers = ()
+        self._lock = threading.Lock()
+
+    def subscribe(self, consumer, engine=None):
+        """Calls consumer(statement, parameters, duration) after every statement
+        of the engine, or of every engine when none is given"""
+        with self._lock:
+            if (consumer, engine) in self._consumers:
+                return
+            self._consumers += ((consumer, engine),)
+            if not event.contains(Engine, "after_cursor_execute", self._after_cursor_execute):
+                event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+                event.listen(Engine, "after_cursor_execute", self._after_cursor_execute)
+                event.listen(Engine, "handle_error", self._handle_error)
+
+    def unsubscribe(self, consumer, engine=None):
+        """Stops calling a consumer"""
+        with self._lock:
+            self._consumers = tuple(
+                entry for entry in self._consumers if entry != (consumer, engine)
+            )
+            if not self._consumers and event.contains(
+                Engine, "after_cursor_execute", self._after_cursor_execute
+            ):
+                event.remove(Engine, "before_cursor_execute", self._before_cursor_execute)
+                event.remove(Engine, "after_cursor_execute", self._after_cursor_execute)
+                event.remove(Engine, "handle_error", self._handle_error)
+
+    # pylint: disable=unused-argument
+    def _before_cursor_execute(self, conn, cursor, statement, *args):
+        """Starts timing a statement"""
+        if self._consumers:
+            conn.info.setdefault(START_KEY, []).append(time.perf_counter())
+
+    # pylint: disable=unused-argument, too-many-arguments
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        """Hands the time of a statement to the consumers"""
+        starts = conn.info.get(START_KEY)
+        if not starts:
+            return
+        duration = time.perf_counter() - starts.pop()
+        for consumer, engine in self._consumers:
+            if engine is None or engine is conn.engine:
+                consumer(statement, parameters, duration)
+
+    def _handle_error(self, context):
+        """Forgets the start time of a statement that failed"""
+        connection = context.connection
+        if connection is not None and connection.info.get(START_KEY):
+            connection.info[START_KEY].pop()
+
+
+statement_timer = StatementTimer()
@@ -0,0 +1,151 @@
+"""
+Server Timing
+
+Optional Server-Timing response header, turned on with SERVER_TIMING_ENABLED,
+that splits the time of a request into phases:
+
+    parse       reqparse argument parsing
+    db          SQL statements, from the shared statement timer
+    orm         building model objects from the rows
+    serialize   Recommendation.serialize() and marshalling
+    json        encoding the response body
+    app         the whole request
+
+The model and route layers mark the phases with the span() context manager.
+Spans count their own time only, the time of the spans and statements nested
+inside them goes to those, so the phases never overlap. span() does nothing
+when the header is off or outside of a request.
+"""
+import time
+from contextlib import nullcontext
+from flask import has_request_context, request
+from flask_restx import reqparse
+from service.common.statement_timer import statement_timer
+
+# the Timings of a request, kept in its environ
+TIMINGS_KEY = "server_timing"
+
+PHASES = (
+    ("parse", "Argument parsing"),
+    ("db", "Database"),
+    ("orm", "ORM hydration"),
+    ("serialize", "Serialization"),
+    ("json", "JSON encoding"),
+)
+
+_NO_SPAN = nullcontext()
+
+
+class Timings:
+    """The phase times of one request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.totals = {}
+        # nested time of the open spans, innermost last
+        self.nested = []
+
+    def add(self, name: str, duration: float):
+        """Adds the time of a statement or another leaf phase"""
+        self.totals[name] = self.totals.get(name, 0.0) + duration
+        if self.nested:
+            self.nested[-1] += duration
+
+    def header(self) -> str:
+        """Returns the Server-Timing header value"""
+        entries = [
+            f'{name};dur={self.totals[name] * 1000:.2f};desc="{description}"'
+            for name, description in PHASES
+            if name in self.totals
+        ]
+        total = (time.perf_counter() - self.start) * 1000
+        entries.append(f'app;dur={total:.2f};desc="Total"')
+        return ", ".join(entries)
+
+
+class Span:
+    """Times a phase of a request, without the time of the spans nested inside"""
+
+    __slots__ = ("timings", "name", "start")
+
+    def __init__(self, timings: Timings, name: str):
+        self.timings = timings
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.timings.nested.append(0.0)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        timings = self.timings
+        nested = timings.nested.pop()
+        timings.totals[self.name] = timings.totals.get(self.name, 0.0) + elapsed - nested
+        if timings.nested:
+            timings.nested[-1] += elapsed
+        return False
+
+
+def current_timings():
+    """Returns the Timings of the current request, None when not timed"""
+    if not has_request_context():
+        return None
+    return request.environ.get(TIMINGS_KEY)
+
+
+def span(name: str):
+    """Returns a context manager that adds its time to a phase of the request"""
+    timings = current_timings()
+    if timings is None:
+        return _NO_SPAN
+    return Span(timings, name)
+
+
+class RequestParser(reqparse.RequestParser):
+    """A reqparse.RequestParser that times parse_args() as the parse phase"""
+
+    def parse_args(self, req=None, strict=False):
+        with span("parse"):
+            return super().parse_args(req, strict)
+
+
+class ServerTiming:
+    """Adds the Server-Timing header to the responses"""
+
+    def __init__(self):
+        self.enabled = False
+
+    def init_app(self, app):
+        """Registers the request hooks when enabled in the app config"""
+        self.enabled = app.config.get("SERVER_TIMING_ENABLED", False)
+        app.extensions["server_timing"] = self
+        if not self.enabled:
+            return
+        statement_timer.subscribe(_record_statement)
+        app.before_request(start_timing)
+        app.after_request(add_header)
+
+
+def start_timing():
+    """Starts timing the current request"""
+    request.environ[TIMINGS_KEY] = Timings()
+
+
+def add_header(response):
+    """Adds the Server-Timing header of the current request"""
+    timings = request.environ.pop(TIMINGS_KEY, None)
+    if timings is not None:
+        response.headers["Server-Timing"] = timings.header()
+    return response
+
+
+def _record_statement(statement, parameters, duration):  # pylint: disable=unused-argument
+    """Adds the time of a statement to the db phase"""
+    timings = current_timings()
+    if timings is not None:
+        timings.add("db", duration)
+
+
+server_timing = ServerTiming()
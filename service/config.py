@@ -13,9 +13,104 @@ DATABASE_URI = os.getenv(
 SQLALCHEMY_DATABASE_URI = DATABASE_URI
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+# Connection pool of every worker: DB_POOL_SIZE kept connections plus up to
+# DB_MAX_OVERFLOW more under load, checkouts fail after DB_POOL_TIMEOUT seconds,
+# connections are replaced after DB_POOL_RECYCLE seconds and tested before use
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("true", "1", "yes")
+# pgbouncer in transaction mode hands every transaction to any server
+# connection, so server-side prepared statements must be turned off
+DB_PGBOUNCER_TRANSACTION_MODE = os.getenv(
+    "DB_PGBOUNCER_TRANSACTION_MODE", "false"
+).lower() in ("true", "1", "yes")
+
+# Optional comma separated read replicas, picked round-robin or by
+# least-connections, for the reads of GET requests and read-only methods
+DATABASE_REPLICA_URIS = os.getenv("DATABASE_REPLICA_URIS", "")
+DATABASE_REPLICA_POLICY = os.getenv("DATABASE_REPLICA_POLICY", "round-robin")
+
+SQLALCHEMY_ENGINE_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+if DB_PGBOUNCER_TRANSACTION_MODE:
+    SQLALCHEMY_ENGINE_OPTIONS["connect_args"] = {"prepare_threshold": None}
+
 # Secret for session management
 SECRET_KEY = os.getenv("SECRET_KEY", "s3cr3t-key-shhhh")
 
 LOGGING_LEVEL = logging.INFO
 
+# Write-behind buffering of likes: increments are gathered in memory and
+# flushed as one UPDATE every LIKE_BUFFER_FLUSH_MS or LIKE_BUFFER_MAX_EVENTS likes
+LIKE_BUFFER_ENABLED = os.getenv("LIKE_BUFFER_ENABLED", "false").lower() in ("true", "1", "yes")
+LIKE_BUFFER_FLUSH_MS = int(os.getenv("LIKE_BUFFER_FLUSH_MS", "500"))
+LIKE_BUFFER_MAX_EVENTS = int(os.getenv("LIKE_BUFFER_MAX_EVENTS", "1000"))
+# likes held at most, even while flushes fail, past it likes are written one by one
+LIKE_BUFFER_MAX_PENDING = int(os.getenv("LIKE_BUFFER_MAX_PENDING", "10000"))
+
+# Per-process LRU cache in front of Recommendation.find, a size of 0 disables it
+FIND_CACHE_SIZE = int(os.getenv("FIND_CACHE_SIZE", "1024"))
+FIND_CACHE_TTL = float(os.getenv("FIND_CACHE_TTL", "30"))
+
+# Per-process cache of the serialized source-product lists, SOURCE_CACHE_TTL
+# is the most seconds a list can be stale after another worker changed it
+SOURCE_CACHE_SIZE = int(os.getenv("SOURCE_CACHE_SIZE", "4096"))
+SOURCE_CACHE_TTL = float(os.getenv("SOURCE_CACHE_TTL", "10"))
+
+# Optional in-process index of the whole source -> target graph that serves the
+# source-product lookups. It is refreshed from updated_at every
+# GRAPH_INDEX_REFRESH_SECONDS and rebuilt every GRAPH_INDEX_REBUILD_SECONDS
+GRAPH_INDEX_ENABLED = os.getenv("GRAPH_INDEX_ENABLED", "false").lower() in ("true", "1", "yes")
+GRAPH_INDEX_REFRESH_SECONDS = float(os.getenv("GRAPH_INDEX_REFRESH_SECONDS", "5"))
+GRAPH_INDEX_REBUILD_SECONDS = float(os.getenv("GRAPH_INDEX_REBUILD_SECONDS", "300"))
+
+# Snapshot file written by `flask recs-snapshot` and mapped by every worker to
+# serve source-product lookups, checked for a new version every few seconds
+GRAPH_SNAPSHOT_PATH = os.getenv("GRAPH_SNAPSHOT_PATH", "")
+GRAPH_SNAPSHOT_CHECK_SECONDS = float(os.getenv("GRAPH_SNAPSHOT_CHECK_SECONDS", "5"))
+
+# Number of rows written by each multi-row INSERT of the bulk create endpoint
+BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", "1000"))
+
+# Largest number of ids a single batch lookup may ask for
+BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", "500"))
+
+# Logs the number and duration of the SQL statements of every request, the
+# statements slower than QUERY_LOG_SLOW_MS with their parameters, and the ones
+# repeated QUERY_LOG_REPEAT_THRESHOLD times in one request (N+1 queries)
+QUERY_LOG_ENABLED = os.getenv("QUERY_LOG_ENABLED", "false").lower() in ("true", "1", "yes")
+QUERY_LOG_SLOW_MS = float(os.getenv("QUERY_LOG_SLOW_MS", "100"))
+QUERY_LOG_REPEAT_THRESHOLD = int(os.getenv("QUERY_LOG_REPEAT_THRESHOLD", "5"))
+
+# Adds a Server-Timing header that splits every response time into argument
+# parsing, database, ORM hydration, serialization and JSON encoding
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() in ("true", "1", "yes")
+
+# On-demand profiling of requests that carry PROFILE_HEADER: PROFILE_TOKEN or
+# are sampled at PROFILE_SAMPLE_RATE, saved to PROFILE_DIR as cProfile pstats or
+# sampled folded stacks (PROFILE_MODE cprofile or sample). PROFILE_DIR keeps at
+# most PROFILE_MAX_FILES profiles and PROFILE_MAX_BYTES bytes
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "X-Profile")
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "cprofile")
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "20"))
+PROFILE_MAX_BYTES = int(os.getenv("PROFILE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Prometheus metrics served by /metrics. With METRICS_DIR set, every gunicorn
+# worker writes its metrics there every METRICS_FLUSH_SECONDS and /metrics
+# adds up the metrics of all workers
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("true", "1", "yes")
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
 ERROR_404_HELP = False
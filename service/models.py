@@ -3,15 +3,35 @@ Models for Recommendation
 
 All of the models are stored in this module
 """
+# pylint: disable=too-many-lines
+import base64
+import binascii
+import heapq
+import json
+import math
 from datetime import datetime
 import logging
 from enum import Enum
+from itertools import islice
+from operator import attrgetter
 from flask_sqlalchemy import SQLAlchemy
+from service.common.cache import LRUCache
+from service.common.pool import InstrumentedQueuePool
+from service.common.replicas import RoutingSession, replica_reads
+from service.common.serialization import isoformat
+from service.common.timing import span
 
 logger = logging.getLogger("flask.app")
 
-# Create the SQLAlchemy object to be initialized later in init_db()
-db = SQLAlchemy()
+# Create the SQLAlchemy object to be initialized later in init_db(), its
+# sessions send reads to the replicas when there are any
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+# Column values of recently found Recommendations keyed by id, sized in init_db()
+find_cache = LRUCache()
+
+# Serialized source-product lists tagged with their source_item_id, sized in init_db()
+source_cache = LRUCache()
 
 
 # Function to initialize the database
@@ -44,7 +64,22 @@ class RecommendationStatus(Enum):
     DEPRECATED = 3
 
 
-# pylint: disable=too-many-instance-attributes
+class RecommendationRemoval(db.Model):  # pylint: disable=too-few-public-methods
+    """
+    Records a source item that lost Recommendations by a delete or a move
+
+    Removed rows leave no trace in updated_at, so the graph index reads these
+    to know which source items to reload. A source_item_id of None means the
+    whole table was replaced.
+    """
+
+    __tablename__ = "recommendation_removal"
+    id = db.Column(db.Integer, primary_key=True)
+    source_item_id = db.Column(db.Integer, nullable=True)
+    removed_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+# pylint: disable=too-many-instance-attributes, too-many-public-methods
 class Recommendation(db.Model):
     """
     Class that represents a Recommendation
@@ -52,6 +87,63 @@ class Recommendation(db.Model):
 
     app = None
     __tablename__ = "recommendation"
+    __table_args__ = (
+        # serves the source-product lookups, filtered by status and ordered by weight
+        db.Index(
+            "ix_recommendation_source_status_weight",
+            "source_item_id",
+            "status",
+            "recommendation_weight",
+        ),
+        # serves the unfiltered source-product lookups ordered by weight
+        db.Index(
+            "ix_recommendation_source_weight",
+            "source_item_id",
+            "recommendation_weight",
+        ),
+        # serves keyset pagination ordered by last update
+        db.Index("ix_recommendation_updated_at_id", "updated_at", "id"),
+    )
+
+    # columns that keyset pagination can order by, always with id as tie breaker
+    KEYSET_SORT_KEYS = ("id", "updated_at")
+
+    # ways recommend_for_basket combines the weights of a repeated target
+    BASKET_AGGREGATIONS = ("max", "sum", "likes")
+
+    # columns kept by find_cache, every column of the table
+    CACHE_COLUMNS = (
+        "id",
+        "source_item_id",
+        "target_item_id",
+        "recommendation_type",
+        "recommendation_weight",
+        "status",
+        "number_of_likes",
+        "created_at",
+        "updated_at",
+    )
+    CACHE_COLUMN_SET = frozenset(CACHE_COLUMNS)
+
+    # how serialize() formats the columns that are not JSON values already
+    FIELD_FORMATS = {
+        "recommendation_type": attrgetter("_name_"),
+        "status": attrgetter("_name_"),
+        "created_at": isoformat,
+        "updated_at": isoformat,
+    }
+
+    # columns written by COPY, everything but the generated id
+    COPY_COLUMNS = (
+        "source_item_id",
+        "target_item_id",
+        "recommendation_type",
+        "recommendation_weight",
+        "status",
+        "number_of_likes",
+        "created_at",
+        "updated_at",
+    )
 
     ##################################################
     # Table Schema
@@ -95,6 +187,7 @@ class Recommendation(db.Model):
             self.updated_at = None
             db.session.add(self)
             db.session.commit()
+            source_cache.invalidate_tag(self.source_item_id)
             logger.info("Successfully created Recommendation with ID %s", self.id)
         except Exception as error:
             logger.error("Error creating Recommendation: %s", error)
@@ -103,6 +196,27 @@ class Recommendation(db.Model):
                 "Error creating Recommendation: " + str(error)
             ) from error
 
+    def _insert_values(self, now: datetime) -> dict:
+        """Returns the column values of a new row for a multi-row INSERT"""
+        return {
+            "source_item_id": self.source_item_id,
+            "target_item_id": self.target_item_id,
+            "recommendation_type": self.recommendation_type or RecommendationType.UNKNOWN,
+            "recommendation_weight": self.recommendation_weight,
+            "status": self.status or RecommendationStatus.UNKNOWN,
+            "number_of_likes": self.number_of_likes,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    def copy_row(self, now: datetime = None) -> tuple:
+        """Returns the values of a new row in COPY_COLUMNS order"""
+        now = now or datetime.utcnow()
+        values = self._insert_values(now)
+        values["recommendation_type"] = values["recommendation_type"].name
+        values["status"] = values["status"].name
+        return tuple(values[column] for column in self.COPY_COLUMNS)
+
     def update(self):
         """
         Update a Recommendation to the database
@@ -112,7 +226,17 @@ class Recommendation(db.Model):
             logger.info("Attempting to update Recommendation with ID %s", self.id)
             if not self.id:
                 raise DataValidationError("Update called with empty ID field")
+            # the row may move to another source item, so both lists are stale
+            moved_from = set(db.inspect(self).attrs.source_item_id.history.deleted or ())
+            moved_from.discard(self.source_item_id)
+            source_item_ids = moved_from | {self.source_item_id}
+            now = datetime.utcnow()
+            for source_item_id in moved_from:
+                db.session.add(RecommendationRemoval(source_item_id=source_item_id, removed_at=now))
             db.session.commit()
+            find_cache.invalidate(self.id)
+            for source_item_id in source_item_ids:
+                source_cache.invalidate_tag(source_item_id)
             logger.info("Successfully updated Recommendation with ID %s", self.id)
         except Exception as error:
             logger.error("Error updating Recommendation: %s", error)
@@ -125,26 +249,22 @@ class Recommendation(db.Model):
         """Removes a Recommendation from the data store"""
         logger.info("Deleting %s", self.id)
         db.session.delete(self)
+        db.session.add(
+            RecommendationRemoval(source_item_id=self.source_item_id, removed_at=datetime.utcnow())
+        )
         db.session.commit()
+        find_cache.invalidate(self.id)
+        source_cache.invalidate_tag(self.source_item_id)
 
     def like(self):
         """
         Likes a Recommendation
         """
         logger.info("Liking %s", self.id)
-        try:
-            logger.info("Attempting to like Recommendation with ID %s", self.id)
-            data = self.serialize()
-            data["number_of_likes"] = data["number_of_likes"] + 1
-            self.deserialize(data)
-            db.session.commit()
-            logger.info("Successfully liked Recommendation with ID %s", self.id)
-        except Exception as error:
-            logger.error("Error liking Recommendation: %s", error)
-            db.session.rollback()
+        if self.like_by_id(self.id) is None:
             raise DataValidationError(
-                "Error liking Recommendation: " + str(error)
-            ) from error
+                f"Error liking Recommendation: no Recommendation with ID {self.id}"
+            )
 
     def deactivate(self):
         """
@@ -156,6 +276,8 @@ class Recommendation(db.Model):
         data["status"] = "DEPRECATED"
         self.deserialize(data)
         db.session.commit()
+        find_cache.invalidate(self.id)
+        source_cache.invalidate_tag(self.source_item_id)
         logger.info("Successfully deactivated Recommendation with ID %s", self.id)
 
     def activate(self, status):
@@ -168,24 +290,36 @@ class Recommendation(db.Model):
         data["status"] = status
         self.deserialize(data)
         db.session.commit()
+        find_cache.invalidate(self.id)
+        source_cache.invalidate_tag(self.source_item_id)
         logger.info("Successfully activated Recommendation with ID %s", self.id)
 
     def serialize(self):
-        """Serializes a Recommendation into a dictionary"""
+        """Serializes a Recommendation into a dictionary
+
+        Loaded rows are read straight from the instance state, skipping the
+        attribute instrumentation, and the enum names and timestamps come
+        from their caches.
+        """
+        values = self.__dict__
+        if not self.CACHE_COLUMN_SET <= values.keys():
+            # expired or never loaded, the attributes load what is missing
+            values = {column: getattr(self, column) for column in self.CACHE_COLUMNS}
+        # pylint: disable=protected-access
         recommendation = {
-            "source_item_id": self.source_item_id,
-            "target_item_id": self.target_item_id,
-            "recommendation_type": self.recommendation_type.name,
-            "recommendation_weight": self.recommendation_weight,
-            "status": self.status.name,
-            "number_of_likes": self.number_of_likes,
+            "source_item_id": values["source_item_id"],
+            "target_item_id": values["target_item_id"],
+            "recommendation_type": values["recommendation_type"]._name_,
+            "recommendation_weight": values["recommendation_weight"],
+            "status": values["status"]._name_,
+            "number_of_likes": values["number_of_likes"],
         }
-        if self.id:
-            recommendation["id"] = self.id
-        if self.created_at:
-            recommendation["created_at"] = self.created_at.isoformat()
-        if self.updated_at:
-            recommendation["updated_at"] = self.updated_at.isoformat()
+        if values["id"]:
+            recommendation["id"] = values["id"]
+        if values["created_at"]:
+            recommendation["created_at"] = isoformat(values["created_at"])
+        if values["updated_at"]:
+            recommendation["updated_at"] = isoformat(values["updated_at"])
         return recommendation
 
     def _deserialize_int_field(self, data, key):
@@ -202,6 +336,13 @@ class Recommendation(db.Model):
             f"Invalid type or value for recommendation weight: {value}"
         )
 
+    def _deserialize_timestamp(self, data, key):
+        value = data.get(key)
+        try:
+            return datetime.fromisoformat(value)
+        except (TypeError, ValueError) as error:
+            raise DataValidationError(f"Invalid timestamp for [{key}]: {value}") from error
+
     def deserialize(self, data):
         """
         Deserializes a Recommendation from a dictionary
@@ -209,7 +350,7 @@ class Recommendation(db.Model):
         Args:
             data (dict): A dictionary containing the resource data
         """
-        logger.info("deserialize(%s)", data)
+        logger.debug("deserialize(%s)", data)
         try:
             self.source_item_id = self._deserialize_int_field(data, "source_item_id")
             self.target_item_id = self._deserialize_int_field(data, "target_item_id")
@@ -239,9 +380,9 @@ class Recommendation(db.Model):
         if not self.id and "id" in data:
             self.id = data["id"]
         if not self.created_at and "created_at" in data:
-            self.created_at = datetime.fromisoformat(data["created_at"])
+            self.created_at = self._deserialize_timestamp(data, "created_at")
         if not self.updated_at and "updated_at" in data:
-            self.updated_at = datetime.fromisoformat(data["updated_at"])
+            self.updated_at = self._deserialize_timestamp(data, "updated_at")
         return self
 
     ##################################################
@@ -253,12 +394,24 @@ class Recommendation(db.Model):
         """Initializes the database session"""
         logger.info("Initializing database")
         cls.app = app
+        find_cache.configure(
+            app.config.get("FIND_CACHE_SIZE", 0), app.config.get("FIND_CACHE_TTL", 0)
+        )
+        source_cache.configure(
+            app.config.get("SOURCE_CACHE_SIZE", 0), app.config.get("SOURCE_CACHE_TTL", 0)
+        )
+        # measure how long requests wait for a pooled connection
+        if app.config["SQLALCHEMY_DATABASE_URI"].startswith("postgresql"):
+            app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {}).setdefault(
+                "poolclass", InstrumentedQueuePool
+            )
         # This is where we initialize SQLAlchemy from the Flask app
         db.init_app(app)
         app.app_context().push()
         db.create_all()  # make our sqlalchemy tables
 
     @classmethod
+    @replica_reads
     def all(cls):
         """Returns all of the Recommendation in the database"""
         logger.info("Processing all Recommendation")
@@ -266,7 +419,149 @@ class Recommendation(db.Model):
         return cls.query.all()
 
     @classmethod
-    def paginate(cls, page_index=1, page_size=10, rec_type=None, rec_status=None):
+    def _filters(cls, rec_type=None, rec_status=None) -> list:
+        """Returns the criteria for the optional type and status filters"""
+        filters = []
+        if rec_type:
+            filters.append(Recommendation.recommendation_type == rec_type)
+        if rec_status:
+            filters.append(Recommendation.status == rec_status)
+        return filters
+
+    @classmethod
+    def _projection(cls, fields: list, extra: tuple = ()) -> tuple:
+        """Returns the columns selecting the fields, plus any extra ones, and a
+        function serializing a row of them like serialize() does
+
+        Only the fields end up in the serialized rows, the extra columns are
+        for the caller to read from the raw rows.
+        """
+        names = list(fields) + [name for name in extra if name not in fields]
+        columns = [getattr(cls, name) for name in names]
+        plan = [
+            (position, field, cls.FIELD_FORMATS.get(field))
+            for position, field in enumerate(fields)
+        ]
+
+        def serialize_row(row) -> dict:
+            return {
+                field: row[position] if formatter is None or row[position] is None
+                else formatter(row[position])
+                for position, field, formatter in plan
+            }
+
+        return columns, serialize_row
+
+    @classmethod
+    def _filter_query(cls, rec_type=None, rec_status=None):
+        """Returns a query filtered by the optional type and status"""
+        return cls.query.filter(*cls._filters(rec_type, rec_status))
+
+    @classmethod
+    @replica_reads
+    def graph_rows(cls, source_item_ids=None, batch_size: int = 10000):
+        """Yields the rows of Recommendations grouped by source_item_id
+
+        Within a source item the rows are ordered by descending weight then
+        id, the order of the source-product lookups. Rows are plain tuples in
+        CACHE_COLUMNS order, read through a server-side cursor.
+        Params:
+            source_item_ids: iterable of ints, only yields these source items
+            batch_size: int, rows fetched from the cursor per round trip
+        """
+        logger.info("Streaming Recommendation rows grouped by source item")
+        statement = db.select(*(getattr(cls, column) for column in cls.CACHE_COLUMNS))
+        if source_item_ids is not None:
+            statement = statement.where(cls.source_item_id.in_(list(source_item_ids)))
+        statement = statement.order_by(
+            cls.source_item_id.asc(), cls.recommendation_weight.desc(), cls.id.asc()
+        ).execution_options(yield_per=batch_size)
+        for row in db.session.execute(statement).tuples():
+            yield row
+
+    @classmethod
+    @replica_reads
+    def changed_since(cls, updated_after: datetime) -> list:
+        """Returns (id, source_item_id, updated_at) of the Recommendations updated after a time"""
+        logger.info("Processing Recommendations changed since %s", updated_after)
+        statement = db.select(cls.id, cls.source_item_id, cls.updated_at).where(
+            cls.updated_at > updated_after
+        )
+        return db.session.execute(statement).tuples().all()
+
+    @classmethod
+    @replica_reads
+    def removed_since(cls, removed_after: datetime) -> list:
+        """Returns (source_item_id, removed_at) of the source items that lost
+        Recommendations after a time, None when the whole table was replaced"""
+        logger.info("Processing Recommendations removed since %s", removed_after)
+        statement = db.select(
+            RecommendationRemoval.source_item_id, RecommendationRemoval.removed_at
+        ).where(RecommendationRemoval.removed_at > removed_after)
+        return db.session.execute(statement).tuples().all()
+
+    @classmethod
+    def prune_removals(cls, removed_before: datetime) -> int:
+        """Deletes the removal records older than a time, returns how many"""
+        logger.info("Pruning Recommendation removals before %s", removed_before)
+        result = db.session.execute(
+            db.delete(RecommendationRemoval).where(RecommendationRemoval.removed_at < removed_before)
+        )
+        db.session.commit()
+        return result.rowcount
+
+    @classmethod
+    def truncate(cls, connection):
+        """Deletes every Recommendation within the transaction of a connection"""
+        connection.exec_driver_sql(f"TRUNCATE {cls.__tablename__} RESTART IDENTITY")
+        connection.execute(
+            db.insert(RecommendationRemoval).values(source_item_id=None, removed_at=datetime.utcnow())
+        )
+
+    @classmethod
+    @replica_reads
+    def last_updated_and_count(cls, rec_type=None, rec_status=None) -> tuple:
+        """Returns the latest updated_at and the number of the filtered Recommendations
+
+        Both come from one aggregate query, which makes them a cheap validator
+        for list responses.
+        """
+        logger.info("Processing last update and count of Recommendation")
+        return (
+            db.session.query(db.func.max(cls.updated_at), db.func.count(cls.id))
+            .filter(*cls._filters(rec_type, rec_status))
+            .one()
+        )
+
+    @classmethod
+    @replica_reads
+    def stream(cls, rec_type=None, rec_status=None, batch_size: int = 1000):
+        """Yields every serialized Recommendation in id order with constant memory
+
+        Rows are read through a server-side cursor batch_size at a time
+        instead of loading the whole table like all() does.
+        Params:
+            rec_type: String
+            rec_status: STRING
+            batch_size: int, rows fetched from the cursor per round trip
+        """
+        logger.info("Streaming Recommendation in batches of %d", batch_size)
+        statement = (
+            db.select(cls)
+            .where(*cls._filters(rec_type, rec_status))
+            .order_by(cls.id.asc())
+            .execution_options(yield_per=batch_size)
+        )
+        for recommendation in db.session.execute(statement).scalars():
+            yield recommendation.serialize()
+            # drop the row so the session does not keep every exported object
+            db.session.expunge(recommendation)
+
+    @classmethod
+    @replica_reads
+    def paginate(  # pylint: disable=too-many-arguments
+        cls, page_index=1, page_size=10, rec_type=None, rec_status=None, count=True
+    ):
         """Returns list of the Recommendation in the database,
         with optional pagination, filter rec_type
         Params:
@@ -274,26 +569,500 @@ class Recommendation(db.Model):
             page_size: int
             rec_type: String
             rec_status: STRING
+            count: bool, skips the COUNT(*) query when False
         Returns:
             Array: filtered paginated results
         """
         logger.info("Processing all Recommendation")
 
-        qry = cls.query
-        filters = []
-        if rec_type:
-            filters.append(Recommendation.recommendation_type == rec_type)
-        if rec_status:
-            filters.append(Recommendation.status == rec_status)
-        qry = qry.filter(db.and_(*filters))
+        qry = cls._filter_query(rec_type, rec_status)
 
-        return qry.paginate(page=page_index, per_page=page_size, error_out=False)
+        with span("orm"):
+            return qry.paginate(
+                page=page_index, per_page=page_size, error_out=False, count=count
+            )
+
+    @classmethod
+    @replica_reads
+    def paginate_fields(  # pylint: disable=too-many-arguments
+        cls, fields, page_index=1, page_size=10, rec_type=None, rec_status=None
+    ) -> tuple:
+        """Returns a page of serialized Recommendations with only the given fields
+
+        Selects just the columns of the fields and builds the dicts straight
+        from the rows, without constructing Recommendation objects. Pages are
+        numbered like paginate() does.
+        Returns:
+            Tuple: (items, page, per_page) with the page numbers actually used
+        """
+        logger.info("Processing page of Recommendation fields %s", fields)
+        page_index = max(page_index, 1)
+        page_size = page_size if page_size >= 1 else 20
+        columns, serialize_row = cls._projection(fields)
+        query = (
+            db.select(*columns)
+            .where(*cls._filters(rec_type, rec_status))
+            .limit(page_size)
+            .offset((page_index - 1) * page_size)
+        )
+        rows = db.session.execute(query).all()
+        with span("serialize"):
+            items = [serialize_row(row) for row in rows]
+        return items, page_index, page_size
+
+    @classmethod
+    @replica_reads
+    def paginate_keyset(  # pylint: disable=too-many-arguments, too-many-locals
+        cls,
+        cursor=None,
+        page_size=10,
+        rec_type=None,
+        rec_status=None,
+        sort_key="id",
+        count=False,
+        fields=None,
+    ):
+        """Returns a page of Recommendations that come after the given cursor
+
+        Unlike paginate() this never uses OFFSET, so every page costs the same
+        no matter how deep into the table it is.
+        Params:
+            cursor: String, opaque token returned as next_cursor by the previous page
+            page_size: int
+            rec_type: String
+            rec_status: STRING
+            sort_key: String, one of KEYSET_SORT_KEYS
+            count: bool, also returns the total number of matching rows
+            fields: list, only selects these columns and returns serialized
+                dicts of them instead of Recommendations
+        Returns:
+            Tuple: (items, next_cursor, total), next_cursor is None on the last page
+        """
+        logger.info("Processing keyset page of Recommendation after %s", cursor)
+        if sort_key not in cls.KEYSET_SORT_KEYS:
+            raise DataValidationError(f"Invalid sort key for pagination: {sort_key}")
+        column = getattr(cls, sort_key)
+        page_size = page_size if page_size >= 1 else 20
+
+        qry = cls._filter_query(rec_type, rec_status)
+        total = qry.count() if count else None
+        if fields:
+            columns, serialize_row = cls._projection(fields, (sort_key, "id"))
+            qry = db.select(*columns).where(*cls._filters(rec_type, rec_status))
+        if cursor:
+            last_key, last_id = cls.decode_cursor(cursor, sort_key)
+            qry = qry.filter(db.tuple_(column, cls.id) > (last_key, last_id))
+        qry = qry.order_by(column.asc(), cls.id.asc()).limit(page_size + 1)
+        with span("orm"):
+            items = db.session.execute(qry).all() if fields else qry.all()
+
+        next_cursor = None
+        if len(items) > page_size:
+            items = items[:page_size]
+            next_cursor = cls.encode_cursor(items[-1], sort_key)
+        if fields:
+            with span("serialize"):
+                items = [serialize_row(row) for row in items]
+        return items, next_cursor, total
+
+    @classmethod
+    def encode_cursor(cls, recommendation, sort_key="id"):
+        """Encodes the position of a Recommendation as an opaque cursor"""
+        key = getattr(recommendation, sort_key)
+        if isinstance(key, datetime):
+            key = key.isoformat()
+        raw = json.dumps([sort_key, key, recommendation.id]).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii")
+
+    @classmethod
+    def decode_cursor(cls, cursor, sort_key="id"):
+        """Decodes a cursor created by encode_cursor into (sort key value, id)"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode("ascii"))
+            cursor_sort_key, key, last_id = json.loads(raw)
+            if cursor_sort_key != sort_key or not isinstance(last_id, int):
+                raise ValueError("cursor does not match the requested sort key")
+            if sort_key == "id":
+                key = int(key)
+            else:
+                key = datetime.fromisoformat(key)
+        except (binascii.Error, UnicodeError, TypeError, ValueError) as error:
+            raise DataValidationError(f"Invalid pagination cursor: {cursor}") from error
+        return key, last_id
+
+    @classmethod
+    def create_many(cls, recommendations: list, chunk_size: int = 1000) -> tuple:
+        """
+        Creates many Recommendations with one executemany INSERT per chunk
+
+        Every chunk is committed on its own, so a failing chunk does not undo
+        the chunks that were already written. A chunk that fails is split in
+        halves and retried until only the Recommendations that cannot be
+        written are left, so those are the only ones reported.
+
+        Args:
+            recommendations (list): Recommendations that passed deserialize()
+            chunk_size (int): the number of rows written by each INSERT
+        Returns:
+            tuple: (ids, errors) where ids holds the new id of every
+            Recommendation, or None when it failed, and errors maps the
+            position of every failed Recommendation to the error message
+        """
+        logger.info(
+            "Creating %d Recommendations in chunks of %d", len(recommendations), chunk_size
+        )
+        ids = [None] * len(recommendations)
+        errors = {}
+        for start in range(0, len(recommendations), chunk_size):
+            chunk = recommendations[start:start + chunk_size]
+            now = datetime.utcnow()
+            # pylint: disable=protected-access
+            rows = [recommendation._insert_values(now) for recommendation in chunk]
+            try:
+                # the ids are taken from the sequence up front, so every row
+                # keeps its own id whatever order the rows are written in
+                new_ids = db.session.execute(
+                    db.text(
+                        "SELECT nextval(pg_get_serial_sequence(:table, 'id')) "
+                        "FROM generate_series(1, :count)"
+                    ),
+                    {"table": cls.__tablename__, "count": len(rows)},
+                ).scalars().all()
+            except Exception as error:  # pylint: disable=broad-except
+                logger.error("Error creating Recommendations: %s", error)
+                db.session.rollback()
+                for position in range(start, start + len(chunk)):
+                    errors[position] = "Error creating Recommendation: " + str(error)
+                continue
+            for row, new_id in zip(rows, new_ids):
+                row["id"] = new_id
+            cls._insert_chunk(rows, start, ids, errors)
+        logger.info("Successfully created %d Recommendations", len(ids) - len(errors))
+        return ids, errors
+
+    @classmethod
+    def _insert_chunk(cls, rows: list, start: int, ids: list, errors: dict):
+        """Inserts rows with one executemany INSERT, splitting the rows in halves
+        after a failure until the rows that fail are found on their own"""
+        pending = [(start, rows)]
+        while pending:
+            start, rows = pending.pop()
+            try:
+                # the statement is compiled once and the rows are its parameter sets
+                db.session.execute(db.insert(cls), rows)
+                db.session.commit()
+            except Exception as error:  # pylint: disable=broad-except
+                db.session.rollback()
+                if len(rows) == 1:
+                    logger.error("Error creating Recommendation: %s", error)
+                    errors[start] = "Error creating Recommendation: " + str(error)
+                else:
+                    half = len(rows) // 2
+                    pending += [(start + half, rows[half:]), (start, rows[:half])]
+                continue
+            for position, row in enumerate(rows, start):
+                ids[position] = row["id"]
+            for source_item_id in {row["source_item_id"] for row in rows}:
+                source_cache.invalidate_tag(source_item_id)
+
+    @classmethod
+    def copy_from(cls, recommendations, replace: bool = False) -> int:
+        """
+        Streams Recommendations into the table with COPY FROM STDIN
+
+        Everything runs in a single transaction. In replace mode the rows are
+        first copied into a temporary table, then the existing Recommendations
+        of every source item found in the input are deleted and the new ones
+        are inserted, so readers never see a partially replaced source item.
+
+        Args:
+            recommendations (iterable): Recommendations that passed deserialize()
+            replace (bool): replaces all Recommendations of the imported source items
+        Returns:
+            int: the number of rows copied
+        """
+        logger.info("Copying Recommendations into the database (replace=%s)", replace)
+        now = datetime.utcnow()
+        return cls.copy_rows(
+            (recommendation.copy_row(now) for recommendation in recommendations), replace
+        )
+
+    @classmethod
+    def copy_rows(cls, rows, replace: bool = False) -> int:
+        """
+        Streams rows into the table with COPY FROM STDIN, as copy_from() does
+
+        Args:
+            rows (iterable): tuples of values in COPY_COLUMNS order, with the
+                type and status as enum names
+            replace (bool): replaces all Recommendations of the copied source items
+        Returns:
+            int: the number of rows copied
+        """
+        columns = ", ".join(cls.COPY_COLUMNS)
+        target = cls.__tablename__
+        count = 0
+        try:
+            with db.engine.begin() as connection:
+                with connection.connection.cursor() as cursor:
+                    if replace:
+                        target = "recommendation_import"
+                        cursor.execute(
+                            f"CREATE TEMP TABLE {target} ON COMMIT DROP AS "
+                            f"SELECT {columns} FROM {cls.__tablename__} WITH NO DATA"
+                        )
+                    with cursor.copy(f"COPY {target} ({columns}) FROM STDIN") as copy:
+                        for row in rows:
+                            copy.write_row(row)
+                            count += 1
+                    if replace:
+                        cursor.execute(
+                            f"DELETE FROM {cls.__tablename__} WHERE source_item_id IN "
+                            f"(SELECT DISTINCT source_item_id FROM {target})"
+                        )
+                        cursor.execute(
+                            f"INSERT INTO {RecommendationRemoval.__tablename__} "
+                            f"(source_item_id, removed_at) "
+                            f"SELECT DISTINCT source_item_id, %s FROM {target}",
+                            (datetime.utcnow(),),
+                        )
+                        cursor.execute(
+                            f"INSERT INTO {cls.__tablename__} ({columns}) "
+                            f"SELECT {columns} FROM {target}"
+                        )
+        except Exception as error:
+            logger.error("Error copying Recommendations: %s", error)
+            raise DataValidationError(
+                "Error copying Recommendations: " + str(error)
+            ) from error
+        if replace:
+            find_cache.clear()
+        source_cache.clear()
+        logger.info("Successfully copied %d Recommendations", count)
+        return count
+
+    @classmethod
+    def copy_text(cls, blocks, truncate: bool = False) -> int:
+        """
+        Streams blocks of COPY text format lines into the table
+
+        This skips the per-value conversions of copy_rows(), so it is the
+        fastest way to load generated data. With truncate the table is emptied
+        first and its secondary indexes are dropped during the COPY and built
+        again afterwards. Building an index once over all rows is much faster
+        than maintaining it for every row. Everything runs in one transaction,
+        so a failed load leaves the table and its indexes as they were.
+
+        Args:
+            blocks (iterable): strings of tab separated lines in COPY_COLUMNS
+                order, with the type and status as enum names
+            truncate (bool): replaces every Recommendation in the table
+        Returns:
+            int: the number of rows copied
+        """
+        columns = ", ".join(cls.COPY_COLUMNS)
+        indexes = []
+        count = 0
+        try:
+            with db.engine.begin() as connection:
+                if truncate:
+                    cls.truncate(connection)
+                    # only the indexes the table has, it may predate some of them
+                    existing = {index["name"] for index in db.inspect(connection).get_indexes(cls.__tablename__)}
+                    indexes = sorted(
+                        (index for index in cls.__table__.indexes if index.name in existing),
+                        key=lambda index: index.name,
+                    )
+                for index in indexes:
+                    index.drop(connection)
+                with connection.connection.cursor() as cursor:
+                    with cursor.copy(f"COPY {cls.__tablename__} ({columns}) FROM STDIN") as copy:
+                        for block in blocks:
+                            copy.write(block)
+                            count += block.count("\n")
+                for index in indexes:
+                    index.create(connection)
+        except Exception as error:
+            logger.error("Error copying Recommendations: %s", error)
+            raise DataValidationError(
+                "Error copying Recommendations: " + str(error)
+            ) from error
+        if truncate:
+            find_cache.clear()
+        source_cache.clear()
+        logger.info("Successfully copied %d Recommendations", count)
+        return count
+
+    @classmethod
+    def insert_rows(cls, rows, chunk_size: int = 1000) -> int:
+        """
+        Writes rows into the table with one executemany INSERT per chunk
+
+        Every chunk is committed on its own. The statement is compiled once
+        and the rows are sent as its parameter sets, which is several times
+        faster than a new multi-row VALUES statement per chunk, but still far
+        slower than copy_text().
+
+        Args:
+            rows (iterable): tuples of values in COPY_COLUMNS order, with the
+                type and status as enum names
+            chunk_size (int): the number of rows written by each INSERT
+        Returns:
+            int: the number of rows written
+        """
+        chunk_size = max(chunk_size, 1)
+        logger.info("Inserting rows into the database in chunks of %d", chunk_size)
+        statement = db.insert(cls.__table__)
+        count = 0
+        rows = iter(rows)
+        try:
+            with db.engine.connect() as connection:
+                while True:
+                    chunk = [dict(zip(cls.COPY_COLUMNS, row)) for row in islice(rows, chunk_size)]
+                    if not chunk:
+                        break
+                    connection.execute(statement, chunk)
+                    connection.commit()
+                    count += len(chunk)
+        except Exception as error:
+            logger.error("Error inserting rows: %s", error)
+            raise DataValidationError("Error inserting rows: " + str(error)) from error
+        source_cache.clear()
+        logger.info("Successfully inserted %d Recommendations", count)
+        return count
+
+    @classmethod
+    def like_by_id(cls, recommendation_id: int):
+        """
+        Likes a Recommendation with a single UPDATE ... RETURNING statement
+
+        The increment happens in the database so concurrent likes are never lost.
+        Returns the serialized Recommendation, or None if no row has that id
+        """
+        logger.info("Attempting to like Recommendation with ID %s", recommendation_id)
+        statement = (
+            db.update(cls)
+            .where(cls.id == recommendation_id)
+            .values(number_of_likes=cls.number_of_likes + 1)
+            .returning(cls)
+        )
+        try:
+            recommendation = db.session.execute(statement).scalars().first()
+            # serialize before the commit expires the row and forces a reload
+            data = recommendation.serialize() if recommendation else None
+            db.session.commit()
+            find_cache.invalidate(recommendation_id)
+            if data is not None:
+                source_cache.invalidate_tag(data["source_item_id"])
+        except Exception as error:
+            logger.error("Error liking Recommendation: %s", error)
+            db.session.rollback()
+            raise DataValidationError(
+                "Error liking Recommendation: " + str(error)
+            ) from error
+        if data is None:
+            logger.info("No Recommendation with ID %s to like", recommendation_id)
+        else:
+            logger.info("Successfully liked Recommendation with ID %s", recommendation_id)
+        return data
+
+    @classmethod
+    def add_likes(cls, increments: dict) -> int:
+        """
+        Adds buffered likes to many Recommendations with one UPDATE statement
+
+        Args:
+            increments (dict): maps a Recommendation id to the likes to add
+        Returns:
+            int: the number of rows updated
+        """
+        logger.info("Adding likes to %d Recommendations", len(increments))
+        statement = (
+            db.update(cls)
+            .where(cls.id.in_(increments.keys()))
+            .values(
+                number_of_likes=cls.number_of_likes
+                + db.case(increments, value=cls.id, else_=0)
+            )
+            .returning(cls.source_item_id)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            source_item_ids = db.session.execute(statement).scalars().all()
+            db.session.commit()
+        except Exception as error:
+            logger.error("Error adding likes: %s", error)
+            db.session.rollback()
+            raise DataValidationError("Error adding likes: " + str(error)) from error
+        for recommendation_id in increments:
+            find_cache.invalidate(recommendation_id)
+        for source_item_id in set(source_item_ids):
+            source_cache.invalidate_tag(source_item_id)
+        return len(source_item_ids)
 
     @classmethod
     def find(cls, recommendation_id: int):
-        """Finds a Recommendation by it's ID"""
+        """Finds a Recommendation by it's ID
+
+        Always loads the row through the session, so it is safe to change or
+        delete. The row is kept in find_cache for find_cached().
+        """
         logger.info("Processing lookup for id %s ...", recommendation_id)
-        return cls.query.get(recommendation_id)
+        with span("orm"):
+            recommendation = cls.query.get(recommendation_id)
+        if recommendation is not None:
+            find_cache.set(
+                recommendation.id,
+                {column: getattr(recommendation, column) for column in cls.CACHE_COLUMNS},
+            )
+        return recommendation
+
+    @classmethod
+    def find_cached(cls, recommendation_id: int):
+        """Finds a Recommendation by it's ID for reading only
+
+        Recently found rows are served from find_cache without a query. A hit
+        is not in the session and may be stale, so never change or delete
+        what this returns: use find() for that.
+        """
+        try:
+            values = find_cache.get(int(recommendation_id))
+        except (TypeError, ValueError):
+            values = None
+        if values is None:
+            return cls.find(recommendation_id)
+        logger.info("Processing cached lookup for id %s ...", recommendation_id)
+        return cls(**values)
+
+    @classmethod
+    @replica_reads
+    def serialize_many(cls, recommendation_ids: list) -> dict:
+        """Returns the serialized Recommendations of many ids, keyed by id
+
+        Ids in find_cache cost no query and the others are loaded with a
+        single IN query. Ids that do not exist are left out.
+        """
+        logger.info("Processing lookup for %d ids ...", len(recommendation_ids))
+        found = {}
+        missing = []
+        with span("serialize"):
+            for recommendation_id in recommendation_ids:
+                values = find_cache.get(recommendation_id)
+                if values is None:
+                    missing.append(recommendation_id)
+                else:
+                    found[recommendation_id] = cls(**values).serialize()
+        if missing:
+            with span("orm"):
+                loaded = cls.query.filter(cls.id.in_(missing)).all()
+            with span("serialize"):
+                for recommendation in loaded:
+                    find_cache.set(
+                        recommendation.id,
+                        {column: getattr(recommendation, column) for column in cls.CACHE_COLUMNS},
+                    )
+                    found[recommendation.id] = recommendation.serialize()
+        return found
 
     @classmethod
     def find_or_404(cls, recommendation_id: int):
@@ -302,36 +1071,278 @@ class Recommendation(db.Model):
         return cls.query.get_or_404(recommendation_id)
 
     @classmethod
+    def _order_by_weight(cls, query, sort_order: str = "desc", limit: int = None):
+        """Orders a query by recommendation_weight and applies an optional LIMIT"""
+        if sort_order == "asc":
+            query = query.order_by(cls.recommendation_weight.asc(), cls.id.asc())
+        else:
+            query = query.order_by(cls.recommendation_weight.desc(), cls.id.asc())
+        if limit is not None:
+            query = query.limit(limit)
+        with span("orm"):
+            return query.all()
+
+    @classmethod
+    @replica_reads
     def find_by_source_item_id(
-        cls, source_item_id: int, sort_order: str = "desc"
+        cls, source_item_id: int, sort_order: str = "desc", limit: int = None
     ) -> list:
         """Returns all Recommendations with the given source_item_id,
-        sorted by recommendation_weight"""
+        sorted by recommendation_weight, optionally only the top `limit` ones"""
         logger.info(
             """Processing source id query for %s
              sorting by rec weight in %s order...""",
             source_item_id,
             sort_order,
         )
+        query = cls.query.filter(cls.source_item_id == source_item_id)
+        return cls._order_by_weight(query, sort_order, limit)
+
+    @classmethod
+    @replica_reads
+    def serialize_by_source_item_id(
+        cls,
+        source_item_id: int,
+        sort_order: str = "desc",
+        valid_only: bool = False,
+        limit: int = None,
+    ) -> list:
+        """Returns the serialized Recommendations of a source item
+
+        The lists are kept in source_cache until a model method changes a
+        Recommendation of that source item or SOURCE_CACHE_TTL runs out.
+        Callers must not modify the returned list.
+        """
+        sort_order = "asc" if sort_order == "asc" else "desc"
+        key = (source_item_id, valid_only, sort_order, limit)
+        results = source_cache.get(key)
+        if results is None:
+            if valid_only:
+                found = cls.find_valid_by_source_item_id(source_item_id, sort_order, limit)
+            else:
+                found = cls.find_by_source_item_id(source_item_id, sort_order, limit)
+            with span("serialize"):
+                results = [recommendation.serialize() for recommendation in found]
+            source_cache.set(key, results, tag=source_item_id)
+        return results
+
+    @classmethod
+    @replica_reads
+    def find_by_source_item_ids(
+        cls,
+        source_item_ids: list,
+        sort_order: str = "desc",
+        valid_only: bool = False,
+        limit: int = None,
+    ) -> list:
+        """Returns the Recommendations of many source items with one query
+
+        The result is ordered by source_item_id, then by recommendation_weight.
+        With a limit only the top `limit` of every source item are returned,
+        ranked by a row_number() window partitioned by source_item_id.
+        """
+        logger.info("Processing source id query for %d source items", len(source_item_ids))
         if sort_order == "asc":
-            return (
-                cls.query.filter(cls.source_item_id == source_item_id)
-                .order_by(cls.recommendation_weight.asc())
-                .all()
-            )
-        return (
-            cls.query.filter(cls.source_item_id == source_item_id)
-            .order_by(cls.recommendation_weight.desc())
-            .all()
+            order = (cls.recommendation_weight.asc(), cls.id.asc())
+        else:
+            order = (cls.recommendation_weight.desc(), cls.id.asc())
+        filters = [cls.source_item_id.in_(source_item_ids)]
+        if valid_only:
+            filters.append(cls.status == RecommendationStatus.VALID)
+        query = cls.query
+        if limit is None:
+            query = query.filter(*filters)
+        else:
+            rank = db.func.row_number().over(partition_by=cls.source_item_id, order_by=order)
+            ranked = db.select(cls.id, rank.label("rank")).where(*filters).subquery()
+            query = query.join(ranked, cls.id == ranked.c.id).filter(ranked.c.rank <= limit)
+        with span("orm"):
+            return query.order_by(cls.source_item_id, *order).all()
+
+    @classmethod
+    @replica_reads
+    def serialize_by_source_item_ids(
+        cls,
+        source_item_ids: list,
+        sort_order: str = "desc",
+        valid_only: bool = False,
+        limit: int = None,
+    ) -> dict:
+        """Returns the serialized Recommendations of many source items
+
+        The lists are shared with serialize_by_source_item_id through
+        source_cache, and the source items that are not cached are loaded
+        with a single query. Callers must not modify the returned lists.
+        """
+        sort_order = "asc" if sort_order == "asc" else "desc"
+        grouped = {}
+        missing = []
+        for source_item_id in source_item_ids:
+            results = source_cache.get((source_item_id, valid_only, sort_order, limit))
+            if results is None:
+                missing.append(source_item_id)
+            else:
+                grouped[source_item_id] = results
+        if missing:
+            loaded = {source_item_id: [] for source_item_id in missing}
+            found = cls.find_by_source_item_ids(missing, sort_order, valid_only, limit)
+            with span("serialize"):
+                for recommendation in found:
+                    loaded[recommendation.source_item_id].append(recommendation.serialize())
+            for source_item_id, results in loaded.items():
+                key = (source_item_id, valid_only, sort_order, limit)
+                source_cache.set(key, results, tag=source_item_id)
+            grouped.update(loaded)
+        return grouped
+
+    @classmethod
+    @replica_reads
+    def find_basket_candidates(cls, source_item_ids: list, valid_only: bool = False) -> list:
+        """Returns the (source_item_id, target_item_id, weight, likes) rows of a basket
+
+        Recommendations whose target is already in the basket are left out.
+        """
+        logger.info("Processing basket query for %d source items", len(source_item_ids))
+        query = db.select(
+            cls.source_item_id,
+            cls.target_item_id,
+            cls.recommendation_weight,
+            cls.number_of_likes,
+        ).where(
+            cls.source_item_id.in_(source_item_ids),
+            cls.target_item_id.not_in(source_item_ids),
         )
+        if valid_only:
+            query = query.where(cls.status == RecommendationStatus.VALID)
+        return db.session.execute(query).all()
 
     @classmethod
+    @replica_reads
+    def recommend_for_basket(
+        cls,
+        source_item_ids: list,
+        aggregation: str = "max",
+        limit: int = 10,
+        valid_only: bool = False,
+    ) -> list:
+        """Returns the top targets recommended by the items of a basket
+
+        The weights of a target recommended by several source items are
+        combined with the aggregation: "max" keeps the heaviest, "sum" adds
+        them up and "likes" adds them up with every weight scaled by
+        1 + ln(1 + number_of_likes). Only the top `limit` targets are kept,
+        with a bounded heap instead of sorting all candidates.
+        """
+        if aggregation not in cls.BASKET_AGGREGATIONS:
+            raise DataValidationError(f"Invalid aggregation: {aggregation}")
+        scores = {}
+        sources = {}
+        for source_item_id, target_item_id, weight, likes in cls.find_basket_candidates(
+            source_item_ids, valid_only
+        ):
+            if aggregation == "likes":
+                weight *= 1 + math.log1p(max(likes or 0, 0))
+            score = scores.get(target_item_id)
+            if score is None:
+                scores[target_item_id] = weight
+                sources[target_item_id] = [source_item_id]
+                continue
+            if aggregation == "max":
+                scores[target_item_id] = max(score, weight)
+            else:
+                scores[target_item_id] = score + weight
+            sources[target_item_id].append(source_item_id)
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [
+            {
+                "target_item_id": target_item_id,
+                "score": score,
+                "source_item_ids": sorted(sources[target_item_id]),
+            }
+            for target_item_id, score in top
+        ]
+
+    @classmethod
+    @replica_reads
+    def project_by_source_item_id(  # pylint: disable=too-many-arguments
+        cls,
+        source_item_id: int,
+        fields: list,
+        sort_order: str = "desc",
+        valid_only: bool = False,
+        limit: int = None,
+    ) -> list:
+        """Returns the Recommendations of a source item with only the given fields
+
+        Lists already in source_cache are cut down to the fields, otherwise
+        only the columns of the fields are selected and no Recommendation
+        objects are built.
+        """
+        sort_order = "asc" if sort_order == "asc" else "desc"
+        cached = source_cache.get((source_item_id, valid_only, sort_order, limit))
+        if cached is not None:
+            return [{field: result.get(field) for field in fields} for result in cached]
+        logger.info("Processing source id query for %s fields %s", source_item_id, fields)
+        columns, serialize_row = cls._projection(fields)
+        query = db.select(*columns).where(cls.source_item_id == source_item_id)
+        if valid_only:
+            query = query.where(cls.status == RecommendationStatus.VALID)
+        if sort_order == "asc":
+            query = query.order_by(cls.recommendation_weight.asc(), cls.id.asc())
+        else:
+            query = query.order_by(cls.recommendation_weight.desc(), cls.id.asc())
+        if limit is not None:
+            query = query.limit(limit)
+        rows = db.session.execute(query).all()
+        with span("serialize"):
+            return [serialize_row(row) for row in rows]
+
+    @classmethod
+    @replica_reads
+    def last_updated_and_count_by_source_item_id(
+        cls,
+        source_item_id: int,
+        sort_order: str = "desc",
+        valid_only: bool = False,
+        limit: int = None,
+    ) -> tuple:
+        """Returns the latest updated_at and the number of the Recommendations
+        serialize_by_source_item_id() would return for the same arguments
+
+        Answered from source_cache when the list is cached, otherwise by one
+        aggregate query over just the updated_at of those rows, so conditional
+        requests can be validated without loading the list.
+        """
+        sort_order = "asc" if sort_order == "asc" else "desc"
+        cached = source_cache.get((source_item_id, valid_only, sort_order, limit))
+        if cached is not None:
+            stamps = [result["updated_at"] for result in cached if result.get("updated_at")]
+            return (datetime.fromisoformat(max(stamps)) if stamps else None), len(cached)
+        logger.info("Processing last update and count of source item %s", source_item_id)
+        query = db.select(cls.updated_at).where(cls.source_item_id == source_item_id)
+        if valid_only:
+            query = query.where(cls.status == RecommendationStatus.VALID)
+        if limit is not None:
+            if sort_order == "asc":
+                query = query.order_by(cls.recommendation_weight.asc(), cls.id.asc())
+            else:
+                query = query.order_by(cls.recommendation_weight.desc(), cls.id.asc())
+            query = query.limit(limit)
+        rows = query.subquery()
+        with span("orm"):
+            return db.session.execute(
+                db.select(db.func.max(rows.c.updated_at), db.func.count())
+            ).one()
+
+    @classmethod
+    @replica_reads
     def filter_all_by_status(cls, status):
         """Returns all of recommendations filtered by status in the database"""
         logger.info("Filtering and returning all recommendations by status")
         return cls.query.filter(cls.status == status)
 
     @classmethod
+    @replica_reads
     def find_by_recommendation_type(
         cls, recommendation_type: RecommendationType = RecommendationType.UNKNOWN
     ) -> list:
@@ -351,11 +1362,13 @@ class Recommendation(db.Model):
         return cls.query.filter(cls.recommendation_type == recommendation_type)
 
     @classmethod
+    @replica_reads
     def find_valid_by_source_item_id(
-        cls, source_item_id: int, sort_order: str = "desc"
+        cls, source_item_id: int, sort_order: str = "desc", limit: int = None
     ) -> list:
         """Returns all valid recommendations with the given
-         source_item_id, sorted by recommendation_weight"""
+         source_item_id, sorted by recommendation_weight,
+         optionally only the top `limit` ones"""
         logger.info(
             """Processing valid recommendations query for source item id %s
             with sorting by recommendation weight in %s order.""",
@@ -366,9 +1379,14 @@ class Recommendation(db.Model):
             cls.source_item_id == source_item_id,
             cls.status == RecommendationStatus.VALID,
         )
-        if sort_order == "asc":
-            return query.order_by(cls.recommendation_weight.asc()).all()
-        return query.order_by(cls.recommendation_weight.desc()).all()
+        return cls._order_by_weight(query, sort_order, limit)
+
+    @classmethod
+    @replica_reads
+    def find_top5_by_source_item_id(cls, source_item_id: int) -> list:
+        """Returns the 5 heaviest valid recommendations with the given source_item_id"""
+        logger.info("Processing top 5 query for source item id %s ...", source_item_id)
+        return cls.find_valid_by_source_item_id(source_item_id, "desc", limit=5)
 
     # @classmethod
     # def find_by_target_item_id(cls, target_item_id: int) -> list:
@@ -398,8 +1416,6 @@ class Recommendation(db.Model):
     #     return cls.query.filter(cls.status == recommendation_status)
 
 
-# find_top5_by_source_item_id
-
 # find_top5_by_target_item_id
 
 # find_by_source_item_name_fuzzy
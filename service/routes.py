@@ -6,13 +6,43 @@ Paths:
 GET /recommendations - Returns a list all of the Recommendations
 GET /recommendations/{id} - Returns the Recommendation with a given id number
 POST /recommendations - creates a new Recommendation record in the database
+GET /recommendations/export - streams all of the Recommendations as NDJSON or CSV
+POST /recommendations/bulk - creates many Recommendation records from a JSON array or NDJSON
+GET|POST /recommendations/batch - returns the Recommendations of many ids
+GET /recommendations/source-product - returns the Recommendations of a source item
+GET|POST /recommendations/source-products - returns the Recommendations of many source items
+POST /recommendations/basket - returns the top targets for a basket of items
 PUT /recommendations - updates a Recommendation record in the database
 DELETE /recommendations/{id} - deletes a Recommendation record in the database
 
 """
-from flask_restx import Resource, fields, reqparse
-from service.models import Recommendation, RecommendationType, RecommendationStatus
+# pylint: disable=too-many-lines
+import json
+import math
+from itertools import chain
+from datetime import datetime, timezone
+from flask import Response, request, send_file, stream_with_context
+from flask_restx import Resource, fields, inputs
+from service.models import (
+    db,
+    DataValidationError,
+    find_cache,
+    source_cache,
+    Recommendation,
+    RecommendationType,
+    RecommendationStatus,
+)
 from service.common import status  # HTTP Status Codes
+from service.common.conditional import is_not_modified, last_updated_of, make_validators
+from service.common.export import EXPORT_MIMETYPES, export_lines
+from service.common.graph_index import graph_index
+from service.common.like_buffer import like_buffer
+from service.common.pool import pool_stats
+from service.common.profiler import profiler
+from service.common.replicas import replica_router
+from service.common.serialization import Marshaller, output_json
+from service.common.snapshot import snapshot_reader
+from service.common.timing import RequestParser, span
 from . import app, api  # Import Flask application
 
 
@@ -25,6 +55,49 @@ def health():
     return {"status": "OK"}, status.HTTP_200_OK
 
 
+######################################################################
+# GET CACHE STATISTICS
+######################################################################
+@app.route("/stats")
+def stats():
+    """Cache and connection pool Statistics of this worker"""
+    return {
+        "find_cache": find_cache.stats(),
+        "source_cache": source_cache.stats(),
+        "graph_index": graph_index.stats(),
+        "snapshot": snapshot_reader.stats(),
+        "pool": pool_stats(db.engine),
+        "replicas": replica_router.stats(),
+    }, status.HTTP_200_OK
+
+
+######################################################################
+# LIST AND DOWNLOAD PROFILES
+######################################################################
+@app.route("/admin/profiles")
+def list_profiles():
+    """Profiles saved by this pod, newest first, for requests with the profiling token"""
+    check_profiler_access()
+    return [
+        {
+            "name": profile["name"],
+            "size": profile["size"],
+            "created": datetime.fromtimestamp(profile["created"], timezone.utc).isoformat(),
+        }
+        for profile in profiler.profiles()
+    ], status.HTTP_200_OK
+
+
+@app.route("/admin/profiles/<name>")
+def download_profile(name):
+    """Downloads a saved profile"""
+    check_profiler_access()
+    path = profiler.path_of(name)
+    if path is None:
+        abort(status.HTTP_404_NOT_FOUND, f"Profile {name} was not found.")
+    return send_file(path, mimetype="application/octet-stream", as_attachment=True)
+
+
 ######################################################################
 # Configure the Root route before OpenAPI
 ######################################################################
@@ -78,8 +151,73 @@ recommendation_model = api.inherit(
     },
 )
 
+source_products_model = api.model(
+    "SourceProductsQuery",
+    {
+        "source_item_ids": fields.List(
+            fields.Integer, required=True, description="Source item ids to look up"
+        ),
+        "sort_order": fields.String(description="Sort recommendations by weight"),
+        "status": fields.String(description="Filter recommendations by status"),
+        "limit": fields.Integer(description="Only return the top N recommendations by weight"),
+    },
+)
+
+
+ids_model = api.model(
+    "RecommendationIds",
+    {
+        "ids": fields.List(
+            fields.Integer, required=True, description="Ids of the Recommendations to read"
+        ),
+    },
+)
+
+
+basket_model = api.model(
+    "BasketQuery",
+    {
+        "source_item_ids": fields.List(
+            fields.Integer, required=True, description="Item ids in the basket"
+        ),
+        "aggregation": fields.String(
+            enum=Recommendation.BASKET_AGGREGATIONS,
+            description="How the weights of a target recommended by several items combine",
+        ),
+        "limit": fields.Integer(description="Number of targets to return"),
+        "status": fields.String(description="Filter recommendations by status"),
+    },
+)
+
+basket_result_model = api.model(
+    "BasketRecommendation",
+    {
+        "target_item_id": fields.Integer(description="Recommended item id"),
+        "score": fields.Float(description="Combined weight of the target"),
+        "source_item_ids": fields.List(
+            fields.Integer, description="Basket items that recommend the target"
+        ),
+    },
+)
+
+
+def id_list(value) -> list:
+    """Parses a comma separated list, or a JSON array, of integer ids"""
+    parts = value if isinstance(value, list) else str(value).split(",")
+    ids = [int(part) for part in parts if str(part).strip()]
+    if not ids:
+        raise ValueError("at least one id is required")
+    return ids
+
+
+# skips marshalling the dicts of Recommendation.serialize(), which already
+# match recommendation_model, and encodes the responses with the fast encoder
+marshal_recommendation = Marshaller(recommendation_model)
+api.representation("application/json")(output_json)
+
+
 # query string arguments
-rec_args = reqparse.RequestParser()
+rec_args = RequestParser()
 rec_args.add_argument(
     "page-index",
     type=int,
@@ -112,7 +250,68 @@ rec_args.add_argument(
     default=None,
     help="Filter recommendations by status",
 )
-sp_args = reqparse.RequestParser()
+rec_args.add_argument(
+    "cursor",
+    type=str,
+    location="args",
+    required=False,
+    default=None,
+    help="Keyset pagination cursor, pass an empty value to start from the beginning",
+)
+rec_args.add_argument(
+    "sort-key",
+    type=str,
+    location="args",
+    required=False,
+    default="id",
+    choices=Recommendation.KEYSET_SORT_KEYS,
+    help="Column that keyset pagination orders by",
+)
+rec_args.add_argument(
+    "include-total",
+    type=inputs.boolean,
+    location="args",
+    required=False,
+    default=None,
+    help="Whether to count all matching rows (default on for offset paging only)",
+)
+rec_args.add_argument(
+    "fields",
+    type=str,
+    location="args",
+    required=False,
+    default=None,
+    help="Comma separated fields of recommendation_model to return, all by default",
+)
+export_args = RequestParser()
+export_args.add_argument(
+    "format",
+    type=str,
+    location="args",
+    required=False,
+    default="ndjson",
+    choices=tuple(EXPORT_MIMETYPES),
+    help="Export format",
+)
+export_args.add_argument(
+    "type",
+    type=str,
+    location="args",
+    required=False,
+    default=None,
+    choices=RecommendationType._member_names_,  # pylint: disable=protected-access
+    help="Filter recommendations by type",
+)
+export_args.add_argument(
+    "status",
+    type=str,
+    location="args",
+    required=False,
+    default=None,
+    choices=RecommendationStatus._member_names_,  # pylint: disable=protected-access
+    help="Filter recommendations by status",
+)
+sp_args = RequestParser()
 sp_args.add_argument(
     "source_item_id",
     type=int,
@@ -136,6 +335,82 @@ sp_args.add_argument(
     default=None,
     help="Filter recommendations by status",
 )
+sp_args.add_argument(
+    "limit",
+    type=int,
+    location="args",
+    required=False,
+    default=None,
+    help="Only return the top N recommendations by weight",
+)
+sp_args.add_argument(
+    "fields",
+    type=str,
+    location="args",
+    required=False,
+    default=None,
+    help="Comma separated fields of recommendation_model to return, all by default",
+)
+sps_args = RequestParser()
+sps_args.add_argument(
+    "source_item_ids",
+    type=id_list,
+    location="args",
+    required=True,
+    action="append",
+    help="Comma separated source item ids of the Recommendations",
+)
+for argument in sp_args.args[1:]:
+    sps_args.add_argument(argument)
+# the same arguments taken from a JSON body
+sps_body = sps_args.copy()
+for argument in sps_body.args:
+    argument.location = "json"
+ids_args = RequestParser()
+ids_args.add_argument(
+    "ids",
+    type=id_list,
+    location="args",
+    required=True,
+    action="append",
+    help="Comma separated ids of the Recommendations",
+)
+ids_body = ids_args.copy()
+ids_body.args[0].location = "json"
+basket_args = RequestParser()
+basket_args.add_argument(
+    "source_item_ids",
+    type=id_list,
+    location="json",
+    required=True,
+    action="append",
+    help="Item ids in the basket",
+)
+basket_args.add_argument(
+    "aggregation",
+    type=str,
+    location="json",
+    required=False,
+    default="max",
+    choices=Recommendation.BASKET_AGGREGATIONS,
+    help="How the weights of a target recommended by several items combine",
+)
+basket_args.add_argument(
+    "limit",
+    type=int,
+    location="json",
+    required=False,
+    default=10,
+    help="Number of targets to return",
+)
+basket_args.add_argument(
+    "status",
+    type=str,
+    location="json",
+    required=False,
+    default=None,
+    help="Filter recommendations by status",
+)
 
 ######################################################################
 #  PATH: /recommendations/{id}
@@ -158,8 +433,9 @@ class RecommendationResource(Resource):
     # RETRIEVE A Recommendation
     # ------------------------------------------------------------------
     @api.doc("get_recommendation")
+    @api.response(200, "Success", recommendation_model)
+    @api.response(304, "Recommendation not modified")
     @api.response(404, "Recommendation not found")
-    @api.marshal_with(recommendation_model)
     def get(self, rec_id):
         """
         Retrieve a single Recommendation
@@ -167,13 +443,20 @@ class RecommendationResource(Resource):
         This endpoint will return a Recommendation based on it's id
         """
         app.logger.info("Request to Retrieve a pet with id [%s]", rec_id)
-        recommendation = Recommendation.find(rec_id)
+        recommendation = Recommendation.find_cached(rec_id)
         if not recommendation:
             abort(
                 status.HTTP_404_NOT_FOUND,
                 "404 Not Found",
             )
-        return recommendation.serialize(), status.HTTP_200_OK
+        headers = make_validators(recommendation.updated_at, recommendation.id)
+        if is_not_modified(headers):
+            return "", status.HTTP_304_NOT_MODIFIED, headers
+        return (
+            marshal_recommendation(recommendation.serialize()),
+            status.HTTP_200_OK,
+            headers,
+        )
 
     # ------------------------------------------------------------------
     # UPDATE AN EXISTING Recommendation
@@ -182,7 +465,7 @@ class RecommendationResource(Resource):
     @api.response(404, "Recommendation not found")
     @api.response(400, "The posted Recommendation data was not valid")
     @api.expect(recommendation_model)
-    @api.marshal_with(recommendation_model)
+    @api.response(200, "Success", recommendation_model)
     def put(self, rec_id):
         """
         Update a Recommendation
@@ -208,7 +491,7 @@ class RecommendationResource(Resource):
         recommendation.deserialize(data)
         recommendation.id = rec_id
         recommendation.update()
-        return recommendation.serialize(), status.HTTP_200_OK
+        return marshal_recommendation(recommendation.serialize()), status.HTTP_200_OK
 
     # ------------------------------------------------------------------
     # DELETE A Recommendation
@@ -242,6 +525,7 @@ class RecommendationCollection(Resource):
     # ------------------------------------------------------------------
     @api.doc("list_recommendations")
     @api.expect(rec_args, validate=True)
+    @api.response(304, "Recommendations not modified")
     def get(self):
         """Returns all of the Recommendations"""
         app.logger.info("Request to list Recommendations...")
@@ -250,31 +534,92 @@ class RecommendationCollection(Resource):
         page_size = args["page-size"]
         rec_type = args["type"]
         rec_status = args["status"]
+        field_names = parse_fields(args["fields"])
 
         if rec_type is not None:
             app.logger.info("Find by recommendation type: %s", rec_type)
         if rec_status is not None:
             app.logger.info("Find by recommendation status: %s", rec_status)
 
-        paginated_recommendations = Recommendation.paginate(
-            page_index=page_index,
+        # the total doubles as validator: one aggregate query gives the ETag
+        # and the count, and a match skips loading the page altogether
+        include_total = args["include-total"]
+        if include_total is None:
+            include_total = args["cursor"] is None
+        total = None
+        headers = {}
+        if include_total:
+            last_updated, total = Recommendation.last_updated_and_count(
+                rec_type, rec_status
+            )
+            # every page, filter and projection of the same rows has its own ETag
+            headers = make_validators(
+                last_updated, "list", total, page_index, page_size, rec_type, rec_status,
+                args["cursor"], args["sort-key"], *(field_names or ()),
+            )
+            if is_not_modified(headers):
+                return "", status.HTTP_304_NOT_MODIFIED, headers
+
+        if args["cursor"] is not None:
+            return self._keyset_page(args, field_names, total, headers)
+
+        if field_names:
+            items, page_index, page_size = Recommendation.paginate_fields(
+                field_names, page_index, page_size, rec_type, rec_status
+            )
+        else:
+            paginated_recommendations = Recommendation.paginate(
+                page_index=page_index,
+                page_size=page_size,
+                rec_type=rec_type,
+                rec_status=rec_status,
+                count=False,
+            )
+            page_index = paginated_recommendations.page
+            page_size = paginated_recommendations.per_page
+            with span("serialize"):
+                items = [
+                    recommendation.serialize()
+                    for recommendation in paginated_recommendations.items
+                ]
+
+        results = {
+            "page": page_index,
+            "per_page": page_size,
+            "items": items,
+        }
+        if total is not None:
+            results["total"] = total
+            results["pages"] = math.ceil(total / page_size)
+        app.logger.info("Returning %d recommendations", len(results["items"]))
+        return results, status.HTTP_200_OK, headers
+
+    @staticmethod
+    def _keyset_page(args, field_names, total, headers):
+        """Returns the page of Recommendations that follows args["cursor"]"""
+        app.logger.info("Keyset page after cursor [%s]", args["cursor"])
+        # bad page sizes fall back to 20 like the offset pages do
+        page_size = args["page-size"] if args["page-size"] >= 1 else 20
+        items, next_cursor, _ = Recommendation.paginate_keyset(
+            cursor=args["cursor"],
             page_size=page_size,
-            rec_type=rec_type,
-            rec_status=rec_status,
+            rec_type=args["type"],
+            rec_status=args["status"],
+            sort_key=args["sort-key"],
+            fields=field_names,
         )
-
+        if not field_names:
+            with span("serialize"):
+                items = [recommendation.serialize() for recommendation in items]
         results = {
-            "page": paginated_recommendations.page,
-            "per_page": paginated_recommendations.per_page,
-            "total": paginated_recommendations.total,
-            "pages": paginated_recommendations.pages,
-            "items": [
-                recommendation.serialize()
-                for recommendation in paginated_recommendations.items
-            ],
+            "per_page": page_size,
+            "next_cursor": next_cursor,
+            "items": items,
         }
+        if total is not None:
+            results["total"] = total
         app.logger.info("Returning %d recommendations", len(results["items"]))
-        return results, status.HTTP_200_OK
+        return results, status.HTTP_200_OK, headers
 
     # ------------------------------------------------------------------
     # ADD A NEW RECOMMENDATION
@@ -282,7 +627,7 @@ class RecommendationCollection(Resource):
     @api.doc("create_recommendation")
     @api.response(400, "The posted data was not valid")
     @api.expect(create_model)
-    @api.marshal_with(recommendation_model, code=201)
+    @api.response(201, "Recommendation created", recommendation_model)
     def post(self):
         """
         Creates a Recommendation
@@ -298,12 +643,171 @@ class RecommendationCollection(Resource):
             RecommendationResource, rec_id=recommendation.id, _external=True
         )
         return (
-            recommendation.serialize(),
+            marshal_recommendation(recommendation.serialize()),
             status.HTTP_201_CREATED,
             {"Location": location_url},
         )
 
 
+######################################################################
+#  PATH: /recommendations/export
+######################################################################
+@api.route("/recommendations/export", strict_slashes=False)
+class ExportResource(Resource):
+    """Streams the whole collection of Recommendations"""
+
+    @api.doc("export_recommendations")
+    @api.expect(export_args, validate=True)
+    def get(self):
+        """
+        Exports all of the Recommendations
+
+        This endpoint streams every Recommendation, optionally filtered by type
+        and status, as NDJSON or CSV straight from a server-side cursor.
+        """
+        app.logger.info("Request to Export Recommendations")
+        args = export_args.parse_args()
+        records = Recommendation.stream(rec_type=args["type"], rec_status=args["status"])
+        return Response(
+            stream_with_context(export_lines(records, args["format"])),
+            mimetype=EXPORT_MIMETYPES[args["format"]],
+            status=status.HTTP_200_OK,
+        )
+
+
+######################################################################
+#  PATH: /recommendations/batch
+######################################################################
+@api.route("/recommendations/batch", strict_slashes=False)
+class BatchResource(Resource):
+    """Handles reading many Recommendations by their ids at once"""
+
+    @api.doc("get_recommendations_by_ids")
+    @api.expect(ids_args, validate=True)
+    @api.response(400, "Recommendation IDs are required")
+    def get(self):
+        """
+        Retrieve many Recommendations
+
+        Takes a comma separated list of ids and returns the Recommendations in
+        the order they were asked for, with the ids that were not found listed
+        under "missing".
+        """
+        app.logger.info("Request to Retrieve many Recommendations")
+        return self._read(ids_args.parse_args())
+
+    @api.doc("get_recommendations_by_ids_in_body")
+    @api.expect(ids_model)
+    @api.response(400, "Recommendation IDs are required")
+    def post(self):
+        """
+        Retrieve many Recommendations whose ids are given in a JSON body
+        """
+        app.logger.info("Request to Retrieve many Recommendations")
+        return self._read(ids_body.parse_args())
+
+    @staticmethod
+    def _read(args):
+        """Returns the Recommendations of the parsed ids"""
+        rec_ids = list(dict.fromkeys(chain.from_iterable(args["ids"])))
+        if len(rec_ids) > app.config["BATCH_MAX_IDS"]:
+            abort(
+                status.HTTP_400_BAD_REQUEST,
+                f"At most {app.config['BATCH_MAX_IDS']} ids can be read at once",
+            )
+        found = Recommendation.serialize_many(rec_ids)
+        items = [found[rec_id] for rec_id in rec_ids if rec_id in found]
+        missing = [rec_id for rec_id in rec_ids if rec_id not in found]
+        app.logger.info("Returning %d Recommendations, %d missing", len(items), len(missing))
+        return {
+            "items": marshal_recommendation(items),
+            "missing": missing,
+        }, status.HTTP_200_OK
+
+
+######################################################################
+#  PATH: /recommendations/bulk
+######################################################################
+@api.route("/recommendations/bulk", strict_slashes=False)
+class BulkResource(Resource):
+    """Handles creating many Recommendations with a single request"""
+
+    NDJSON_MIMETYPES = ("application/x-ndjson", "application/jsonl")
+
+    @api.doc("create_recommendations_in_bulk")
+    @api.response(400, "None of the posted Recommendations were valid")
+    @api.response(415, "The body was neither a JSON array nor NDJSON")
+    @api.expect([create_model])
+    def post(self):
+        """
+        Creates many Recommendations
+
+        This endpoint accepts a JSON array or NDJSON (one Recommendation per line).
+        Valid Recommendations are written in chunks with executemany INSERTs and
+        invalid ones are reported by their position without failing the batch.
+        """
+        app.logger.info("Request to Create Recommendations in bulk")
+        items, errors = self._parse_items()
+        if not items and not errors:
+            abort(status.HTTP_400_BAD_REQUEST, "No Recommendations in the request body")
+
+        recommendations = []
+        indexes = []
+        for item_index, item in items:
+            try:
+                recommendations.append(Recommendation().deserialize(item))
+                indexes.append(item_index)
+            except DataValidationError as error:
+                errors.append({"index": item_index, "message": str(error)})
+
+        ids, failed = Recommendation.create_many(
+            recommendations, app.config["BULK_INSERT_CHUNK_SIZE"]
+        )
+        created = []
+        for position, new_id in enumerate(ids):
+            if position in failed:
+                errors.append({"index": indexes[position], "message": failed[position]})
+            else:
+                created.append({"index": indexes[position], "id": new_id})
+        errors.sort(key=lambda error: error["index"])
+
+        app.logger.info(
+            "Created %d Recommendations in bulk, %d failed", len(created), len(errors)
+        )
+        results = {
+            "created": len(created),
+            "failed": len(errors),
+            "items": created,
+            "errors": errors,
+        }
+        if not created:
+            return results, status.HTTP_400_BAD_REQUEST
+        return results, status.HTTP_201_CREATED
+
+    def _parse_items(self):
+        """Returns the (index, item) pairs of the body and the lines that were not JSON"""
+        if request.mimetype == "application/json":
+            data = request.get_json(silent=True)
+            if not isinstance(data, list):
+                abort(status.HTTP_400_BAD_REQUEST, "Request body must be a JSON array")
+            return list(enumerate(data)), []
+        if request.mimetype in self.NDJSON_MIMETYPES:
+            items = []
+            errors = []
+            lines = [line for line in request.get_data(as_text=True).splitlines() if line.strip()]
+            for line_index, line in enumerate(lines):
+                try:
+                    items.append((line_index, json.loads(line)))
+                except ValueError as error:
+                    errors.append({"index": line_index, "message": f"Invalid JSON: {error}"})
+            return items, errors
+        abort(
+            status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            f"Content-Type must be application/json or {self.NDJSON_MIMETYPES[0]}",
+        )
+        return [], []
+
+
 ######################################################################
 #  PATH: /recommendations/<int:recommendation_id>/like
 ######################################################################
@@ -321,17 +825,37 @@ class LikeResource(Resource):
         This endpoint will like a Recommendation based the id specified in the path
         """
         app.logger.info("Request to Like a Pet")
+        if like_buffer.enabled:
+            response = self._buffered_like(rec_id)
+            if response is not None:
+                return response
+        recommendation = Recommendation.like_by_id(rec_id)
+        if not recommendation:
+            abort(
+                status.HTTP_404_NOT_FOUND,
+                f"Recommendation with id [{rec_id}] was not found.",
+            )
+        app.logger.info("Recommendation with id [%s] has been liked!", rec_id)
+        return recommendation, status.HTTP_200_OK
+
+    @staticmethod
+    def _buffered_like(rec_id):
+        """Buffers the like and returns the best estimate of the like count,
+        or None when the buffer is full and the like must be written now"""
         recommendation = Recommendation.find(rec_id)
         if not recommendation:
             abort(
                 status.HTTP_404_NOT_FOUND,
                 f"Recommendation with id [{rec_id}] was not found.",
             )
-        recommendation.like()
-        app.logger.info(
-            "Recommendation with id [%s] has been liked!", recommendation.id
-        )
-        return recommendation.serialize(), status.HTTP_200_OK
+        pending = like_buffer.add(rec_id)
+        if pending is None:
+            app.logger.warning("Like buffer is full, writing the like for [%s] now", rec_id)
+            return None
+        data = recommendation.serialize()
+        data["number_of_likes"] += pending
+        app.logger.info("Like for Recommendation with id [%s] was buffered", rec_id)
+        return data, status.HTTP_200_OK
 
 
 ######################################################################
@@ -343,6 +867,7 @@ class ReadListResource(Resource):
     @api.doc("read_recommendations_by_source_type")
     @api.expect(sp_args, validate=True)
     @api.response(400, "Source item ID is required")
+    @api.response(304, "Recommendations not modified")
     def get(self):
         """
         Read a list of recommendations based on the source product they select,
@@ -353,21 +878,153 @@ class ReadListResource(Resource):
         source_item_id = args["source_item_id"]
         sort_order = args["sort_order"]
         product_status = args["status"]
+        limit = args["limit"]
+        if limit is not None and limit < 1:
+            abort(status.HTTP_400_BAD_REQUEST, "limit must be a positive integer")
+        field_names = parse_fields(args["fields"])
 
-        recommendations = []
-        if product_status == "valid":
-            # Assuming find_valid_by_source_item_id also needs to be updated for sorting
-            recommendations = Recommendation.find_valid_by_source_item_id(
-                source_item_id, sort_order
+        results = lookup_in_memory(source_item_id, sort_order, product_status == "valid", limit)
+        if results is None and (request.if_none_match or request.if_modified_since):
+            # validate before loading and serializing the list
+            last_updated, count = Recommendation.last_updated_and_count_by_source_item_id(
+                source_item_id, sort_order, product_status == "valid", limit
             )
-        else:
-            recommendations = Recommendation.find_by_source_item_id(
-                source_item_id, sort_order
+            headers = make_validators(
+                last_updated, "source", source_item_id, count, *(field_names or ())
             )
-
-        results = [recommendation.serialize() for recommendation in recommendations]
+            if is_not_modified(headers):
+                return "", status.HTTP_304_NOT_MODIFIED, headers
+        if results is None and field_names:
+            # updated_at is always read for the validators
+            results = Recommendation.project_by_source_item_id(
+                source_item_id,
+                field_names + [name for name in ("updated_at",) if name not in field_names],
+                sort_order,
+                product_status == "valid",
+                limit,
+            )
+        elif results is None:
+            results = Recommendation.serialize_by_source_item_id(
+                source_item_id, sort_order, product_status == "valid", limit
+            )
+        headers = make_validators(
+            last_updated_of(results), "source", source_item_id, len(results),
+            *(field_names or ()),
+        )
+        if is_not_modified(headers):
+            return "", status.HTTP_304_NOT_MODIFIED, headers
+        if field_names:
+            results = project(results, field_names)
         app.logger.info("Returning %d recommendations", len(results))
+        return results, status.HTTP_200_OK, headers
+
+
+######################################################################
+#  PATH: /recommendations/source-products
+######################################################################
+@api.route("/recommendations/source-products", strict_slashes=False)
+class ReadManyListsResource(Resource):
+    """Handles reading the Recommendations of many source products at once"""
+
+    @api.doc("read_recommendations_by_source_items")
+    @api.expect(sps_args, validate=True)
+    @api.response(400, "Source item IDs are required")
+    def get(self):
+        """
+        Read the recommendations of many source products
+
+        Takes a comma separated list of source_item_ids and returns one group of
+        recommendations per source item, in the order they were asked for.
+        """
+        app.logger.info("Request for recommendations of many source products")
+        return self._read(sps_args.parse_args())
+
+    @api.doc("read_recommendations_by_source_items_in_body")
+    @api.expect(source_products_model)
+    @api.response(400, "Source item IDs are required")
+    def post(self):
+        """
+        Read the recommendations of many source products given in a JSON body
+        """
+        app.logger.info("Request for recommendations of many source products")
+        return self._read(sps_body.parse_args())
+
+    @staticmethod
+    def _read(args):
+        """Returns the grouped recommendations of the parsed arguments"""
+        source_item_ids = list(dict.fromkeys(chain.from_iterable(args["source_item_ids"])))
+        if len(source_item_ids) > app.config["BATCH_MAX_IDS"]:
+            abort(
+                status.HTTP_400_BAD_REQUEST,
+                f"At most {app.config['BATCH_MAX_IDS']} source item ids can be read at once",
+            )
+        sort_order = args["sort_order"]
+        valid_only = args["status"] == "valid"
+        limit = args["limit"]
+        if limit is not None and limit < 1:
+            abort(status.HTTP_400_BAD_REQUEST, "limit must be a positive integer")
+
+        grouped = {}
+        for source_item_id in source_item_ids:
+            results = lookup_in_memory(source_item_id, sort_order, valid_only, limit)
+            if results is None:
+                break
+            grouped[source_item_id] = results
+        missing = [source_item_id for source_item_id in source_item_ids
+                   if source_item_id not in grouped]
+        if missing:
+            grouped.update(
+                Recommendation.serialize_by_source_item_ids(missing, sort_order, valid_only, limit)
+            )
+        field_names = parse_fields(args["fields"])
+        if field_names:
+            grouped = {
+                source_item_id: project(results, field_names)
+                for source_item_id, results in grouped.items()
+            }
+        app.logger.info("Returning recommendations of %d source items", len(source_item_ids))
+        return [
+            {"source_item_id": source_item_id, "recommendations": grouped[source_item_id]}
+            for source_item_id in source_item_ids
+        ], status.HTTP_200_OK
+
+
+######################################################################
+#  PATH: /recommendations/basket
+######################################################################
+@api.route("/recommendations/basket", strict_slashes=False)
+class BasketResource(Resource):
+    """Handles recommendations for a whole basket of items"""
+
+    @api.doc("recommend_for_basket")
+    @api.expect(basket_model)
+    @api.response(400, "The basket was not valid")
+    @api.marshal_list_with(basket_result_model)
+    def post(self):
+        """
+        Recommend targets for a basket of items
+
+        Combines the recommendations of every item in the basket into one ranked
+        list, without the items already in the basket and with every target once.
+        """
+        app.logger.info("Request for recommendations of a basket")
+        args = basket_args.parse_args()
+        source_item_ids = list(dict.fromkeys(chain.from_iterable(args["source_item_ids"])))
+        if len(source_item_ids) > app.config["BATCH_MAX_IDS"]:
+            abort(
+                status.HTTP_400_BAD_REQUEST,
+                f"At most {app.config['BATCH_MAX_IDS']} basket items can be read at once",
+            )
+        limit = args["limit"]
+        if limit is None or limit < 1:
+            abort(status.HTTP_400_BAD_REQUEST, "limit must be a positive integer")
+        results = Recommendation.recommend_for_basket(
+            source_item_ids, args["aggregation"], limit, args["status"] == "valid"
+        )
+        app.logger.info("Returning %d basket recommendations", len(results))
         return results, status.HTTP_200_OK
+
+
 ######################################################################
 #  PATH: /recommendations/<int:recommendation_id>/deactivation
 ######################################################################
@@ -433,6 +1090,48 @@ def abort(error_code: int, message: str):
     api.abort(error_code, message)
 
 
+def check_profiler_access():
+    """Aborts unless profiling is enabled and the request carries its token"""
+    if not profiler.enabled:
+        abort(status.HTTP_404_NOT_FOUND, "Profiling is not enabled.")
+    if not profiler.authorized():
+        abort(status.HTTP_403_FORBIDDEN, "The profiling token is missing or wrong.")
+
+
+def parse_fields(value: str):
+    """Returns the fields of a comma separated fields argument, None for all fields
+
+    Aborts with 400 when a field is not part of recommendation_model.
+    """
+    if not value:
+        return None
+    field_names = list(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+    unknown = [field for field in field_names if field not in recommendation_model.resolved]
+    if unknown or not field_names:
+        abort(
+            status.HTTP_400_BAD_REQUEST,
+            f"Unknown fields {', '.join(unknown)}, choose from "
+            f"{', '.join(recommendation_model.resolved)}",
+        )
+    return field_names
+
+
+def project(results: list, field_names: list) -> list:
+    """Returns serialized Recommendations cut down to the given fields"""
+    return [{field: result.get(field) for field in field_names} for result in results]
+
+
+def lookup_in_memory(source_item_id: int, sort_order: str, valid_only: bool, limit: int):
+    """Returns the serialized Recommendations of a source item from the graph
+    index or the snapshot file, or None when neither can answer"""
+    results = None
+    if graph_index.enabled:
+        results = graph_index.lookup(source_item_id, sort_order, valid_only, limit)
+    if results is None and snapshot_reader.enabled:
+        results = snapshot_reader.lookup(source_item_id, sort_order, valid_only, limit)
+    return results
+
+
 def init_db(dbname="recommendations"):
     """Initialize the model"""
     Recommendation.init_db(dbname)
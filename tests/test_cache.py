@@ -0,0 +1,86 @@
+"""
+Test cases for the LRU Cache
+
+Test cases can be run with:
+    green
+    coverage report -m
+"""
+from unittest import TestCase
+from unittest.mock import patch
+from service.common.cache import LRUCache
+
+
+######################################################################
+#  L R U   C A C H E   T E S T   C A S E S
+######################################################################
+class TestLRUCache(TestCase):
+    """Test Cases for the LRU Cache"""
+
+    def test_get_and_set(self):
+        """It should return cached values and count hits and misses"""
+        cache = LRUCache(maxsize=2, ttl=60)
+        self.assertIsNone(cache.get("a"))
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["size"], 1)
+
+    def test_evicts_least_recently_used(self):
+        """It should evict the least recently used entry when full"""
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_expires_entries(self):
+        """It should treat entries older than the TTL as missing"""
+        cache = LRUCache(maxsize=2, ttl=10)
+        with patch("service.common.cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+        with patch("service.common.cache.time.monotonic", return_value=105.0):
+            self.assertEqual(cache.get("a"), 1)
+        with patch("service.common.cache.time.monotonic", return_value=111.0):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_invalidate_and_clear(self):
+        """It should drop single entries or everything"""
+        cache = LRUCache(maxsize=4, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.invalidate("a")
+        cache.invalidate("missing")
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), 2)
+        cache.clear()
+        self.assertIsNone(cache.get("b"))
+
+    def test_disabled(self):
+        """It should not store anything when the size is 0"""
+        cache = LRUCache(maxsize=4, ttl=60)
+        cache.configure(0, 60)
+        self.assertFalse(cache.enabled)
+        cache.set("a", 1)
+        self.assertIsNone(cache.get("a"))
+
+    def test_invalidate_tag(self):
+        """It should drop every entry stored with a tag"""
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.set(("a", 1), 1, tag="a")
+        cache.set(("a", 2), 2, tag="a")
+        cache.set(("b", 1), 3, tag="b")
+        self.assertEqual(cache.stats()["evictions"], 1)
+        cache.set(("b", 1), 4, tag="b")
+        cache.invalidate_tag("a")
+        cache.invalidate_tag("missing")
+        self.assertIsNone(cache.get(("a", 2)))
+        self.assertEqual(cache.get(("b", 1)), 4)
+        cache.invalidate_tag("b")
+        self.assertEqual(cache.stats()["size"], 0)
@@ -0,0 +1,78 @@
+"""
+Test cases for the Synthetic Data generator
+
+Test cases can be run with:
+    green
+    coverage report -m
+"""
+from datetime import datetime
+from unittest import TestCase
+from service.common.generator import Generator, parse_mix, zipf_fanouts
+from service.models import Recommendation, RecommendationStatus, RecommendationType
+
+
+######################################################################
+#  G E N E R A T O R   T E S T   C A S E S
+######################################################################
+class TestGenerator(TestCase):
+    """Test Cases for the Synthetic Data generator"""
+
+    def test_parse_mix(self):
+        """It should parse weighted mixes of enum names"""
+        names, weights = parse_mix("UP_SELL=30, CROSS_SELL=70", RecommendationType)
+        self.assertEqual(names, ["UP_SELL", "CROSS_SELL"])
+        self.assertEqual(weights, [30.0, 100.0])
+        self.assertEqual(parse_mix("VALID", RecommendationStatus), (["VALID"], [1.0]))
+        self.assertRaises(ValueError, parse_mix, "VALID=1,BOGUS=1", RecommendationStatus)
+        self.assertRaises(ValueError, parse_mix, "VALID=0", RecommendationStatus)
+        self.assertRaises(ValueError, parse_mix, "VALID=x", RecommendationStatus)
+
+    def test_zipf_fanouts(self):
+        """It should spread the rows over the source items by a capped Zipf law"""
+        fanouts = zipf_fanouts(10000, 500, 1.1)
+        self.assertEqual(sum(fanouts), 10000)
+        self.assertEqual(len(fanouts), 500)
+        self.assertEqual(fanouts, sorted(fanouts, reverse=True))
+        self.assertGreaterEqual(min(fanouts), 1)
+        self.assertGreater(fanouts[0], 50 * fanouts[-1])
+        capped = zipf_fanouts(10000, 500, 1.1, max_fanout=100)
+        self.assertEqual(sum(capped), 10000)
+        self.assertEqual(max(capped), 100)
+        self.assertEqual(zipf_fanouts(3, 10, 1.1), [1, 1, 1])
+        self.assertRaises(ValueError, zipf_fanouts, 100, 2, 1.1, 10)
+
+    def test_rows(self):
+        """It should generate the same rows in COPY_COLUMNS order for a seed"""
+        end = datetime(2024, 1, 1)
+        rows = list(Generator(1000, sources=50, max_likes=500, seed=7, end=end))
+        self.assertEqual(rows, list(Generator(1000, sources=50, max_likes=500, seed=7, end=end)))
+        self.assertTrue(all(row[7] < end for row in rows))
+        self.assertEqual(len(rows), 1000)
+        self.assertTrue(all(len(row) == len(Recommendation.COPY_COLUMNS) for row in rows))
+        self.assertEqual(len({row[0] for row in rows}), 50)
+        self.assertTrue(all(row[2] in RecommendationType.__members__ for row in rows))
+        self.assertTrue(all(row[4] in RecommendationStatus.__members__ for row in rows))
+        self.assertTrue(all(0 <= row[3] < 1 for row in rows))
+        likes = [row[5] for row in rows]
+        self.assertTrue(all(0 <= count <= 500 for count in likes))
+        # most Recommendations have no likes
+        self.assertGreater(likes.count(0), len(likes) / 2)
+        self.assertTrue(all(row[6] <= row[7] for row in rows))
+
+    def test_mix(self):
+        """It should only generate the types and statuses of the mixes"""
+        rows = Generator(200, type_mix="SUBSTITUTE", status_mix="VALID=1,DEPRECATED=1", seed=1)
+        self.assertEqual({row[2] for row in rows}, {"SUBSTITUTE"})
+        self.assertEqual({row[4] for row in rows}, {"VALID", "DEPRECATED"})
+
+    def test_copy_text(self):
+        """It should format the same rows as COPY text blocks"""
+        generator = Generator(1000, sources=50, max_likes=500, seed=7)
+        blocks = list(generator.copy_text(300))
+        self.assertEqual([block.count("\n") for block in blocks], [300, 300, 300, 100])
+        expected = [
+            "\t".join(str(value) for value in row[:3]) + f"\t{row[3]:.4f}\t"
+            + "\t".join(str(value) for value in row[4:]) + "\n"
+            for row in generator
+        ]
+        self.assertEqual("".join(blocks), "".join(expected))
@@ -12,9 +12,12 @@ import logging
 import unittest
 import random
 from datetime import datetime
+from unittest.mock import patch
 from werkzeug.exceptions import NotFound
 
 from service.models import (
+    find_cache,
+    source_cache,
     Recommendation,
     DataValidationError,
     db,
@@ -23,6 +26,7 @@ from service.models import (
 )
 
 from service import app
+from service.common.replicas import replica_router
 
 from tests.factories import RecommendationFactory
 
@@ -57,6 +61,8 @@ class TestRecommendation(unittest.TestCase):
         """This runs before each test"""
         db.session.query(Recommendation).delete()  # clean up the last tests
         db.session.commit()
+        find_cache.clear()
+        source_cache.clear()
 
     def tearDown(self):
         """This runs after each test"""
@@ -181,6 +187,340 @@ class TestRecommendation(unittest.TestCase):
         for recommendation in found_desc + found_asc:
             self.assertEqual(recommendation.source_item_id, source_item_id)
 
+    def test_find_by_source_item_id_with_limit(self):
+        """It should only return the top N recommendations by weight for a source product"""
+        source_item_id = 100
+        weights = [0.1 * i for i in range(1, 11)]
+        for weight in weights:
+            recommendation = RecommendationFactory(
+                source_item_id=source_item_id,
+                recommendation_weight=weight,
+                status=RecommendationStatus.VALID,
+            )
+            recommendation.create()
+
+        found = Recommendation.find_by_source_item_id(source_item_id, "desc", limit=3)
+        self.assertEqual(
+            [rec.recommendation_weight for rec in found],
+            sorted(weights, reverse=True)[:3],
+        )
+        found = Recommendation.find_valid_by_source_item_id(
+            source_item_id, "asc", limit=2
+        )
+        self.assertEqual(
+            [rec.recommendation_weight for rec in found], sorted(weights)[:2]
+        )
+        found = Recommendation.find_top5_by_source_item_id(source_item_id)
+        self.assertEqual(
+            [rec.recommendation_weight for rec in found],
+            sorted(weights, reverse=True)[:5],
+        )
+
+    def test_paginate_keyset(self):
+        """It should walk all Recommendations page by page with a keyset cursor"""
+        recommendations = RecommendationFactory.create_batch(7)
+        for recommendation in recommendations:
+            recommendation.create()
+        seen = []
+        items, cursor, total = Recommendation.paginate_keyset(page_size=3, count=True)
+        self.assertEqual(total, 7)
+        seen.extend(rec.id for rec in items)
+        while cursor:
+            items, cursor, total = Recommendation.paginate_keyset(
+                cursor=cursor, page_size=3
+            )
+            self.assertIsNone(total)
+            seen.extend(rec.id for rec in items)
+        self.assertEqual(seen, sorted(rec.id for rec in recommendations))
+
+        # ordering by updated_at walks every row exactly once as well
+        seen = []
+        cursor = None
+        while True:
+            items, cursor, _ = Recommendation.paginate_keyset(
+                cursor=cursor, page_size=2, sort_key="updated_at"
+            )
+            seen.extend(rec.id for rec in items)
+            if not cursor:
+                break
+        self.assertEqual(sorted(seen), sorted(rec.id for rec in recommendations))
+
+    def test_paginate_keyset_bad_cursor(self):
+        """It should raise DataValidationError for a malformed or mismatched cursor"""
+        recommendation = RecommendationFactory()
+        recommendation.create()
+        self.assertRaises(
+            DataValidationError, Recommendation.paginate_keyset, cursor="not-a-cursor"
+        )
+        cursor = Recommendation.encode_cursor(recommendation, "id")
+        self.assertRaises(
+            DataValidationError,
+            Recommendation.paginate_keyset,
+            cursor=cursor,
+            sort_key="updated_at",
+        )
+        self.assertRaises(
+            DataValidationError, Recommendation.paginate_keyset, sort_key="weight"
+        )
+
+    def test_create_many(self):
+        """It should create many Recommendations with chunked multi-row INSERTs"""
+        recommendations = RecommendationFactory.create_batch(5)
+        ids, errors = Recommendation.create_many(recommendations, chunk_size=2)
+        self.assertEqual(errors, {})
+        self.assertEqual(len(ids), 5)
+        for recommendation, new_id in zip(recommendations, ids):
+            found = Recommendation.find(new_id)
+            self.assertEqual(found.target_item_id, recommendation.target_item_id)
+            self.assertIsNotNone(found.created_at)
+
+    def test_create_many_failing_chunk(self):
+        """It should only report the Recommendations of a failing chunk that cannot be written"""
+        recommendations = RecommendationFactory.create_batch(7)
+        recommendations[2].target_item_id = None
+        recommendations[5].target_item_id = None
+        ids, errors = Recommendation.create_many(recommendations, chunk_size=4)
+        self.assertEqual(sorted(errors.keys()), [2, 5])
+        self.assertTrue(all(errors[position].startswith("Error creating") for position in (2, 5)))
+        self.assertEqual([new_id is None for new_id in ids], [position in (2, 5) for position in range(7)])
+        self.assertEqual(len(Recommendation.all()), 5)
+        for recommendation, new_id in zip(recommendations, ids):
+            if new_id is not None:
+                self.assertEqual(Recommendation.find(new_id).target_item_id, recommendation.target_item_id)
+
+    def test_create_many_sequence_failure(self):
+        """It should report every Recommendation of a chunk it cannot number"""
+        recommendations = RecommendationFactory.create_batch(3)
+        with patch.object(db.session, "execute", side_effect=Exception("down")):
+            ids, errors = Recommendation.create_many(recommendations, chunk_size=2)
+        self.assertEqual(ids, [None, None, None])
+        self.assertEqual(sorted(errors.keys()), [0, 1, 2])
+
+    def test_stream(self):
+        """It should stream every Recommendation serialized in id order"""
+        recommendations = RecommendationFactory.create_batch(5)
+        for recommendation in recommendations:
+            recommendation.create()
+        records = list(Recommendation.stream(batch_size=2))
+        self.assertEqual(
+            [record["id"] for record in records],
+            sorted(rec.id for rec in recommendations),
+        )
+        rec_status = recommendations[0].status
+        records = list(Recommendation.stream(rec_status=rec_status))
+        self.assertEqual(
+            len(records),
+            len([rec for rec in recommendations if rec.status == rec_status]),
+        )
+
+    def test_find_uses_cache(self):
+        """It should serve repeated finds from the cache until the row changes"""
+        recommendation = RecommendationFactory(number_of_likes=0)
+        recommendation.create()
+        first = Recommendation.find(recommendation.id)
+        hits = find_cache.stats()["hits"]
+        db.session.remove()
+        second = Recommendation.find_cached(str(recommendation.id))
+        self.assertEqual(find_cache.stats()["hits"], hits + 1)
+        self.assertEqual(second.serialize(), first.serialize())
+
+        # changes through the model invalidate the cached row
+        found = Recommendation.find(recommendation.id)
+        found.recommendation_weight = 0.5
+        found.update()
+        self.assertEqual(Recommendation.find_cached(recommendation.id).recommendation_weight, 0.5)
+        Recommendation.like_by_id(recommendation.id)
+        self.assertEqual(Recommendation.find_cached(recommendation.id).number_of_likes, 1)
+        Recommendation.find(recommendation.id).deactivate()
+        self.assertEqual(
+            Recommendation.find_cached(recommendation.id).status, RecommendationStatus.DEPRECATED
+        )
+        Recommendation.find(recommendation.id).activate("VALID")
+        self.assertEqual(
+            Recommendation.find_cached(recommendation.id).status, RecommendationStatus.VALID
+        )
+        Recommendation.find(recommendation.id).delete()
+        self.assertIsNone(Recommendation.find_cached(recommendation.id))
+
+    def test_find_ignores_cache(self):
+        """It should load the row to change from the database, not a stale cache"""
+        recommendation = RecommendationFactory(number_of_likes=5)
+        recommendation.create()
+        rec_id = recommendation.id
+        Recommendation.find(rec_id)
+        # another worker changes the row behind this worker's cache
+        db.session.execute(
+            db.update(Recommendation).where(Recommendation.id == rec_id).values(number_of_likes=99)
+        )
+        db.session.commit()
+        db.session.remove()
+        self.assertEqual(Recommendation.find_cached(rec_id).number_of_likes, 5)
+        found = Recommendation.find(rec_id)
+        self.assertEqual(found.number_of_likes, 99)
+        found.number_of_likes = 5
+        found.update()
+        db.session.remove()
+        self.assertEqual(db.session.get(Recommendation, rec_id).number_of_likes, 5)
+
+    def test_find_by_source_item_ids(self):
+        """It should find the top recommendations of many source products with one query"""
+        for source_item_id in (1, 2, 3):
+            for weight in (0.1, 0.5, 0.9):
+                RecommendationFactory(
+                    source_item_id=source_item_id,
+                    recommendation_weight=weight,
+                    status=RecommendationStatus.VALID,
+                ).create()
+        found = Recommendation.find_by_source_item_ids([3, 1], "desc", limit=2)
+        self.assertEqual(
+            [(rec.source_item_id, rec.recommendation_weight) for rec in found],
+            [(1, 0.9), (1, 0.5), (3, 0.9), (3, 0.5)],
+        )
+        found = Recommendation.find_by_source_item_ids([2], "asc", valid_only=True)
+        self.assertEqual([rec.recommendation_weight for rec in found], [0.1, 0.5, 0.9])
+
+        grouped = Recommendation.serialize_by_source_item_ids([1, 4], "desc", limit=1)
+        self.assertEqual(grouped[4], [])
+        self.assertEqual(grouped[1], Recommendation.serialize_by_source_item_id(1, "desc", limit=1))
+        with patch.object(Recommendation, "find_by_source_item_ids") as find:
+            Recommendation.serialize_by_source_item_ids([1, 4], "desc", limit=1)
+            find.assert_not_called()
+
+    def test_serialize_many(self):
+        """It should serialize many Recommendations by id, from find_cache when it can"""
+        recommendations = RecommendationFactory.create_batch(3)
+        for recommendation in recommendations:
+            recommendation.create()
+        ids = [recommendation.id for recommendation in recommendations]
+        find_cache.clear()
+        Recommendation.find(ids[0])
+        found = Recommendation.serialize_many(ids + [0])
+        self.assertEqual(set(found), set(ids))
+        for recommendation in recommendations:
+            self.assertEqual(found[recommendation.id], recommendation.serialize())
+        with patch.object(Recommendation, "query") as query:
+            self.assertEqual(Recommendation.serialize_many(ids), found)
+            query.filter.assert_not_called()
+
+    def test_recommend_for_basket(self):
+        """It should merge the recommendations of a basket into one ranked list"""
+        rows = [
+            (1, 10, 0.5, 0),
+            (2, 10, 0.4, 0),
+            (1, 11, 0.8, 0),
+            (2, 12, 0.3, 100),
+            (1, 2, 0.9, 0),  # already in the basket
+            (3, 13, 1.0, 0),  # not in the basket
+        ]
+        for source_item_id, target_item_id, weight, likes in rows:
+            RecommendationFactory(
+                source_item_id=source_item_id,
+                target_item_id=target_item_id,
+                recommendation_weight=weight,
+                number_of_likes=likes,
+                status=RecommendationStatus.VALID,
+            ).create()
+
+        results = Recommendation.recommend_for_basket([1, 2], "max")
+        self.assertEqual([result["target_item_id"] for result in results], [11, 10, 12])
+        self.assertEqual(results[1]["source_item_ids"], [1, 2])
+        self.assertAlmostEqual(results[1]["score"], 0.5)
+
+        results = Recommendation.recommend_for_basket([1, 2], "sum", limit=1)
+        self.assertEqual([result["target_item_id"] for result in results], [10])
+        self.assertAlmostEqual(results[0]["score"], 0.9)
+
+        results = Recommendation.recommend_for_basket([1, 2], "likes")
+        self.assertEqual(results[0]["target_item_id"], 12)
+
+        self.assertRaises(
+            DataValidationError, Recommendation.recommend_for_basket, [1], "median"
+        )
+
+    def test_projected_reads(self):
+        """It should read only the requested fields without building Recommendations"""
+        for weight in (0.1, 0.5, 0.9):
+            RecommendationFactory(
+                source_item_id=3, recommendation_weight=weight, status=RecommendationStatus.VALID
+            ).create()
+        fields = ["target_item_id", "recommendation_weight", "status"]
+        with patch.object(Recommendation, "__init__", side_effect=AssertionError("built")):
+            items, page, per_page = Recommendation.paginate_fields(fields, 0, 2)
+            self.assertEqual((page, per_page), (1, 2))
+            self.assertEqual(len(items), 2)
+            self.assertEqual(list(items[0]), fields)
+            self.assertEqual(items[0]["status"], "VALID")
+
+            items, next_cursor, _ = Recommendation.paginate_keyset(
+                None, 2, sort_key="updated_at", fields=["recommendation_weight"]
+            )
+            self.assertEqual(list(items[0]), ["recommendation_weight"])
+            items, next_cursor, _ = Recommendation.paginate_keyset(
+                next_cursor, 2, sort_key="updated_at", fields=["recommendation_weight"]
+            )
+            self.assertEqual(len(items), 1)
+            self.assertIsNone(next_cursor)
+
+            source_cache.clear()
+            projected = Recommendation.project_by_source_item_id(3, ["recommendation_weight"])
+            self.assertEqual(projected, [{"recommendation_weight": w} for w in (0.9, 0.5, 0.1)])
+        full = Recommendation.serialize_by_source_item_id(3, "asc", limit=2)
+        with patch.object(db.session, "execute") as execute:
+            projected = Recommendation.project_by_source_item_id(
+                3, ["id", "created_at"], "asc", limit=2
+            )
+            execute.assert_not_called()
+        self.assertEqual(projected, [{"id": r["id"], "created_at": r["created_at"]} for r in full])
+
+    def test_replica_routing(self):
+        """It should read from the replicas unless the session wrote first"""
+        replica_router.configure(
+            [DATABASE_URI], engine_options=app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+        )
+        self.addCleanup(replica_router.configure, [])
+        replica = replica_router.engines[0]
+        db.session.commit()  # start a new transaction on the new binds
+        db.session.info.clear()
+        RecommendationFactory(source_item_id=9).create()
+        self.assertTrue(db.session.info.get("wrote_to_primary"))
+        self.assertEqual(len(Recommendation.find_by_source_item_id(9)), 1)
+        self.assertEqual(replica.pool.checkouts, 0)
+
+        db.session.commit()
+        db.session.info.clear()
+        self.assertEqual(len(Recommendation.find_by_source_item_id(9)), 1)
+        self.assertEqual(replica.pool.checkouts, 1)
+
+    def test_serialize_by_source_item_id_uses_cache(self):
+        """It should cache source-product lists until a Recommendation of the source changes"""
+        recommendation = RecommendationFactory(
+            source_item_id=7, status=RecommendationStatus.VALID
+        )
+        recommendation.create()
+        first = Recommendation.serialize_by_source_item_id(7, "desc", True)
+        self.assertEqual(len(first), 1)
+        hits = source_cache.stats()["hits"]
+        self.assertIs(Recommendation.serialize_by_source_item_id(7, "desc", True), first)
+        self.assertEqual(source_cache.stats()["hits"], hits + 1)
+
+        # writes through the model invalidate the lists of that source item
+        RecommendationFactory(source_item_id=7, status=RecommendationStatus.VALID).create()
+        self.assertEqual(len(Recommendation.serialize_by_source_item_id(7, "desc", True)), 2)
+        recommendation.deactivate()
+        self.assertEqual(len(Recommendation.serialize_by_source_item_id(7, "desc", True)), 1)
+        Recommendation.like_by_id(recommendation.id)
+        found = Recommendation.serialize_by_source_item_id(7, "asc")
+        self.assertEqual(sum(rec["number_of_likes"] for rec in found), 1)
+
+        # moving a Recommendation to another source item invalidates both lists
+        self.assertEqual(Recommendation.serialize_by_source_item_id(8), [])
+        recommendation.source_item_id = 8
+        recommendation.update()
+        self.assertEqual(len(Recommendation.serialize_by_source_item_id(7, "asc")), 1)
+        self.assertEqual(len(Recommendation.serialize_by_source_item_id(8)), 1)
+        recommendation.delete()
+        self.assertEqual(Recommendation.serialize_by_source_item_id(8), [])
+
     def test_update_recommendation_target_item_id(self):
         """create and update recommendation with some data"""
         recommendation = RecommendationFactory()
@@ -420,6 +760,18 @@ class TestRecommendation(unittest.TestCase):
         rec.like()
         self.assertEqual(rec.number_of_likes, 1)
 
+    def test_like_by_id(self):
+        """It should atomically like a Recommendation by id and return it serialized"""
+        rec = RecommendationFactory()
+        rec.create()
+        data = Recommendation.like_by_id(rec.id)
+        self.assertEqual(data["id"], rec.id)
+        self.assertEqual(data["number_of_likes"], 1)
+        data = Recommendation.like_by_id(rec.id)
+        self.assertEqual(data["number_of_likes"], 2)
+        self.assertEqual(Recommendation.find(rec.id).number_of_likes, 2)
+        self.assertIsNone(Recommendation.like_by_id(rec.id + 1))
+
     def test_like_a_recommendation_raise_error(self):
         """Like recommendation with invalid datatype should raise error"""
         rec = RecommendationFactory()
@@ -0,0 +1,58 @@
+"""
+Test cases for the instrumented Connection Pool
+
+Test cases can be run with:
+    green
+    coverage report -m
+"""
+from unittest import TestCase
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool
+from service.common.pool import InstrumentedQueuePool, pool_stats
+
+
+######################################################################
+#  C O N N E C T I O N   P O O L   T E S T   C A S E S
+######################################################################
+class TestConnectionPool(TestCase):
+    """Test Cases for the instrumented Connection Pool"""
+
+    def setUp(self):
+        """This runs before each test"""
+        self.engine = create_engine(
+            "sqlite://",
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=1,
+            pool_timeout=0.05,
+        )
+
+    def tearDown(self):
+        """This runs after each test"""
+        self.engine.dispose()
+
+    def test_pool_stats(self):
+        """It should report checked out connections, overflow and waits"""
+        first = self.engine.connect()
+        second = self.engine.connect()
+        stats = pool_stats(self.engine)
+        self.assertEqual(stats["checked_out"], 2)
+        self.assertEqual(stats["overflow"], 1)
+        self.assertEqual(stats["max_overflow"], 1)
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertEqual(stats["timeouts"], 0)
+
+        self.assertRaises(PoolTimeoutError, self.engine.connect)
+        stats = pool_stats(self.engine)
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertGreaterEqual(stats["wait_seconds_max"], 0.05)
+        self.assertGreater(stats["wait_seconds_mean"], 0)
+        first.close()
+        second.close()
+        self.assertEqual(pool_stats(self.engine)["checked_out"], 0)
+
+    def test_other_pools(self):
+        """It should only name the class of pools that keep no connections"""
+        engine = create_engine("sqlite://", poolclass=NullPool)
+        self.assertEqual(pool_stats(engine), {"class": "NullPool"})
@@ -0,0 +1,123 @@
+"""
+Test cases for the Request Profiler
+
+Test cases can be run with:
+    green
+    coverage report -m
+"""
+import os
+import pstats
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+from flask import Response
+from werkzeug.exceptions import HTTPException
+from service import app, routes
+from service.common import status
+from service.common.profiler import PROFILE_ID_HEADER, Profiler, profiler
+
+TOKEN = "let-me-profile"
+
+
+######################################################################
+#  P R O F I L E R   T E S T   C A S E S
+######################################################################
+class TestProfiler(TestCase):
+    """Test Cases for the Request Profiler"""
+
+    def setUp(self):
+        """This runs before each test"""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.profiler = Profiler()
+        self.profiler.directory = self.directory
+        self.profiler.token = TOKEN
+
+    def _request(self, headers=None):
+        """Runs a profiled request and returns its response"""
+        with app.test_request_context("/api/recommendations", headers=headers or {}):
+            self.profiler.start()
+            sum(range(10000))
+            time.sleep(0.02)
+            return self.profiler.stop(Response())
+
+    def test_not_picked(self):
+        """It should not profile requests without the token"""
+        response = self._request({"X-Profile": "wrong"})
+        self.assertNotIn(PROFILE_ID_HEADER, response.headers)
+        self.profiler.token = ""
+        response = self._request({"X-Profile": ""})
+        self.assertNotIn(PROFILE_ID_HEADER, response.headers)
+        self.assertEqual(self.profiler.profiles(), [])
+
+    def test_cprofile(self):
+        """It should save a pstats profile of a request with the token"""
+        response = self._request({"X-Profile": TOKEN})
+        name = response.headers[PROFILE_ID_HEADER]
+        self.assertTrue(name.endswith(".prof"))
+        stats = pstats.Stats(self.profiler.path_of(name))
+        self.assertGreater(stats.total_calls, 0)
+        self.assertEqual([profile["name"] for profile in self.profiler.profiles()], [name])
+
+    def test_sampler(self):
+        """It should save the sampled stacks of a sampled request"""
+        self.profiler.mode = "sample"
+        self.profiler.interval = 0.001
+        self.profiler.sample_rate = 1.0
+        response = self._request()
+        name = response.headers[PROFILE_ID_HEADER]
+        self.assertTrue(name.endswith(".collapsed"))
+        with open(self.profiler.path_of(name), encoding="utf-8") as handle:
+            lines = handle.read().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(any("test_profiler.py:_request" in line for line in lines))
+
+    def test_bounds(self):
+        """It should keep the newest profiles within the limits"""
+        self.profiler.max_files = 2
+        names = []
+        for _ in range(3):
+            names.append(self._request({"X-Profile": TOKEN}).headers[PROFILE_ID_HEADER])
+            time.sleep(0.01)
+        self.assertEqual(
+            [profile["name"] for profile in self.profiler.profiles()], names[:0:-1]
+        )
+        self.profiler.max_bytes = 0
+        self.profiler.prune()
+        self.assertEqual(self.profiler.profiles(), [])
+
+    def test_path_of(self):
+        """It should only serve the profile files"""
+        self.assertIsNone(self.profiler.path_of("../config.py"))
+        self.assertIsNone(self.profiler.path_of("missing.prof"))
+
+    def test_admin_endpoints(self):
+        """It should list and download profiles for requests with the token"""
+        name = self._request({"X-Profile": TOKEN}).headers[PROFILE_ID_HEADER]
+        saved = (profiler.directory, profiler.token)
+        self.addCleanup(setattr, profiler, "directory", saved[0])
+        self.addCleanup(setattr, profiler, "token", saved[1])
+        profiler.directory = None
+        with app.test_request_context("/admin/profiles"):
+            with self.assertRaises(HTTPException) as error:
+                routes.list_profiles()
+            self.assertEqual(error.exception.code, status.HTTP_404_NOT_FOUND)
+        profiler.directory, profiler.token = self.directory, TOKEN
+        with app.test_request_context("/admin/profiles", headers={"X-Profile": "nope"}):
+            with self.assertRaises(HTTPException) as error:
+                routes.list_profiles()
+            self.assertEqual(error.exception.code, status.HTTP_403_FORBIDDEN)
+        with app.test_request_context("/admin/profiles", headers={"X-Profile": TOKEN}):
+            data, code = routes.list_profiles()
+            self.assertEqual(code, status.HTTP_200_OK)
+            self.assertEqual(data[0]["name"], name)
+            self.assertEqual(data[0]["size"], os.path.getsize(os.path.join(self.directory, name)))
+            response = routes.download_profile(name)
+            response.direct_passthrough = False
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn("attachment", response.headers["Content-Disposition"])
+            response.close()
+            with self.assertRaises(HTTPException) as error:
+                routes.download_profile("missing.prof")
+            self.assertEqual(error.exception.code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,72 @@
+"""
+Test cases for the Query Log
+
+Test cases can be run with:
+    green
+    coverage report -m
+"""
+from unittest import TestCase
+from flask import Response
+from sqlalchemy import create_engine, text
+from service import app
+from service.common.query_log import QueryLog, current_stats
+
+
+######################################################################
+#  Q U E R Y   L O G   T E S T   C A S E S
+######################################################################
+class TestQueryLog(TestCase):
+    """Test Cases for the Query Log"""
+
+    def setUp(self):
+        """This runs before each test"""
+        self.engine = create_engine("sqlite://")
+        self.query_log = QueryLog()
+        self.query_log.attach(self.engine)
+        self.addCleanup(self.query_log.detach, self.engine)
+
+    def test_count_statements(self):
+        """It should count and time the statements of a request"""
+        with app.test_request_context("/api/recommendations"):
+            self.assertIsNone(current_stats())
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+            stats = current_stats()
+            self.assertEqual(stats.count, 2)
+            self.assertGreater(stats.duration, 0)
+            with self.assertLogs("flask.app", level="INFO") as logs:
+                self.query_log.log_request(Response())
+        self.assertIn("GET /api/recommendations ran 2 statements", logs.output[0])
+        self.assertEqual(len(logs.output), 1)
+
+    def test_slow_query(self):
+        """It should log slow statements with their parameters"""
+        self.query_log.slow_seconds = 0
+        with self.engine.connect() as conn:
+            with self.assertLogs("flask.app", level="WARNING") as logs:
+                conn.execute(text("SELECT :value"), {"value": 42})
+        self.assertIn("Slow query", logs.output[0])
+        self.assertIn("42", logs.output[0])
+
+    def test_repeated_statements(self):
+        """It should flag a statement repeated within one request"""
+        self.query_log.repeat_threshold = 3
+        with app.test_request_context("/api/recommendations/source-product"):
+            with self.engine.connect() as conn:
+                for value in range(3):
+                    conn.execute(text("SELECT :value"), {"value": value})
+                conn.execute(text("SELECT 1"))
+            with self.assertLogs("flask.app", level="WARNING") as logs:
+                self.query_log.log_request(Response())
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("Possible N+1 query", logs.output[0])
+        self.assertIn("ran 3 times", logs.output[0])
+
+    def test_detach(self):
+        """It should stop counting once detached"""
+        self.query_log.detach(self.engine)
+        with app.test_request_context("/"):
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            self.assertIsNone(current_stats())
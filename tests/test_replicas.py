@@ -0,0 +1,76 @@
+"""
+Test cases for the Read Replica routing
+
+Test cases can be run with:
+    green
+    coverage report -m
+"""
+from unittest import TestCase
+from sqlalchemy.pool import StaticPool
+from service import app
+from service.common.replicas import ReplicaRouter, replica_reads, _replica_reads
+
+
+######################################################################
+#  R E P L I C A   R O U T E R   T E S T   C A S E S
+######################################################################
+class TestReplicaRouter(TestCase):
+    """Test Cases for the Replica Router"""
+
+    def setUp(self):
+        """This runs before each test"""
+        self.router = ReplicaRouter()
+        self.addCleanup(self.router.configure, [])
+
+    def test_disabled(self):
+        """It should not route anything without replicas"""
+        self.router.configure(["", " "])
+        self.assertFalse(self.router.enabled)
+        self.assertEqual(self.router.stats(), [])
+
+    def test_round_robin(self):
+        """It should take turns between the replicas"""
+        self.router.configure(["sqlite://", "sqlite://"])
+        first, second = self.router.engines
+        self.assertEqual(
+            [self.router.choose() for _ in range(4)], [first, second, first, second]
+        )
+        self.assertEqual(len(self.router.stats()), 2)
+
+    def test_least_connections(self):
+        """It should pick the replica with the fewest checked out connections"""
+        self.router.configure(
+            ["sqlite://", "sqlite://"], "least-connections", {"poolclass": StaticPool}
+        )
+        first, second = self.router.engines
+        first.pool.checkedout = lambda: 3
+        second.pool.checkedout = lambda: 1
+        self.assertIs(self.router.choose(), second)
+
+    def test_bad_policy(self):
+        """It should refuse unknown policies"""
+        self.assertRaises(ValueError, self.router.configure, ["sqlite://"], "random")
+
+    def test_use_replica(self):
+        """It should use replicas for reads that did not follow a write"""
+        self.router.configure(["sqlite://"])
+        session_info = type("FakeSession", (), {"info": {}})()
+        with app.test_request_context("/", method="GET"):
+            self.assertTrue(self.router.use_replica(session_info))
+            session_info.info["wrote_to_primary"] = True
+            self.assertFalse(self.router.use_replica(session_info))
+        session_info.info.clear()
+        with app.test_request_context("/", method="POST"):
+            self.assertFalse(self.router.use_replica(session_info))
+            self.assertTrue(replica_reads(lambda: self.router.use_replica(session_info))())
+
+    def test_replica_reads_generators(self):
+        """It should mark every step of a generator as a replica read"""
+
+        @replica_reads
+        def steps():
+            yield _replica_reads.get()
+            yield _replica_reads.get()
+
+        self.assertEqual(list(steps()), [True, True])
+        self.assertFalse(_replica_reads.get())
@@ -5,16 +5,25 @@ Test cases can be run with the following:
   green
   coverage report -m
 """
+# pylint: disable=too-many-lines
 import os
+import json
 import logging
 from unittest import TestCase
+from unittest.mock import patch
 from datetime import datetime
 
-# from unittest.mock import MagicMock, patch
+# from unittest.mock import MagicMock
 # from urllib.parse import quote_plus
 from service import app
 from service.common import status
+from service.common.graph_index import graph_index
+from service.common.like_buffer import like_buffer
+from service.common.replicas import replica_router
+from service.common.snapshot import snapshot_reader
 from service.models import (
+    find_cache,
+    source_cache,
     db,
     init_db,
     Recommendation,
@@ -60,6 +69,8 @@ class TestRecommendationServer(TestCase):
         self.client = app.test_client()
         db.session.query(Recommendation).delete()  # clean up the last tests
         db.session.commit()
+        find_cache.clear()
+        source_cache.clear()
 
     def tearDown(self):
         """This runs after each test"""
@@ -104,6 +115,20 @@ class TestRecommendationServer(TestCase):
         data = response.get_json()
         self.assertEqual(data["status"], "OK")
 
+    def test_stats(self):
+        """It should report the cache statistics"""
+        test_recommendation = self._create_recommendations(1)[0]
+        self.client.get(f"{BASE_URL}/{test_recommendation.id}")
+        self.client.get(f"{BASE_URL}/{test_recommendation.id}")
+        response = self.client.get("/stats")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.get_json()
+        self.assertGreaterEqual(data["find_cache"]["hits"], 1)
+        self.assertEqual(data["find_cache"]["size"], 1)
+        self.assertEqual(data["pool"]["class"], "InstrumentedQueuePool")
+        self.assertGreaterEqual(data["pool"]["checkouts"], 1)
+        self.assertIn("checked_out", data["pool"])
+
     def test_get_recommendation(self):
         """It should Get a recommendation by its id"""
         # get the id of a recommendation
@@ -113,6 +138,111 @@ class TestRecommendationServer(TestCase):
         data = response.get_json()
         self.assertEqual(data["id"], test_recommendation.id)
 
+    def test_get_recommendation_conditional(self):
+        """It should answer a conditional GET of one Recommendation with 304"""
+        test_recommendation = self._create_recommendations(1)[0]
+        response = self.client.get(f"{BASE_URL}/{test_recommendation.id}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response.headers["ETag"]
+        last_modified = response.headers["Last-Modified"]
+
+        response = self.client.get(
+            f"{BASE_URL}/{test_recommendation.id}", headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.data, b"")
+        response = self.client.get(
+            f"{BASE_URL}/{test_recommendation.id}",
+            headers={"If-Modified-Since": last_modified},
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # a like changes updated_at and therefore the validators
+        self.client.put(f"{BASE_URL}/{test_recommendation.id}/like")
+        response = self.client.get(
+            f"{BASE_URL}/{test_recommendation.id}", headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(response.get_json()["number_of_likes"], 1)
+
+    def test_get_recommendation_list_conditional(self):
+        """It should answer a conditional GET of the list with 304 until it changes"""
+        self._create_recommendations(2)
+        response = self.client.get(BASE_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.get_json()["total"], 2)
+        self.assertEqual(response.get_json()["pages"], 1)
+        etag = response.headers["ETag"]
+        response = self.client.get(BASE_URL, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self._create_recommendations(1)
+        response = self.client.get(BASE_URL, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.get_json()["total"], 3)
+
+        response = self.client.get(f"{BASE_URL}?cursor=&include-total=true")
+        self.assertIn("ETag", response.headers)
+        response = self.client.get(f"{BASE_URL}?cursor=")
+        self.assertNotIn("ETag", response.headers)
+
+    def test_get_recommendation_list_conditional_pages(self):
+        """It should give every page, filter and projection of the list its own ETag"""
+        self._create_recommendations(3)
+        urls = [
+            f"{BASE_URL}?page-size=1",
+            f"{BASE_URL}?page-size=1&page-index=2",
+            f"{BASE_URL}?page-size=2",
+            f"{BASE_URL}?page-size=1&fields=id",
+            f"{BASE_URL}?page-size=1&fields=id,status",
+            f"{BASE_URL}?page-size=1&cursor=&include-total=true",
+            f"{BASE_URL}?page-size=1&cursor=&include-total=true&sort-key=updated_at",
+        ]
+        etags = [self.client.get(url).headers["ETag"] for url in urls]
+        self.assertEqual(len(set(etags)), len(urls))
+        for url, etag in zip(urls, etags):
+            response = self.client.get(url, headers={"If-None-Match": etag})
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(urls[1], headers={"If-None-Match": etags[0]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.get_json()["items"]), 1)
+
+    def test_read_recommendations_by_source_item_id_conditional(self):
+        """It should answer a conditional GET of a source-product list with 304"""
+        # deactivating an already deprecated Recommendation changes nothing
+        recommendation = RecommendationFactory(status=RecommendationStatus.VALID)
+        response = self.client.post(BASE_URL, json=recommendation.serialize())
+        recommendation.id = response.get_json()["id"]
+        url = f"{BASE_URL}/source-product?source_item_id={recommendation.source_item_id}"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response.headers["ETag"]
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.client.put(f"{BASE_URL}/{recommendation.id}/deactivation")
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_read_recommendations_by_source_item_id_conditional_uncached(self):
+        """It should validate a conditional source-product GET without loading the list"""
+        recommendations = self._create_recommendations(3)
+        url = (
+            f"{BASE_URL}/source-product?source_item_id={recommendations[0].source_item_id}"
+        )
+        for query in ("", "&limit=1", "&status=valid&fields=id", "&sort_order=asc&limit=2"):
+            response = self.client.get(url + query)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            source_cache.clear()
+            with patch.object(Recommendation, "serialize_by_source_item_id") as serialize, \
+                    patch.object(Recommendation, "project_by_source_item_id") as project:
+                response = self.client.get(
+                    url + query, headers={"If-None-Match": response.headers["ETag"]}
+                )
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            serialize.assert_not_called()
+            project.assert_not_called()
+
     def test_get_recommendation_not_found(self):
         """It should not Get a Recommendation that's not found"""
         response = self.client.get(f"{BASE_URL}/0")
@@ -159,6 +289,93 @@ class TestRecommendationServer(TestCase):
         response = self.client.get(f"{BASE_URL}/{returned_data['id']}")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_create_recommendations_in_bulk(self):
+        """It should Create many Recommendations from a JSON array"""
+        payload = [RecommendationFactory().serialize() for _ in range(5)]
+        payload[2]["recommendation_weight"] = "heavy"
+        response = self.client.post(f"{BASE_URL}/bulk", json=payload)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data = response.get_json()
+        self.assertEqual(data["created"], 4)
+        self.assertEqual(data["failed"], 1)
+        self.assertEqual([item["index"] for item in data["items"]], [0, 1, 3, 4])
+        self.assertEqual(data["errors"][0]["index"], 2)
+        for item in data["items"]:
+            response = self.client.get(f"{BASE_URL}/{item['id']}")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(
+                response.get_json()["target_item_id"],
+                payload[item["index"]]["target_item_id"],
+            )
+
+    def test_create_recommendations_in_bulk_bad_timestamps(self):
+        """It should report Recommendations with bad timestamps without failing the batch"""
+        payload = [RecommendationFactory().serialize() for _ in range(3)]
+        payload[0]["created_at"] = "garbage"
+        payload[2]["updated_at"] = 42
+        response = self.client.post(f"{BASE_URL}/bulk", json=payload)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data = response.get_json()
+        self.assertEqual(data["created"], 1)
+        self.assertEqual([error["index"] for error in data["errors"]], [0, 2])
+        self.assertIn("Invalid timestamp", data["errors"][0]["message"])
+
+    def test_create_recommendations_in_bulk_ndjson(self):
+        """It should Create many Recommendations from NDJSON in small chunks"""
+        lines = [json.dumps(RecommendationFactory().serialize()) for _ in range(5)]
+        lines.insert(1, "{not json")
+        with patch.dict(app.config, {"BULK_INSERT_CHUNK_SIZE": 2}):
+            response = self.client.post(
+                f"{BASE_URL}/bulk",
+                data="\n".join(lines) + "\n",
+                content_type="application/x-ndjson",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data = response.get_json()
+        self.assertEqual(data["created"], 5)
+        self.assertEqual(data["errors"][0]["index"], 1)
+        self.assertEqual(len(Recommendation.all()), 5)
+
+    def test_create_recommendations_in_bulk_bad_requests(self):
+        """It should reject bulk bodies that contain no valid Recommendations"""
+        response = self.client.post(f"{BASE_URL}/bulk", json=[{"source_item_id": 1}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.get_json()["failed"], 1)
+        response = self.client.post(f"{BASE_URL}/bulk", json=[])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(f"{BASE_URL}/bulk", json={"source_item_id": 1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(
+            f"{BASE_URL}/bulk", data="wrong content", content_type="text/html"
+        )
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    def test_export_recommendations(self):
+        """It should stream all Recommendations as NDJSON or CSV"""
+        recommendations = self._create_recommendations(3)
+        response = self.client.get(f"{BASE_URL}/export")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        records = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual(
+            [record["id"] for record in records],
+            sorted(rec.id for rec in recommendations),
+        )
+
+        rec_type = recommendations[0].recommendation_type.name
+        response = self.client.get(f"{BASE_URL}/export?format=csv&type={rec_type}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.mimetype, "text/csv")
+        lines = response.data.decode().splitlines()
+        self.assertTrue(lines[0].startswith("id,source_item_id"))
+        self.assertEqual(
+            len(lines) - 1,
+            len([rec for rec in recommendations if rec.recommendation_type.name == rec_type]),
+        )
+
+        response = self.client.get(f"{BASE_URL}/export?status=NOPE")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_update_recommendation(self):
         """Recommendation should be updated via PUT"""
         test_recommendation = RecommendationFactory()
@@ -185,6 +402,26 @@ class TestRecommendationServer(TestCase):
         self.assertEqual(updated_recommendation["recommendation_weight"], new_weight)
         self.assertEqual(updated_recommendation["recommendation_type"], "CROSS_SELL")
 
+    def test_update_recommendation_stale_cache(self):
+        """It should write a PUT even when the cached row is stale"""
+        recommendation = RecommendationFactory(number_of_likes=5)
+        recommendation.create()
+        url = f"{BASE_URL}/{recommendation.id}"
+        data = self.client.get(url).get_json()
+        # another worker changes the row behind this worker's cache
+        db.session.execute(
+            db.update(Recommendation).where(Recommendation.id == data["id"]).values(number_of_likes=99)
+        )
+        db.session.commit()
+        db.session.remove()
+        self.assertEqual(self.client.get(url).get_json(), data)
+        response = self.client.put(url, json=data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.get_json()["number_of_likes"], 5)
+        db.session.remove()
+        self.assertEqual(db.session.get(Recommendation, data["id"]).number_of_likes, 5)
+        self.assertEqual(self.client.get(url).get_json()["number_of_likes"], 5)
+
     def test_delete_recommendation(self):
         """It should Delete A Recommendation"""
         test_recommendation = self._create_recommendations(1)[0]
@@ -312,6 +549,198 @@ class TestRecommendationServer(TestCase):
                 sorted_valid_desc[i].recommendation_weight,
             )
 
+    def test_read_recommendations_by_source_item_id_with_limit(self):
+        """It should only return the top N recommendations for a source product"""
+        for _ in range(6):
+            RecommendationFactory(source_item_id=42).create()
+        response = self.client.get(
+            f"{BASE_URL}/source-product?source_item_id=42&limit=4"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.get_json()
+        self.assertEqual(len(data), 4)
+        weights = [recommendation["recommendation_weight"] for recommendation in data]
+        self.assertEqual(weights, sorted(weights, reverse=True))
+
+        response = self.client.get(
+            f"{BASE_URL}/source-product?source_item_id=42&limit=0"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_read_recommendations_from_graph_index(self):
+        """It should serve source-product lookups from the graph index when enabled"""
+        recommendations = self._create_recommendations(3)
+        source_item_id = recommendations[0].source_item_id
+        url = f"{BASE_URL}/source-product?source_item_id={source_item_id}"
+        expected = self.client.get(url).get_json()
+        with patch.object(graph_index, "enabled", True), patch.object(
+            graph_index, "lookup", return_value=expected
+        ) as lookup:
+            response = self.client.get(f"{url}&status=valid&limit=2")
+            lookup.assert_called_once_with(source_item_id, "desc", True, 2)
+        self.assertEqual(response.get_json(), expected)
+        with patch.object(graph_index, "enabled", True), patch.object(
+            graph_index, "lookup", return_value=None
+        ):
+            response = self.client.get(url)
+        self.assertEqual(response.get_json(), expected)
+
+    def test_read_recommendations_from_snapshot(self):
+        """It should serve source-product lookups from the snapshot file when configured"""
+        recommendations = self._create_recommendations(2)
+        source_item_id = recommendations[0].source_item_id
+        url = f"{BASE_URL}/source-product?source_item_id={source_item_id}"
+        expected = self.client.get(url).get_json()
+        with patch.object(snapshot_reader, "path", "graph.snapshot"), patch.object(
+            snapshot_reader, "lookup", return_value=expected[:1]
+        ) as lookup:
+            response = self.client.get(f"{url}&sort_order=asc")
+            lookup.assert_called_once_with(source_item_id, "asc", False, None)
+        self.assertEqual(response.get_json(), expected[:1])
+
+    def test_read_recommendations_of_many_sources(self):
+        """It should read the recommendations of many source products at once"""
+        recommendations = self._create_recommendations(3)
+        source_item_ids = [rec.source_item_id for rec in recommendations]
+        url = f"{BASE_URL}/source-products"
+        query = ",".join(str(source_item_id) for source_item_id in reversed(source_item_ids))
+        response = self.client.get(f"{url}?source_item_ids={query},0&sort_order=asc")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.get_json()
+        expected_order = list(dict.fromkeys(reversed(source_item_ids))) + [0]
+        self.assertEqual([group["source_item_id"] for group in data], expected_order)
+        self.assertEqual(data[-1]["recommendations"], [])
+        for group in data[:-1]:
+            single = self.client.get(
+                f"{BASE_URL}/source-product?source_item_id={group['source_item_id']}&sort_order=asc"
+            )
+            self.assertEqual(group["recommendations"], single.get_json())
+
+        response = self.client.post(
+            url, json={"source_item_ids": source_item_ids, "status": "valid", "limit": 1}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for group in response.get_json():
+            self.assertLessEqual(len(group["recommendations"]), 1)
+            for recommendation in group["recommendations"]:
+                self.assertEqual(recommendation["status"], "VALID")
+
+    def test_read_recommendations_of_many_sources_bad_request(self):
+        """It should not read the recommendations of many source products with bad arguments"""
+        url = f"{BASE_URL}/source-products"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(f"{url}?source_item_ids=1,two")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(f"{url}?source_item_ids=1&limit=0")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with patch.dict(app.config, {"BATCH_MAX_IDS": 2}):
+            response = self.client.post(url, json={"source_item_ids": [1, 2, 3]})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_recommendations_by_ids(self):
+        """It should Get many Recommendations by id in the requested order"""
+        recommendations = self._create_recommendations(3)
+        ids = [recommendation.id for recommendation in reversed(recommendations)]
+        query = ",".join(str(rec_id) for rec_id in ids)
+        response = self.client.get(f"{BASE_URL}/batch?ids={query},0,{ids[0]}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.get_json()
+        self.assertEqual([item["id"] for item in data["items"]], ids)
+        self.assertEqual(data["missing"], [0])
+        single = self.client.get(f"{BASE_URL}/{ids[1]}").get_json()
+        self.assertEqual(data["items"][1], single)
+
+        response = self.client.post(f"{BASE_URL}/batch", json={"ids": [ids[2], 0]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["id"] for item in response.get_json()["items"]], [ids[2]])
+
+        response = self.client.get(f"{BASE_URL}/batch")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with patch.dict(app.config, {"BATCH_MAX_IDS": 1}):
+            response = self.client.get(f"{BASE_URL}/batch?ids=1,2")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_recommend_for_basket(self):
+        """It should recommend targets for a basket of items"""
+        for source_item_id, target_item_id, weight in ((1, 10, 0.5), (2, 10, 0.4), (1, 11, 0.7)):
+            RecommendationFactory(
+                source_item_id=source_item_id,
+                target_item_id=target_item_id,
+                recommendation_weight=weight,
+                status=RecommendationStatus.VALID,
+            ).create()
+        url = f"{BASE_URL}/basket"
+        response = self.client.post(url, json={"source_item_ids": [1, 2], "aggregation": "sum"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.get_json()
+        self.assertEqual([result["target_item_id"] for result in data], [10, 11])
+        self.assertEqual(data[0]["source_item_ids"], [1, 2])
+        self.assertAlmostEqual(data[0]["score"], 0.9)
+
+        response = self.client.post(url, json={"source_item_ids": [1, 2], "limit": 1})
+        self.assertEqual([result["target_item_id"] for result in response.get_json()], [11])
+
+        response = self.client.post(url, json={"source_item_ids": [1], "aggregation": "median"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, json={"source_item_ids": [1], "limit": 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, json={})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_read_recommendations_with_fields(self):
+        """It should only return the requested fields"""
+        recommendations = self._create_recommendations(3)
+        response = self.client.get(f"{BASE_URL}?fields=target_item_id,recommendation_weight")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.get_json()
+        self.assertEqual(data["total"], 3)
+        for item in data["items"]:
+            self.assertEqual(set(item), {"target_item_id", "recommendation_weight"})
+
+        response = self.client.get(f"{BASE_URL}?cursor=&page-size=2&fields=id")
+        data = response.get_json()
+        self.assertEqual([set(item) for item in data["items"]], [{"id"}, {"id"}])
+        self.assertIsNotNone(data["next_cursor"])
+
+        source_item_id = recommendations[0].source_item_id
+        url = f"{BASE_URL}/source-product?source_item_id={source_item_id}"
+        expected = self.client.get(url).get_json()
+        response = self.client.get(f"{url}&fields=id,status")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.get_json(),
+            [{"id": item["id"], "status": item["status"]} for item in expected],
+        )
+        self.assertIn("ETag", response.headers)
+
+        response = self.client.get(
+            f"{BASE_URL}/source-products?source_item_ids={source_item_id}&fields=id"
+        )
+        self.assertEqual(
+            response.get_json()[0]["recommendations"], [{"id": item["id"]} for item in expected]
+        )
+
+        response = self.client.get(f"{BASE_URL}?fields=id,password")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(f"{url}&fields=,")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_reads_from_replica(self):
+        """It should serve GET requests from a replica and writes from the primary"""
+        replica_router.configure(
+            [DATABASE_URI], engine_options=app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+        )
+        self.addCleanup(replica_router.configure, [])
+        replica = replica_router.engines[0]
+        recommendation = self._create_recommendations(1)[0]
+        self.assertEqual(replica.pool.checkouts, 0)
+        db.session.commit()
+        find_cache.clear()
+        response = self.client.get(f"{BASE_URL}/{recommendation.id}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(replica.pool.checkouts, 1)
+
     def test_get_recommendation_list(self):
         """It should Get a list of Recommendations"""
         number = 3
@@ -382,6 +811,48 @@ class TestRecommendationServer(TestCase):
         # print(data)
         # self.assertEqual(len(data), 1)
 
+    def test_get_recommendation_list_with_cursor(self):
+        """It should walk the list of Recommendations with keyset pagination"""
+        recommendations = self._create_recommendations(5)
+        response = self.client.get(f"{BASE_URL}?cursor=&page-size=2&include-total=true")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.get_json()
+        self.assertEqual(data["total"], 5)
+        ids = [recommendation["id"] for recommendation in data["items"]]
+        while data["next_cursor"]:
+            response = self.client.get(
+                f"{BASE_URL}?cursor={data['next_cursor']}&page-size=2"
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.get_json()
+            self.assertNotIn("total", data)
+            ids.extend(recommendation["id"] for recommendation in data["items"])
+        self.assertEqual(ids, sorted(rec.id for rec in recommendations))
+
+        response = self.client.get(f"{BASE_URL}?cursor=garbage")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_recommendation_list_with_cursor_bad_page_size(self):
+        """It should fall back to pages of 20 for page sizes below 1"""
+        self._create_recommendations(3)
+        for page_size in (0, -5):
+            response = self.client.get(f"{BASE_URL}?cursor=&page-size={page_size}")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.get_json()
+            self.assertEqual(data["per_page"], 20)
+            self.assertEqual(len(data["items"]), 3)
+            self.assertIsNone(data["next_cursor"])
+
+    def test_get_recommendation_list_without_total(self):
+        """It should skip counting when include-total is false"""
+        self._create_recommendations(3)
+        response = self.client.get(f"{BASE_URL}?include-total=false")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.get_json()
+        self.assertEqual(len(data["items"]), 3)
+        self.assertNotIn("total", data)
+        self.assertNotIn("pages", data)
+
     def test_like_recommendation(self):
         """It should Like a Recommendation"""
         recommendations = self._create_recommendations(1)
@@ -395,6 +866,36 @@ class TestRecommendationServer(TestCase):
         logging.debug("Response data: %s", data)
         self.assertEqual(data["number_of_likes"], 1)
 
+    def test_like_recommendation_buffered(self):
+        """It should buffer likes when write-behind is enabled and report the estimate"""
+        rec = self._create_recommendations(1)[0]
+        with patch.object(like_buffer, "enabled", True), patch.object(
+            like_buffer, "_ensure_started"
+        ):
+            response = self.client.put(f"{BASE_URL}/{rec.id}/like")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = self.client.put(f"{BASE_URL}/{rec.id}/like")
+            self.assertEqual(response.get_json()["number_of_likes"], 2)
+            response = self.client.put(f"{BASE_URL}/{rec.id + 1}/like")
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+            self.assertEqual(Recommendation.find(rec.id).number_of_likes, 0)
+            like_buffer.flush()
+        db.session.expire_all()
+        self.assertEqual(Recommendation.find(rec.id).number_of_likes, 2)
+
+    def test_like_recommendation_buffer_full(self):
+        """It should write likes right away once the like buffer is full"""
+        rec = self._create_recommendations(1)[0]
+        with patch.object(like_buffer, "enabled", True), patch.object(
+            like_buffer, "_ensure_started"
+        ), patch.object(like_buffer, "max_pending", 0):
+            response = self.client.put(f"{BASE_URL}/{rec.id}/like")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.get_json()["number_of_likes"], 1)
+            self.assertEqual(like_buffer.pending(rec.id), 0)
+        db.session.expire_all()
+        self.assertEqual(Recommendation.find(rec.id).number_of_likes, 1)
+
     def test_deactivate_recommendation(self):
         """It should deactivate a Recommendation"""
         recommendations = self._create_recommendations(1)
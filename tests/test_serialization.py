@@ -0,0 +1,64 @@
+"""
+Test cases for the Fast Serialization helpers
+
+Test cases can be run with:
+    green
+    coverage report -m
+"""
+import json
+from datetime import datetime
+from unittest import TestCase
+from unittest.mock import patch
+from service import app, api
+from service.common import serialization
+from service.common.serialization import Marshaller, dumps, isoformat, output_json
+from service.routes import recommendation_model
+from tests.factories import RecommendationFactory
+
+
+######################################################################
+#  S E R I A L I Z A T I O N   T E S T   C A S E S
+######################################################################
+class TestSerialization(TestCase):
+    """Test Cases for the Fast Serialization helpers"""
+
+    def test_isoformat(self):
+        """It should format timestamps like isoformat() and start over when full"""
+        value = datetime(2023, 1, 2, 3, 4, 5, 678)
+        self.assertEqual(isoformat(value), value.isoformat())
+        self.assertEqual(isoformat(value), value.isoformat())
+        with patch.object(serialization, "ISO_CACHE_SIZE", 1):
+            other = datetime(2023, 1, 2)
+            self.assertEqual(isoformat(other), other.isoformat())
+            self.assertEqual(len(serialization._iso_cache), 1)  # pylint: disable=protected-access
+
+    def test_marshaller(self):
+        """It should marshal like flask-restx, skipping dicts in schema form"""
+        marshaller = Marshaller(recommendation_model)
+        recommendation = RecommendationFactory(
+            id=5, created_at=datetime(2023, 1, 2), updated_at=datetime(2023, 1, 3)
+        )
+        complete = recommendation.serialize()
+        partial = RecommendationFactory().serialize()
+        with app.test_request_context():
+            self.assertIs(marshaller(complete), complete)
+            self.assertEqual(marshaller(complete), api.marshal(complete, recommendation_model))
+            self.assertEqual(marshaller(partial), api.marshal(partial, recommendation_model))
+            self.assertIsNone(marshaller([partial])[0]["id"])
+
+    def test_dumps(self):
+        """It should encode JSON, also what the fast encoder cannot"""
+        data = {"id": 1, "weight": 0.5, "name": "UP_SELL", "items": [1, 2]}
+        self.assertEqual(json.loads(dumps(data)), data)
+        huge = {"id": 2**70}
+        self.assertEqual(json.loads(dumps(huge)), huge)
+        with patch.object(serialization, "orjson", None):
+            self.assertEqual(json.loads(dumps(data)), data)
+
+    def test_output_json(self):
+        """It should make JSON responses with the given code and headers"""
+        with app.test_request_context():
+            response = output_json({"id": 1}, 201, {"Location": "/x"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.headers["Location"], "/x")
+        self.assertEqual(json.loads(response.get_data()), {"id": 1})
@@ -0,0 +1,111 @@
+"""
+Test cases for the Prometheus metrics
+
+Test cases can be run with:
+    green
+    coverage report -m
+"""
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from sqlalchemy import create_engine, text
+from service import app
+from service.common.metrics import Metrics, metrics
+
+
+######################################################################
+#  M E T R I C S   T E S T   C A S E S
+######################################################################
+class TestMetrics(TestCase):
+    """Test Cases for the Metrics collector"""
+
+    def setUp(self):
+        """This runs before each test"""
+        self.metrics = Metrics()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+
+    def test_render_counters_and_histograms(self):
+        """It should render counters and cumulative histogram buckets"""
+        self.metrics.inc("http_requests_total", ("GET", "/health", "200"), 2)
+        self.metrics.observe("http_request_duration_seconds", ("GET", "/health"), 0.003)
+        self.metrics.observe("http_request_duration_seconds", ("GET", "/health"), 0.2)
+        body = self.metrics.render()
+        self.assertIn("# TYPE http_requests_total counter", body)
+        self.assertIn(
+            'http_requests_total{method="GET",endpoint="/health",status="200"} 2', body
+        )
+        self.assertIn(
+            'http_request_duration_seconds_bucket{method="GET",endpoint="/health",le="0.005"} 1',
+            body,
+        )
+        self.assertIn(
+            'http_request_duration_seconds_bucket{method="GET",endpoint="/health",le="+Inf"} 2',
+            body,
+        )
+        self.assertIn(
+            'http_request_duration_seconds_count{method="GET",endpoint="/health"} 2', body
+        )
+        self.assertIn("http_requests_in_flight{} 0", body)
+        self.assertNotIn("db_queries_total", body)
+
+    def test_query_events(self):
+        """It should count and time the statements of every engine"""
+        engine = create_engine("sqlite://")
+        metrics.reset()
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("  select 2"))
+        body = metrics.render(engine)
+        self.assertIn('db_queries_total{operation="SELECT"} 2', body)
+        self.assertIn('db_query_duration_seconds_count{operation="SELECT"} 2', body)
+        self.assertIn("db_pool_checked_out", body)
+
+    def test_aggregate_workers(self):
+        """It should add up the metrics files of all workers"""
+        self.metrics.directory = self.directory
+        self.metrics.inc("http_requests_total", ("GET", "/health", "200"))
+        running = {
+            "pid": os.getppid(),
+            "values": {"http_requests_total": [[["GET", "/health", "200"], 3]]},
+            "gauges": {"http_requests_in_flight": 2},
+        }
+        exited = {
+            "pid": 2 ** 22 + 1,
+            "values": {"http_requests_total": [[["GET", "/health", "200"], 5]]},
+            "gauges": {"http_requests_in_flight": 7},
+        }
+        for snapshot in (running, exited):
+            path = os.path.join(self.directory, f"metrics-{snapshot['pid']}.json")
+            with open(path, "w", encoding="utf-8") as handle:
+                json.dump(snapshot, handle)
+        body = self.metrics.render()
+        self.assertIn(
+            'http_requests_total{method="GET",endpoint="/health",status="200"} 9', body
+        )
+        # only the workers still running count towards the gauges
+        self.assertIn("http_requests_in_flight{} 2", body)
+        self.assertTrue(
+            os.path.exists(os.path.join(self.directory, f"metrics-{os.getpid()}.json"))
+        )
+
+    def test_metrics_endpoint(self):
+        """It should serve the metrics of the requests"""
+        client = app.test_client()
+        metrics.reset()
+        client.get("/health")
+        client.get("/no-such-page")
+        resp = client.get("/metrics")
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.content_type.startswith("text/plain; version=0.0.4"))
+        body = resp.get_data(as_text=True)
+        self.assertIn(
+            'http_requests_total{method="GET",endpoint="/health",status="200"} 1', body
+        )
+        self.assertIn(
+            'http_requests_total{method="GET",endpoint="<unmatched>",status="404"} 1', body
+        )
+        # the scrape itself is still in flight
+        self.assertIn("http_requests_in_flight{} 1", body)
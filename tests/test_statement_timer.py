@@ -0,0 +1,67 @@
+"""
+Test cases for the Statement Timer
+
+Test cases can be run with:
+    green
+    coverage report -m
+"""
+from unittest import TestCase
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from service.common.statement_timer import START_KEY, StatementTimer
+
+
+######################################################################
+#  S T A T E M E N T   T I M E R   T E S T   C A S E S
+######################################################################
+class TestStatementTimer(TestCase):
+    """Test Cases for the Statement Timer"""
+
+    def setUp(self):
+        """This runs before each test"""
+        self.engine = create_engine("sqlite://")
+        self.timer = StatementTimer()
+        self.calls = []
+
+    def _consumer(self, name):
+        """Returns a consumer that records its calls under a name"""
+        def consume(statement, parameters, duration):
+            self.calls.append((name, statement, parameters, duration))
+        return consume
+
+    def _subscribe(self, consumer, engine=None):
+        """Subscribes a consumer for the length of the test"""
+        self.timer.subscribe(consumer, engine)
+        self.addCleanup(self.timer.unsubscribe, consumer, engine)
+
+    def test_times_once(self):
+        """It should time a statement once for all of its consumers"""
+        self._subscribe(self._consumer("all"))
+        self._subscribe(self._consumer("engine"), self.engine)
+        self._subscribe(self._consumer("other"), create_engine("sqlite://"))
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT :value"), {"value": 1})
+            self.assertEqual(conn.info[START_KEY], [])
+        self.assertEqual([call[0] for call in self.calls], ["all", "engine"])
+        self.assertEqual(self.calls[0][1:3], self.calls[1][1:3])
+        self.assertEqual(self.calls[0][3], self.calls[1][3])
+        self.assertGreater(self.calls[0][3], 0)
+
+    def test_unsubscribe(self):
+        """It should stop calling a consumer that unsubscribed"""
+        consumer = self._consumer("all")
+        self.timer.subscribe(consumer)
+        self.timer.subscribe(consumer)
+        self.timer.unsubscribe(consumer)
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        self.assertEqual(self.calls, [])
+
+    def test_failed_statement(self):
+        """It should forget the start time of a failed statement"""
+        self._subscribe(self._consumer("all"), self.engine)
+        with self.engine.connect() as conn:
+            with self.assertRaises(OperationalError):
+                conn.execute(text("SELECT * FROM missing"))
+            self.assertEqual(conn.info[START_KEY], [])
+        self.assertEqual(self.calls, [])
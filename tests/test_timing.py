@@ -0,0 +1,77 @@
+"""
+Test cases for the Server-Timing header
+
+Test cases can be run with:
+    green
+    coverage report -m
+"""
+import time
+from unittest import TestCase
+from flask import Response
+from flask_restx import reqparse
+from service import app
+from service.common.timing import (
+    RequestParser,
+    Timings,
+    add_header,
+    current_timings,
+    span,
+    start_timing,
+)
+
+
+######################################################################
+#  S E R V E R   T I M I N G   T E S T   C A S E S
+######################################################################
+class TestServerTiming(TestCase):
+    """Test Cases for the Server-Timing spans"""
+
+    def test_no_timing(self):
+        """It should do nothing when the request is not timed"""
+        with span("orm") as result:
+            self.assertIsNone(result)
+        with app.test_request_context("/"):
+            self.assertIsNone(current_timings())
+            with span("orm") as result:
+                self.assertIsNone(result)
+
+    def test_nested_spans(self):
+        """It should count the time of nested spans and statements only once"""
+        timings = Timings()
+        with span_of(timings, "orm"):
+            timings.add("db", 0.001)
+            with span_of(timings, "serialize"):
+                time.sleep(0.02)
+        self.assertEqual(timings.totals["db"], 0.001)
+        self.assertGreaterEqual(timings.totals["serialize"], 0.02)
+        # the orm span only keeps the time spent outside of the nested ones
+        self.assertLess(timings.totals["orm"], 0.01)
+
+    def test_header(self):
+        """It should add the phases of the request to the response"""
+        with app.test_request_context("/api/recommendations?page-size=5"):
+            start_timing()
+            parser = RequestParser()
+            parser.add_argument("page-size", type=int, location="args")
+            self.assertEqual(parser.parse_args()["page-size"], 5)
+            with span("serialize"):
+                pass
+            current_timings().add("db", 0.002)
+            response = add_header(Response())
+        header = response.headers["Server-Timing"]
+        names = [entry.split(";")[0] for entry in header.split(", ")]
+        self.assertEqual(names, ["parse", "db", "serialize", "app"])
+        self.assertIn('db;dur=2.00;desc="Database"', header)
+
+    def test_copy_parser(self):
+        """It should keep timing copies of a parser"""
+        parser = RequestParser()
+        self.assertIsInstance(parser.copy(), RequestParser)
+        self.assertIsInstance(parser, reqparse.RequestParser)
+
+
+def span_of(timings, name):
+    """Returns a span of the given timings outside of a request"""
+    with app.test_request_context("/") as context:
+        context.request.environ["server_timing"] = timings
+        return span(name)